@@ -1,53 +1,78 @@
-import matplotlib.pyplot as plt
 import sqlite3
-from matplotlib.ticker import MaxNLocator
-import pandas as pd
-from datetime import datetime, timedelta
-
-def total_habit(db):
+from datetime import date
+from itertools import groupby
+from operator import itemgetter
+from history import EPOCH_ORDINAL, HabitHistory, _ordinal
+from db import DEFAULT_USER_ID, get_streak_state
+from cache import HABIT, HABITS, TRACKER, cached
+from instrument import instrumented
+
+@instrumented
+@cached(HABITS)
+def total_habit(db, user_id=DEFAULT_USER_ID):
     """
     Count the number of entries in the 'counter' table.
 
     Args:
         db: The database connection object.
+        user_id (int, optional): The owner of the habits. Defaults to DEFAULT_USER_ID.
 
     Returns:
-        int: The number of entries in the 'counter' table.
+        int: The number of entries in the 'counter' table that belong to the user.
     """
+    cur = None
     try:
         cur = db.cursor()
-        cur.execute("SELECT COUNT(*) FROM counter")
+        cur.execute("SELECT COUNT(*) FROM counter WHERE user_id = ?", (user_id,))
         return cur.fetchone()[0]
     except Exception as e:
         print(f"Error calculating total count: {e}")
         return 0
+    finally:
+        if cur:
+            cur.close()
 
-def total_tracker(db):
+@instrumented
+@cached(TRACKER)
+def total_tracker(db, user_id=DEFAULT_USER_ID):
     """
     Count the number of entries in the 'tracker' table.
 
     Args:
         db: The database connection object.
+        user_id (int, optional): The owner of the habits. Defaults to DEFAULT_USER_ID.
 
     Returns:
-        int: The number of entries in the 'tracker' table.
+        int: The number of entries in the 'tracker' table for the habits of the user.
     """
+    cur = None
     try:
         cur = db.cursor()  # Cursor erstellen
-        cur.execute("SELECT COUNT(*) FROM tracker")
+        # One primary key range per habit of the user, found by the (user_id, name) index
+        cur.execute("SELECT COUNT(*) FROM events WHERE habit_id IN (SELECT id FROM counter WHERE user_id = ?)",
+                    (user_id,))
         return cur.fetchone()[0]  # Gibt die Gesamtanzahl der Einträge zurück
     except Exception as e:
         print(f"Error calculating total habits: {e}")
         return 0  # Gibt 0 zurück, falls ein Fehler auftritt
+    finally:
+        if cur:
+            cur.close()
 
 
-def total_tracker_habit(db, habit_name):
+@instrumented
+@cached(HABIT)
+def total_tracker_habit(db, habit_name, user_id=DEFAULT_USER_ID):
     """
     Count the number of entries in the 'tracker' table for a specific habit.
 
+    The yearly counts of the 'rollup' table are summed, so one row per year
+    of history is read instead of one row per entry.
+
     Args:
         db: The database connection object.
         habit_name (str): The name of the habit to filter by.
+        user_id (int, optional): The owner of the habit. Defaults to DEFAULT_USER_ID.
 
     Returns:
         int: The number of entries in the 'tracker' table for the specified habit.
@@ -55,7 +80,10 @@ def total_tracker_habit(db, habit_name):
     cur = None  # Initialisieren des Cursors
     try:
         cur = db.cursor()
-        cur.execute("SELECT COUNT(*) FROM tracker WHERE counterName = ?", (habit_name,))
+        cur.execute("""
+            SELECT COALESCE(SUM(count), 0) FROM rollup
+            WHERE habit_id = (SELECT id FROM counter WHERE user_id = ? AND name = ?) AND grain = 'yearly'
+        """, (user_id, habit_name))
         return cur.fetchone()[0]
     except Exception as e:
         print(f"Error calculating entries for habit '{habit_name}': {e}")
@@ -64,49 +92,233 @@ def total_tracker_habit(db, habit_name):
         if cur:
             cur.close()
 
-def plot_tracker_counts(db, habit_name):
+@instrumented
+@cached(TRACKER)
+def total_tracker_per_habit(db, user_id=DEFAULT_USER_ID):
     """
-    Fetch tracker counts per date for a given habit, fill missing dates, and plot the results.
+    Count the number of entries in the 'tracker' table for every habit in one query.
+
+    Args:
+        db: The database connection object.
+        user_id (int, optional): The owner of the habits. Defaults to DEFAULT_USER_ID.
+
+    Returns:
+        dict: A mapping of habit name to its number of tracker entries, in name order.
+    """
+    try:
+        rows = db.execute("""
+            SELECT c.name, COUNT(e.day)
+            FROM counter c
+            LEFT JOIN events e ON e.habit_id = c.id
+            WHERE c.user_id = ?
+            GROUP BY c.name
+            ORDER BY c.name
+        """, (user_id,)).fetchall()
+        return dict(rows)
+    except Exception as e:
+        print(f"Error calculating entries per habit: {e}")
+        return {}
+
+def _bucket_starts(days, interval):
+    """
+    Maps each day to the first day of its calendar bucket.
+
+    Args:
+        days (numpy.ndarray): Dates as datetime64[D].
+        interval (str): "daily", "weekly" (ISO weeks), "monthly", "quarterly" or "yearly".
+
+    Returns:
+        numpy.ndarray: The bucket start date of every day as datetime64[D].
+    """
+    import numpy as np
+
+    if interval == "weekly":
+        # Day 0 of the epoch (1970-01-01) is a Thursday; shift so weeks start on Monday
+        return days - (days.astype(np.int64) + 3) % 7
+    if interval == "monthly":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    if interval == "quarterly":
+        months = days.astype("datetime64[M]").astype(np.int64)
+        return (months - months % 3).astype("datetime64[M]").astype("datetime64[D]")
+    if interval == "yearly":
+        return days.astype("datetime64[Y]").astype("datetime64[D]")
+    return days
+
+# Rollup grains (see 'db.ROLLUP_GRAINS') whose buckets nest into the buckets of an interval, coarsest first
+_ROLLUP_GRAINS = {
+    "weekly": ("weekly",),
+    "monthly": ("monthly",),
+    "quarterly": ("monthly",),
+    "yearly": ("yearly", "monthly"),
+}
+
+def _rollup_grain(interval, start, end):
+    """
+    Picks the coarsest rollup grain that can answer a series query exactly.
+
+    A grain qualifies if its buckets nest into the buckets of the interval and
+    the range starts and ends on its bucket boundaries, so no rollup bucket is
+    only partly inside the range.
+
+    Args:
+        interval (str): The bucket size of the series.
+        start (str): The first date (YYYY-MM-DD) or None.
+        end (str): The last date (YYYY-MM-DD) or None.
+
+    Returns:
+        str: The grain, or None if the series has to be built from the events.
+    """
+    import numpy as np
+
+    for grain in _ROLLUP_GRAINS.get(interval, ()):
+        if start is not None and _bucket_starts(np.datetime64(start, "D"), grain) != np.datetime64(start, "D"):
+            continue
+        if end is not None:
+            after = np.datetime64(end, "D") + 1
+            if _bucket_starts(after, grain) != after:
+                continue
+        return grain
+    return None
+
+def _rollup_series(db, habit_name, start, end, interval, grain, user_id):
+    """
+    Builds the series of 'daily_count_series' from the counts of a rollup grain.
+    """
+    import numpy as np
+
+    conditions = ["habit_id = (SELECT id FROM counter WHERE user_id = ? AND name = ?)", "grain = ?"]
+    params = [user_id, habit_name, grain]
+    if start is not None:
+        conditions.append("bucket >= ?")
+        params.append(_ordinal(start))
+    if end is not None:
+        conditions.append("bucket <= ?")
+        params.append(_ordinal(end))
+    rows = db.execute(f"""
+        SELECT bucket, count FROM rollup
+        WHERE {" AND ".join(conditions)}
+        ORDER BY bucket
+    """, params).fetchall()
+
+    if not rows and (start is None or end is None):
+        return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.int64)
+    buckets = (np.array([row[0] for row in rows], dtype=np.int64) - EPOCH_ORDINAL).astype("datetime64[D]")
+    counts = np.array([row[1] for row in rows], dtype=np.int64)
+
+    first = np.datetime64(start, "D") if start else buckets[0]
+    last = np.datetime64(end, "D") if end else buckets[-1]
+
+    # Bucket starts of the interval between first and last, then the rollup counts summed into them
+    dates = first + np.arange(int((last - first).astype(np.int64)) + 1)
+    starts = _bucket_starts(dates, interval)
+    starts = starts[np.flatnonzero(np.concatenate(([True], starts[1:] != starts[:-1])))]
+    series = np.zeros(len(starts), dtype=np.int64)
+    np.add.at(series, np.searchsorted(starts, _bucket_starts(buckets, interval)), counts)
+    return starts, series
+
+@instrumented
+def daily_count_series(db, habit_name, start=None, end=None, interval="daily", user_id=DEFAULT_USER_ID):
+    """
+    Builds a dense series of tracker counts for a habit, optionally resampled per interval.
+
+    Weekly and coarser series are read from the coarsest 'rollup' grain that
+    answers the query exactly (see '_rollup_grain'), e.g. yearly counts for a
+    yearly series, so a multi-year chart reads a few rows per year. Daily
+    series, and ranges that cut a rollup bucket, are built from the events:
+    they are loaded as day ordinals (see 'history.HabitHistory') and counted
+    into a zero-filled NumPy array by day offset ('np.bincount'); for coarser
+    intervals, consecutive days of the same calendar bucket are summed with
+    'np.add.reduceat'.
 
     Args:
         db: Database connection object.
         habit_name (str): The name of the habit to analyze.
+        start (str, optional): The first date (YYYY-MM-DD). Defaults to the first event.
+        end (str, optional): The last date (YYYY-MM-DD). Defaults to the last event.
+        interval (str, optional): "daily", "weekly", "monthly", "quarterly" or "yearly".
+            None uses the habit's own interval. Defaults to "daily".
+        user_id (int, optional): The owner of the habit. Defaults to DEFAULT_USER_ID.
 
     Returns:
-        None
+        tuple: (dates, counts) as NumPy arrays of datetime64[D] bucket start dates and
+        int64 counts. Both are empty if there is no data in the range.
     """
-    try:
-        cur = db.cursor()
-        cur.execute("""
-            SELECT date, COUNT(*) as count
-            FROM tracker
-            WHERE counterName = ?
-            GROUP BY date
-            ORDER BY date ASC
-        """, (habit_name,))
-        data = cur.fetchall()
-        cur.close()
+    import numpy as np
 
-        if data:
-            # Prepare data as a DataFrame
-            df = pd.DataFrame(data, columns=['date', 'count'])
-            df['date'] = pd.to_datetime(df['date'])  # Convert to datetime
+    if interval is None:
+        habit = db.execute("SELECT interval FROM counter WHERE user_id = ? AND name = ?",
+                           (user_id, habit_name)).fetchone()
+        interval = habit[0] if habit else "daily"
 
-            # Create a complete date range from the first to the last date
-            full_date_range = pd.date_range(start=df['date'].min(), end=df['date'].max())
+    grain = _rollup_grain(interval, start, end)
+    if grain is not None:
+        return _rollup_series(db, habit_name, start, end, interval, grain, user_id)
 
-            # Reindex the DataFrame to include all dates, filling missing counts with 0
-            df = df.set_index('date').reindex(full_date_range, fill_value=0).reset_index()
-            df.columns = ['date', 'count']
+    days = HabitHistory.from_db(db, habit_name, start, end, user_id).to_numpy()
 
-            # Print the complete data
-            print(f"Data for habit '{habit_name}':")
-            print(df)
+    if not len(days) and (start is None or end is None):
+        return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.int64)
+
+    first = np.datetime64(start, "D") if start else days[0]
+    last = np.datetime64(end, "D") if end else days[-1]
+
+    # Dense daily series: one slot per day between first and last
+    length = int((last - first).astype(np.int64)) + 1
+    offsets = (days - first).astype(np.int64)
+    series = np.bincount(offsets, minlength=length).astype(np.int64)
+    dates = first + np.arange(length)
+
+    if interval == "daily":
+        return dates, series
+
+    # Sum consecutive days that share the same bucket start
+    starts = _bucket_starts(dates, interval)
+    boundaries = np.flatnonzero(np.concatenate(([True], starts[1:] != starts[:-1])))
+    return starts[boundaries], np.add.reduceat(series, boundaries)
+
+@instrumented
+def plot_tracker_counts(db, habit_name, interval=None, show_data=False, user_id=DEFAULT_USER_ID):
+    """
+    Fetch tracker counts per date for a given habit, fill missing dates, and plot the results.
+
+    Counts are aggregated per the habit's own interval unless another interval
+    is given. Only a summary of the series is printed unless 'show_data' is set.
+
+    Args:
+        db: Database connection object.
+        habit_name (str): The name of the habit to analyze.
+        interval (str, optional): The bucket size of the plot. Defaults to the habit's interval.
+        show_data (bool, optional): Print every data point of the series. Defaults to False.
+        user_id (int, optional): The owner of the habit. Defaults to DEFAULT_USER_ID.
+
+    Returns:
+        None
+    """
+    # Plotting dependencies are slow to import, so they are loaded on first use only
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import MaxNLocator
+
+    try:
+        if interval is None:
+            habit = db.execute("SELECT interval FROM counter WHERE user_id = ? AND name = ?",
+                               (user_id, habit_name)).fetchone()
+            interval = habit[0] if habit else "daily"
+
+        dates, counts = daily_count_series(db, habit_name, interval=interval, user_id=user_id)
+
+        if len(dates):
+            # Print a summary of the data
+            print(f"Data for habit '{habit_name}' ({interval}): {len(dates)} intervals "
+                  f"from {dates[0]} to {dates[-1]}, {counts.sum()} entries, "
+                  f"{(counts > 0).sum()} intervals with entries, maximum {counts.max()} per interval.")
+            if show_data:
+                for day, count in zip(dates, counts):
+                    print(f"{day}  {count}")
 
             # Plot the data
             plt.figure(figsize=(10, 6))
-            plt.plot(df['date'], df['count'], marker='o', linestyle='-', label=f"'{habit_name}' Counts")
-            plt.title(f"Tracker Counts per Date for '{habit_name}'")
+            plt.plot(dates, counts, marker='o', linestyle='-', label=f"'{habit_name}' Counts")
+            plt.title(f"Tracker Counts per {interval.capitalize()} Interval for '{habit_name}'")
             plt.xlabel("Date")
             plt.ylabel("Count")
             plt.xticks(rotation=45)
@@ -123,97 +335,168 @@ def plot_tracker_counts(db, habit_name):
     except Exception as e:
         print(f"An error occurred while plotting tracker counts for '{habit_name}': {e}")
 
-def analyze_streak(db, habit_name):
+@instrumented
+@cached(HABIT, daily=True)
+def get_streak(db, habit_name, user_id=DEFAULT_USER_ID):
+    """
+    Computes the streak statistics of a given habit based on tracking data.
+
+    Args:
+        db: The database connection object.
+        habit_name: The name of the habit to analyze.
+        user_id (int, optional): The owner of the habit. Defaults to DEFAULT_USER_ID.
+
+    Returns:
+        StreakResult: The streak statistics, or None if the habit does not exist.
+
+    Raises:
+        sqlite3.Error: If a database error occurs.
+        ValueError: If the stored creation date or period is invalid.
+    """
+    # Fetch habit details from the database
+    habit = db.execute("""
+        SELECT creation, interval, period
+        FROM counter
+        WHERE user_id = ? AND name = ?
+    """, (user_id, habit_name)).fetchone()
+
+    if not habit:
+        return None
+
+    creation, interval, period = habit
+
+    # Fetch tracking data as day ordinals
+    history = HabitHistory.from_db(db, habit_name, user_id=user_id)
+    return history.streak(date.fromisoformat(creation), interval, int(period))
+
+@instrumented
+@cached(HABIT, daily=True)
+def get_materialized_streak(db, habit_name, user_id=DEFAULT_USER_ID):
+    """
+    Looks up the streak statistics of a habit from the materialized 'streak_state' table.
+
+    The lookup takes constant time regardless of the habit's history. If no state
+    is stored, or the state contains events dated after today, the statistics are
+    computed from the full history instead.
+
+    Args:
+        db: The database connection object.
+        habit_name: The name of the habit to analyze.
+        user_id (int, optional): The owner of the habit. Defaults to DEFAULT_USER_ID.
+
+    Returns:
+        StreakResult: The streak statistics, or None if the habit does not exist.
+
+    Raises:
+        sqlite3.Error: If a database error occurs.
+        ValueError: If the stored creation date or period is invalid.
+    """
+    habit = db.execute("""
+        SELECT creation, interval, period
+        FROM counter
+        WHERE user_id = ? AND name = ?
+    """, (user_id, habit_name)).fetchone()
+
+    if not habit:
+        return None
+
+    creation, interval, period = habit
+    state = get_streak_state(db, habit_name, user_id)
+    result = state.result(habit_name, date.fromisoformat(creation), interval, int(period)) if state else None
+    return result if result is not None else get_streak(db, habit_name, user_id)
+
+@instrumented
+def analyze_streak(db, habit_name, user_id=DEFAULT_USER_ID):
     """
     Analyzes the streak of a given habit based on tracking data.
 
     Args:
         db: The database connection object.
         habit_name: The name of the habit to analyze.
+        user_id (int, optional): The owner of the habit. Defaults to DEFAULT_USER_ID.
 
     Returns:
         str: A report of the habit streak analysis for the user.
     """
     try:
-        # Fetch habit details from the database
-        habit = db.execute("""
-            SELECT creation, interval, period
-            FROM counter
-            WHERE name = ?
-        """, (habit_name,)).fetchone()
-
-        if not habit:
+        result = get_materialized_streak(db, habit_name, user_id)
+
+        if result is None:
             return f"Habit '{habit_name}' not found in the database."
 
-        creation, interval, period = habit
-
-        # Ensure period is an integer
-        period = int(period)
-
-        # Define interval in days dynamically
-        interval_days = {
-            "daily": 1,
-            "weekly": 7,
-            "monthly": 30,  # Approximation
-            "quarterly": 90,  # Approximation
-            "yearly": 365
-        }.get(interval, 1)  # Default to 1 day if interval not found
-
-        # Fetch tracking data
-        tracking_data = db.execute("""
-            SELECT date
-            FROM tracker
-            WHERE counterName = ?
-            ORDER BY date ASC
-        """, (habit_name,)).fetchall()
-
-        if not tracking_data:
+        if not result.tracking_entries:
             return f"No tracking data found for habit '{habit_name}'."
 
-        # Convert tracking dates to datetime objects
-        track_dates = [datetime.strptime(row[0], '%Y-%m-%d') for row in tracking_data]
-
-        # Initialize variables
-        current_streak = 0
-        max_streak = 0
-        streak_broken = False
-        expected_start = datetime.strptime(creation, '%Y-%m-%d')
-        today = datetime.now()
-
-        # Evaluate each interval independently, stopping at today's date
-        for _ in range(period):
-            # Define the current interval's end
-            expected_end = expected_start + timedelta(days=interval_days)
-
-            # Stop if the interval's start exceeds today's date
-            if expected_start > today:
-                break
-
-            # Check if at least one tracking date falls within this interval
-            if any(expected_start <= date < expected_end for date in track_dates):
-                current_streak += 1
-                max_streak = max(max_streak, current_streak)
-            else:
-                streak_broken = True
-                current_streak = 0  # Reset streak
-
-            # Move to the next interval
-            expected_start = expected_end
-
-        # Generate report
-        report = f"Habit '{habit_name}':\n"
-        report += f"- Current Streak: {current_streak} intervals\n"
-        report += f"- Longest Streak: {max_streak} intervals\n"
-        report += f"- Total Intervals Checked: {_ + 1}\n"  # _ counts the loops
-        report += f"- Tracking Entries: {len(track_dates)}\n"
-        if not streak_broken:
-            report += "- The habit was maintained consistently without any breaks.\n"
-        else:
-            report += "- The habit was not maintained consistently; there were breaks in the streak.\n"
-
-        return report
+        return result.report()
 
     except sqlite3.Error as e:
         return f"Database error: {e}"
     except Exception as e:
-        return f"Unexpected error: {e}"
\ No newline at end of file
+        return f"Unexpected error: {e}"
+
+@instrumented
+@cached(TRACKER, daily=True)
+def analyze_all_streaks(db, user_id=DEFAULT_USER_ID):
+    """
+    Computes the streak statistics of every habit in one pass over the database.
+
+    All habit metadata and tracker rows are read with a single query ordered by
+    habit and date, and the rows are grouped per habit while streaming from the
+    cursor, so the whole tracker is never held in memory at once.
+
+    Args:
+        db: The database connection object.
+        user_id (int, optional): The owner of the habits. Defaults to DEFAULT_USER_ID.
+
+    Returns:
+        dict: A mapping of habit name to StreakResult, in habit name order.
+        Habits with invalid creation dates or periods are reported and skipped.
+    """
+    return _analyze_streaks(db, user_id)
+
+def _analyze_streaks(db, user_id, first_id=None, last_id=None):
+    """
+    Computes the streak statistics of the habits of a user, optionally limited to a range of habit ids.
+
+    Shared by 'analyze_all_streaks' and the partitions of 'parallel.analyze_all_streaks_parallel'.
+
+    Args:
+        db: The database connection object.
+        user_id (int): The owner of the habits.
+        first_id (int, optional): The lowest habit id to analyze.
+        last_id (int, optional): The highest habit id to analyze.
+
+    Returns:
+        dict: A mapping of habit name to StreakResult, in habit name order.
+    """
+    # Range conditions are only added when given (see 'HabitHistory.from_db')
+    conditions, params = ["c.user_id = ?"], [user_id]
+    if first_id is not None:
+        conditions.append("c.id >= ?")
+        params.append(first_id)
+    if last_id is not None:
+        conditions.append("c.id <= ?")
+        params.append(last_id)
+
+    results = {}
+    cur = db.cursor()
+    try:
+        cur.execute(f"""
+            SELECT c.name, c.creation, c.interval, c.period, e.day
+            FROM counter c
+            LEFT JOIN events e ON e.habit_id = c.id
+            WHERE {" AND ".join(conditions)}
+            ORDER BY c.name, e.day
+        """, params)
+
+        for (name, creation, interval, period), rows in groupby(cur, key=itemgetter(0, 1, 2, 3)):
+            try:
+                # A habit without events yields a single row with a NULL day
+                history = HabitHistory(name, [row[4] for row in rows if row[4] is not None])
+                results[name] = history.streak(date.fromisoformat(creation), interval, int(period))
+            except (TypeError, ValueError) as e:
+                print(f"Skipping habit '{name}' with invalid data: {e}")
+    finally:
+        cur.close()
+
+    return results
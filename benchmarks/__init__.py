@@ -0,0 +1,7 @@
+"""
+Benchmarks for the habit tracker.
+
+Each module is a standalone script and is run from the project root, e.g.
+
+    python -m benchmarks.index_lookup
+"""
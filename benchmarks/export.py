@@ -0,0 +1,96 @@
+"""
+Measures the throughput and peak memory of the tracker export.
+
+A temporary database is filled with synthetic events, then the tracker table
+is exported to CSV and to the columnar format, and once to CSV after loading
+all rows with 'fetchall' for comparison. Every export runs in a fresh process,
+so its peak resident set size (ru_maxrss) is not inflated by the data
+generation or by the previous export.
+
+Usage:
+    python -m benchmarks.export [--rows 1000000] [--batch-size 10000]
+"""
+import argparse
+import csv
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from multiprocessing import get_context
+
+from benchmarks.index_lookup import fill_tracker
+from db import get_db
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of the current process in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def run_export(db_path, out_path, fmt, batch_size):
+    """
+    Exports the tracker table in the calling (fresh) process.
+
+    Returns:
+        tuple: (rows, seconds, file size in bytes, peak RSS in MB).
+    """
+    from exporter import _QUERIES, export_table
+
+    db = get_db(db_path, "readonly")
+    start = time.perf_counter()
+    if fmt == "fetchall":
+        rows = db.execute(_QUERIES["tracker", "csv"]).fetchall()
+        with open(out_path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["date", "counterName"])
+            writer.writerows(rows)
+        rows = len(rows)
+    else:
+        with redirect_stdout(None):
+            rows = export_table(db, out_path, "tracker", fmt, batch_size)["rows"]
+    seconds = time.perf_counter() - start
+    db.close()
+    return rows, seconds, os.path.getsize(out_path), peak_rss_mb()
+
+
+def run(rows, batch_size):
+    """
+    Runs the export benchmark and prints the results.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "export.db")
+        db = get_db(db_path, "fast")
+        fill_tracker(db, rows)
+        db.close()
+
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+            # Memory of a fresh process that has only imported the modules
+            baseline = executor.submit(peak_rss_mb).result()
+
+        print(f"Export of {rows} tracker rows (batch size {batch_size}, idle process {baseline:.1f} MB)")
+        print(f"{'format':>10} {'rows/s':>10} {'MB':>8} {'peak RSS MB':>12}")
+        for fmt, extension in (("fetchall", "csv"), ("csv", "csv"), ("columnar", "htc")):
+            out_path = os.path.join(tmp, f"export_{fmt}.{extension}")
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+                exported, seconds, size, peak = executor.submit(run_export, db_path, out_path, fmt,
+                                                                batch_size).result()
+            print(f"{fmt:>10} {exported / seconds:>10.0f} {size / 2 ** 20:>8.1f} {peak:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+    run(args.rows, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
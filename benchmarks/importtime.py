@@ -0,0 +1,87 @@
+"""
+Guards the startup time of the CLI using 'python -X importtime'.
+
+Imports the given module in a fresh interpreter several times, reports the best
+cumulative import time and the slowest imported modules, and fails if the time
+exceeds the budget or if one of the heavy analysis dependencies is loaded.
+
+Usage:
+    python -m benchmarks.importtime [--module main] [--budget-ms 500] [--repeat 5]
+"""
+import argparse
+import subprocess
+import sys
+
+# Dependencies that must only be imported when a plotting/analysis action runs
+HEAVY_MODULES = ("matplotlib", "pandas", "numpy")
+
+
+def measure(module):
+    """
+    Imports a module in a fresh interpreter and parses the importtime output.
+
+    Args:
+        module (str): The name of the module to import.
+
+    Returns:
+        dict: A mapping of imported module name to (self µs, cumulative µs).
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def run(module, budget_ms, repeat, top):
+    """
+    Measures the import time of a module and checks it against the budget.
+
+    Args:
+        module (str): The name of the module to import.
+        budget_ms (float): The maximum allowed cumulative import time in milliseconds.
+        repeat (int): The number of fresh interpreters; the best run is reported.
+        top (int): The number of slowest modules to list.
+
+    Returns:
+        bool: True if the budget is met and no heavy module was imported.
+    """
+    runs = [measure(module) for _ in range(repeat)]
+    best = min(runs, key=lambda timings: timings[module][1])
+    total_ms = best[module][1] / 1000
+
+    print(f"Slowest imports of '{module}' (self time):")
+    for name, (self_us, cumulative_us) in sorted(best.items(), key=lambda item: -item[1][0])[:top]:
+        print(f"  {self_us / 1000:8.2f} ms  {cumulative_us / 1000:8.2f} ms  {name}")
+
+    heavy = [name for name in HEAVY_MODULES if name in best]
+    print(f"Total import time of '{module}': {total_ms:.2f} ms (budget {budget_ms:.0f} ms)")
+
+    ok = True
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        ok = False
+    if total_ms > budget_ms:
+        print("FAIL: startup budget exceeded")
+        ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.module, args.budget_ms, args.repeat, args.top) else 1)
+
+
+if __name__ == "__main__":
+    main()
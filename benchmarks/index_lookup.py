@@ -0,0 +1,111 @@
+"""
+Compares full table scans with primary key lookups on the events table.
+
+For every requested table size a temporary database is filled with synthetic
+events (one event per habit and day), and the per-habit queries used by the app
+are timed once with the (habit_id, day) primary key disabled for the lookup
+(the unary '+' keeps SQLite from using it) and once with the key in place.
+
+Usage:
+    python -m benchmarks.index_lookup [--sizes 10000 1000000 10000000] [--repeat 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date
+
+from db import get_db
+
+# Days of history per synthetic habit; the number of habits scales with the size
+DAYS_PER_HABIT = 3650
+
+QUERIES = {
+    "count": "SELECT COUNT(*) FROM events WHERE {hint}habit_id = ?",
+    "days": "SELECT day FROM events WHERE {hint}habit_id = ? ORDER BY day ASC",
+    "per_day": "SELECT day, COUNT(*) FROM events WHERE {hint}habit_id = ? GROUP BY day ORDER BY day ASC",
+}
+
+
+def fill_tracker(db, rows):
+    """
+    Fills the events table with the given number of synthetic events.
+
+    The events are written to the 'events' table directly rather than through
+    the 'tracker' view, whose insert trigger would look up the habit per row.
+
+    Args:
+        db: The database connection object.
+        rows (int): The number of tracker rows to insert.
+
+    Returns:
+        list of str: The names of the generated habits.
+    """
+    habit_count = max(1, -(-rows // DAYS_PER_HABIT))
+    names = [f"habit_{i:06d}" for i in range(habit_count)]
+    start = date(2000, 1, 1)
+
+    db.executemany(
+        "INSERT INTO counter (name, description, interval, period, creation) VALUES (?, '', 'daily', ?, ?)",
+        [(name, DAYS_PER_HABIT, start.isoformat()) for name in names],
+    )
+    ids = dict(db.execute("SELECT name, id FROM counter"))
+    habit_ids = [ids[name] for name in names]
+    first = start.toordinal()
+
+    def generate():
+        for i in range(rows):
+            yield habit_ids[i // DAYS_PER_HABIT], first + i % DAYS_PER_HABIT
+
+    db.executemany("INSERT INTO events (habit_id, day) VALUES (?, ?)", generate())
+    db.commit()
+    return names
+
+
+def time_query(db, sql, habit_id, repeat):
+    """
+    Returns the best wall time in milliseconds of running a query to completion.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db.execute(sql, (habit_id,)).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(sizes, repeat):
+    """
+    Runs the scan/index comparison for every size and prints a result table.
+
+    Args:
+        sizes (list of int): The events table sizes to benchmark.
+        repeat (int): How often each query is run; the best time is reported.
+    """
+    print(f"{'rows':>10} {'query':>9} {'scan ms':>10} {'index ms':>10} {'speedup':>9}")
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = get_db(os.path.join(tmp, "bench.db"))
+            db.execute("DELETE FROM counter")
+            names = fill_tracker(db, rows)
+            db.execute("ANALYZE")
+            # Probe the habit in the middle of the table
+            habit_id = db.execute("SELECT id FROM counter WHERE name = ?", (names[len(names) // 2],)).fetchone()[0]
+
+            for label, template in QUERIES.items():
+                scan = time_query(db, template.format(hint="+"), habit_id, repeat)
+                index = time_query(db, template.format(hint=""), habit_id, repeat)
+                print(f"{rows:>10} {label:>9} {scan:>10.3f} {index:>10.3f} {scan / index:>8.1f}x")
+            db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Load-tests the asyncio ingestion server with many concurrent clients.
+
+Starts an IngestionServer on a temporary database, connects the given number of
+clients and lets each send check-ins (and optionally streak reads) one after
+the other. Reports the p50/p99 request latency and the overall throughput.
+
+Usage:
+    python -m benchmarks.loadtest [--clients 50] [--requests 200] [--habits 20] [--read-ratio 0.1]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from db import get_db
+from server import IngestionServer, request
+
+
+async def run_client(address, habits, requests, read_ratio, seed):
+    """
+    Sends requests from a single client connection.
+
+    Returns:
+        list of float: The latency of every request in milliseconds.
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(*address)
+    latencies = []
+    for _ in range(requests):
+        habit = rng.choice(habits)
+        if rng.random() < read_ratio:
+            payload = {"op": "streak", "habit": habit}
+        else:
+            payload = {"op": "track", "habit": habit,
+                       "date": (date(2000, 1, 1) + timedelta(days=rng.randrange(3650))).isoformat()}
+        start = time.perf_counter()
+        response = await request(reader, writer, payload)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+    writer.close()
+    return latencies
+
+
+async def run(clients, requests, habit_count, read_ratio, readers):
+    """
+    Runs the load test and prints the latency distribution.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "loadtest.db")
+        db = get_db(path)
+        habits = [f"habit_{i:03d}" for i in range(habit_count)]
+        db.executemany(
+            "INSERT INTO counter (name, description, interval, period, creation) VALUES (?, '', 'daily', 3650, '2000-01-01')",
+            [(name,) for name in habits],
+        )
+        db.commit()
+        db.close()
+
+        server = IngestionServer(path, readers)
+        address = await server.start()
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(*(
+                run_client(address, habits, requests, read_ratio, seed) for seed in range(clients)
+            ))
+            elapsed = time.perf_counter() - start
+        finally:
+            await server.close()
+
+    latencies = [latency for client in results for latency in client]
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(f"{clients} clients x {requests} requests ({read_ratio:.0%} reads, {readers} readers)")
+    print(f"p50 {percentiles[49]:.2f} ms, p99 {percentiles[98]:.2f} ms, max {max(latencies):.2f} ms")
+    print(f"{len(latencies) / elapsed:.0f} requests/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--habits", type=int, default=20)
+    parser.add_argument("--read-ratio", type=float, default=0.1)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(run(args.clients, args.requests, args.habits, args.read_ratio, args.readers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compares the serial streak analysis of all habits with the parallel process pool runner.
+
+A temporary database is filled by the deterministic synthetic generator (see
+'benchmarks.synthetic'). 'analyse.analyze_all_streaks' is timed with a cleared
+result cache, then 'parallel.analyze_all_streaks_parallel' with an increasing
+number of worker processes. Every parallel result is checked against the
+serial one. The parallel times include starting the worker processes, so the
+speedup is limited by the number of CPU cores and small databases do not
+profit at all.
+
+Usage:
+    python -m benchmarks.parallel [--habits 2000] [--years 3] [--workers 1 2 4] [--rounds 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from analyse import analyze_all_streaks
+from benchmarks.synthetic import populate
+from cache import RESULT_CACHE
+from db import get_db
+from parallel import analyze_all_streaks_parallel
+
+
+def best_of(rounds, func, *args):
+    """
+    Returns the result and the best wall time in seconds of 'rounds' calls.
+    """
+    best = None
+    for _ in range(rounds):
+        RESULT_CACHE.clear()
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def run(habits, years, workers, rounds):
+    """
+    Runs the benchmark and prints the time and speedup per number of workers.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "parallel.db")
+        db = get_db(path, "fast")
+        with redirect_stdout(None):
+            populate(db, habits, years)
+        db.close()
+
+        db = get_db(path, "readonly")
+        try:
+            expected, serial = best_of(rounds, analyze_all_streaks, db)
+        finally:
+            db.close()
+
+        print(f"{len(expected)} habits over {years} years, {os.cpu_count()} CPUs")
+        print(f"{'workers':>7} {'seconds':>9} {'speedup':>8}")
+        print(f"{'serial':>7} {serial:>9.3f} {1:>8.2f}")
+        for count in workers:
+            result, seconds = best_of(rounds, analyze_all_streaks_parallel, path, count)
+            assert result == expected, f"Parallel result with {count} workers differs from the serial one"
+            print(f"{count:>7} {seconds:>9.3f} {serial / seconds:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--habits", type=int, default=2000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    run(args.habits, args.years, args.workers, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Compares event-insert and analysis latency across the get_db connection profiles.
+
+For every writable profile a fresh database is created and single events are
+recorded with increment_counter (one commit per event, as in the CLI). The
+analysis functions are then timed on a database holding a larger synthetic
+history, opened once per profile including "readonly".
+
+Usage:
+    python -m benchmarks.profiles [--events 2000] [--habits 100] [--days 1000]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from analyse import analyze_all_streaks, analyze_streak, total_tracker_habit
+from cache import RESULT_CACHE
+from db import PROFILES, bulk_increment, get_db, increment_counter
+
+
+def insert_latency(path, profile, events):
+    """
+    Times single-event inserts with a commit per event.
+
+    Returns:
+        list of float: The latency of every insert in milliseconds.
+    """
+    db = get_db(path, profile)
+    db.execute("INSERT INTO counter (name, description, interval, period, creation) "
+               "VALUES ('bench', '', 'daily', ?, '2000-01-01')", (events,))
+    db.commit()
+    start_date = date(2000, 1, 1)
+    latencies = []
+    for i in range(events):
+        event_date = (start_date + timedelta(days=i)).isoformat()
+        start = time.perf_counter()
+        increment_counter(db, "bench", event_date)
+        latencies.append((time.perf_counter() - start) * 1000)
+    db.close()
+    return latencies
+
+
+def fill_history(path, habits, days):
+    """
+    Creates a database with the given number of daily habits and days of history.
+
+    Returns:
+        list of str: The names of the generated habits.
+    """
+    db = get_db(path, "fast")
+    names = [f"habit_{i:04d}" for i in range(habits)]
+    db.executemany(
+        "INSERT INTO counter (name, description, interval, period, creation) VALUES (?, '', 'daily', ?, '2000-01-01')",
+        [(name, days) for name in names],
+    )
+    db.commit()
+    start_date = date(2000, 1, 1)
+    # Skip every seventh day so streaks are broken regularly
+    rows = (
+        ((start_date + timedelta(days=day)).isoformat(), name)
+        for name in names for day in range(days) if day % 7 != 6
+    )
+    bulk_increment(db, rows)
+    db.close()
+    return names
+
+
+def analysis_latency(path, profile, names):
+    """
+    Times the per-habit and batch analysis functions on an existing database.
+
+    The result cache is cleared before every timed section, so each function
+    runs against the database instead of returning results of an earlier run.
+
+    Returns:
+        dict: The mean latency in milliseconds per analysis function.
+    """
+    db = get_db(path, profile)
+    results = {}
+
+    RESULT_CACHE.clear()
+    start = time.perf_counter()
+    for name in names:
+        total_tracker_habit(db, name)
+    results["count"] = (time.perf_counter() - start) * 1000 / len(names)
+
+    RESULT_CACHE.clear()
+    start = time.perf_counter()
+    for name in names:
+        analyze_streak(db, name)
+    results["streak"] = (time.perf_counter() - start) * 1000 / len(names)
+
+    RESULT_CACHE.clear()
+    start = time.perf_counter()
+    analyze_all_streaks(db)
+    results["all_streaks"] = (time.perf_counter() - start) * 1000
+
+    db.close()
+    return results
+
+
+def run(events, habits, days):
+    """
+    Runs the insert and analysis benchmarks for every profile and prints the results.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Insert latency ({events} events, one commit each)")
+        print(f"{'profile':>10} {'mean ms':>9} {'p99 ms':>9} {'events/s':>10}")
+        for profile in PROFILES:
+            if profile == "readonly":
+                continue
+            latencies = insert_latency(os.path.join(tmp, f"insert_{profile}.db"), profile, events)
+            p99 = statistics.quantiles(latencies, n=100)[98]
+            print(f"{profile:>10} {statistics.mean(latencies):>9.3f} {p99:>9.3f} "
+                  f"{1000 / statistics.mean(latencies):>10.0f}")
+
+        path = os.path.join(tmp, "analysis.db")
+        names = fill_history(path, habits, days)
+        print(f"\nAnalysis latency ({habits} habits x {days} days)")
+        print(f"{'profile':>10} {'count ms':>9} {'streak ms':>10} {'all ms':>9}")
+        for profile in PROFILES:
+            results = analysis_latency(path, profile, names)
+            print(f"{profile:>10} {results['count']:>9.3f} {results['streak']:>10.3f} {results['all_streaks']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--habits", type=int, default=100)
+    parser.add_argument("--days", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.events, args.habits, args.days)
+
+
+if __name__ == "__main__":
+    main()
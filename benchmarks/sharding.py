@@ -0,0 +1,74 @@
+"""
+Compares the write throughput of a single database file with a sharded database.
+
+Writer threads record events for their own habits concurrently, once with all
+habits in one file and once spread over several shard files (see 'shard').
+Every event is a separate transaction, so with one file all commits queue for
+the same file lock, while commits to different shards proceed in parallel.
+The fan-out aggregation 'total_tracker' is timed afterwards.
+
+Usage:
+    python -m benchmarks.sharding [--shards 4] [--threads 8] [--events 200] [--profile durable]
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import date
+
+from shard import ShardedDatabase, shard_paths
+
+
+def run_writes(shards, threads, events):
+    """
+    Records 'events' events per thread, each thread on its own habit.
+
+    Returns:
+        float: The wall time in seconds.
+    """
+    first = date(2020, 1, 1).toordinal()
+
+    def write(thread):
+        name = f"habit_{thread:03d}"
+        for day in range(events):
+            shards.increment_counter(name, date.fromordinal(first + day).isoformat())
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(write, range(threads)))
+    return time.perf_counter() - start
+
+
+def run(shard_count, threads, events, profile):
+    """
+    Runs the benchmark for one file and for 'shard_count' shards and prints the results.
+    """
+    print(f"{threads} writer threads x {events} events, profile '{profile}'")
+    print(f"{'shards':>6} {'events/s':>10} {'total_tracker ms':>17}")
+    for count in (1, shard_count):
+        with tempfile.TemporaryDirectory() as tmp, redirect_stdout(None):
+            with ShardedDatabase(shard_paths(os.path.join(tmp, "main.db"), count), profile=profile) as shards:
+                for thread in range(threads):
+                    shards.add_counter(f"habit_{thread:03d}", "", "daily", events, "2020-01-01")
+                seconds = run_writes(shards, threads, events)
+                start = time.perf_counter()
+                total = shards.total_tracker()
+                fan_out = time.perf_counter() - start
+        assert total == threads * events
+        print(f"{count:>6} {threads * events / seconds:>10.0f} {fan_out * 1000:>17.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--profile", choices=["durable", "fast"], default="durable")
+    args = parser.parse_args()
+    run(args.shards, args.threads, args.events, args.profile)
+
+
+if __name__ == "__main__":
+    main()
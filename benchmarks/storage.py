@@ -0,0 +1,159 @@
+"""
+Compares database size and query time of the text and integer tracker layouts.
+
+A temporary database is created in the layout before schema version 5 (ISO
+date strings and habit names per tracker row) and filled with synthetic
+events. Its size and the per-habit and aggregate queries of the app are
+measured, then the database is migrated in place to the current schema
+(integer habit ids and day ordinals in the 'events' table) and measured again,
+both through the 'tracker' compatibility view and on 'events' directly.
+
+Usage:
+    python -m benchmarks.storage [--rows 1000000] [--repeat 5]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from db import bulk_increment, get_db, migrate
+
+# Days of history per synthetic habit; the number of habits scales with the size
+DAYS_PER_HABIT = 3650
+
+# Queries per layout: "text" is the layout before version 5, "view" and "events" the current one
+QUERIES = {
+    "count": {
+        "text": "SELECT COUNT(*) FROM tracker WHERE counterName = :name",
+        "view": "SELECT COUNT(*) FROM tracker WHERE counterName = :name",
+        "events": "SELECT COUNT(*) FROM events WHERE habit_id = (SELECT id FROM counter WHERE user_id = 1 AND name = :name)",
+    },
+    "dates": {
+        "text": "SELECT date FROM tracker WHERE counterName = :name ORDER BY date",
+        "view": "SELECT date FROM tracker WHERE counterName = :name ORDER BY date",
+        "events": "SELECT day FROM events WHERE habit_id = (SELECT id FROM counter WHERE user_id = 1 AND name = :name) ORDER BY day",
+    },
+    "range": {
+        "text": "SELECT COUNT(*) FROM tracker WHERE counterName = :name AND date BETWEEN '2003-01-01' AND '2003-12-31'",
+        "view": "SELECT COUNT(*) FROM tracker WHERE counterName = :name AND date BETWEEN '2003-01-01' AND '2003-12-31'",
+        "events": "SELECT COUNT(*) FROM events WHERE habit_id = (SELECT id FROM counter WHERE user_id = 1 AND name = :name) "
+                  f"AND day BETWEEN {date(2003, 1, 1).toordinal()} AND {date(2003, 12, 31).toordinal()}",
+    },
+    "total": {
+        "text": "SELECT COUNT(*) FROM tracker",
+        "view": "SELECT COUNT(*) FROM tracker",
+        "events": "SELECT COUNT(*) FROM events",
+    },
+}
+
+
+def create_text_layout(path, rows):
+    """
+    Creates a database in the layout before schema version 5 and fills it with synthetic events.
+
+    The events are written to a database in the current layout through
+    'bulk_increment' and copied from its 'tracker' view into the legacy tables.
+
+    Returns:
+        list of str: The names of the generated habits.
+    """
+    habit_count = max(1, -(-rows // DAYS_PER_HABIT))
+    names = [f"habit_{i:06d}" for i in range(habit_count)]
+    start = date(2000, 1, 1)
+    days = [(start + timedelta(days=i)).isoformat() for i in range(DAYS_PER_HABIT)]
+
+    source_path = path + ".source"
+    source = get_db(source_path, profile="fast")
+    # Only the synthetic habits, without the predefined ones
+    source.execute("DELETE FROM counter")
+    source.executemany("INSERT INTO counter (name, description, interval, period, creation) VALUES (?, '', 'daily', ?, ?)",
+                       [(name, DAYS_PER_HABIT, days[0]) for name in names])
+    bulk_increment(source, ((days[i % DAYS_PER_HABIT], names[i // DAYS_PER_HABIT]) for i in range(rows)))
+    source.close()
+
+    db = sqlite3.connect(path)
+    # The tables as created by 'db.create_table' before the events table existed
+    db.execute("CREATE TABLE counter (name TEXT PRIMARY KEY, description TEXT, interval TEXT, period INTEGER, "
+               "creation DATE)")
+    db.execute("CREATE TABLE tracker (date DATE NOT NULL, counterName TEXT NOT NULL, "
+               "FOREIGN KEY (counterName) REFERENCES counter(name))")
+    migrate(db, target=4)
+
+    db.execute("ATTACH DATABASE ? AS source", (source_path,))
+    db.execute("INSERT INTO main.counter SELECT name, description, interval, period, creation "
+               "FROM source.counter ORDER BY id")
+    db.execute("INSERT INTO main.tracker (date, counterName) SELECT date, counterName FROM source.tracker")
+    db.commit()
+    db.execute("DETACH DATABASE source")
+    db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(source_path + suffix):
+            os.remove(source_path + suffix)
+    return names
+
+
+def database_size(db):
+    """
+    Returns the size of the database in MB after compacting it.
+    """
+    db.execute("VACUUM")
+    page_count = db.execute("PRAGMA page_count").fetchone()[0]
+    page_size = db.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size / 2 ** 20
+
+
+def time_query(db, sql, name, repeat):
+    """
+    Returns the best wall time in milliseconds of running a query to completion.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db.execute(sql, {"name": name}).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(rows, repeat):
+    """
+    Measures both layouts and prints the results.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "storage.db")
+        names = create_text_layout(path, rows)
+        # Probe the habit in the middle of the table
+        name = names[len(names) // 2]
+
+        db = sqlite3.connect(path)
+        sizes = {"text": database_size(db)}
+        times = {label: {"text": time_query(db, layouts["text"], name, repeat)} for label, layouts in QUERIES.items()}
+
+        start = time.perf_counter()
+        migrate(db)
+        migration = time.perf_counter() - start
+        sizes["events"] = database_size(db)
+        for label, layouts in QUERIES.items():
+            for layout in ("view", "events"):
+                times[label][layout] = time_query(db, layouts[layout], name, repeat)
+        db.close()
+
+    print(f"{rows} tracker rows, migrated in {migration:.2f}s")
+    print(f"Database size: {sizes['text']:.1f} MB as text, {sizes['events']:.1f} MB as integers "
+          f"({sizes['events'] / sizes['text']:.0%})")
+    print(f"{'query':>8} {'text ms':>9} {'view ms':>9} {'events ms':>10}")
+    for label, result in times.items():
+        print(f"{label:>8} {result['text']:>9.3f} {result['view']:>9.3f} {result['events']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Benchmark suite for the public functions of db.py and analyse.py.
+
+A temporary database is filled by the deterministic synthetic generator (see
+'benchmarks.synthetic'), then every case is run for a number of rounds after
+one warm-up round. The result cache is cleared before each round, so cached
+functions are measured computing their result. Setup work of a case (e.g.
+removing the seed marker before 'initial_load_tracker') is not timed.
+
+The results are written in a JSON layout modelled on pytest-benchmark
+('benchmarks' entries with 'name' and 'stats' in seconds) and can be compared
+against a saved baseline, which prints the change of the median per case.
+
+Usage:
+    python -m benchmarks.suite [--habits 50] [--years 3] [--rounds 20] [--filter streak]
+        [--save baseline.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from contextlib import redirect_stdout
+from datetime import date
+
+import analyse
+import db as database
+from benchmarks.synthetic import END, INTERVAL_MIX, parse_mix, populate
+from cache import RESULT_CACHE
+
+# A benchmark case: 'setup(db, context, iteration)' returns the arguments of 'func(db, *args)'
+Case = namedtuple("Case", ["name", "func", "setup"])
+
+# Events per call of the bulk_increment case
+BULK_ROWS = 1000
+
+
+def _probe(interval):
+    """
+    Returns a setup function passing the name of the probe habit of an interval.
+    """
+    return lambda db, context, iteration: (context["probe"][interval],)
+
+
+def _fresh_name(db, context, iteration):
+    return (f"bench_add_{iteration:05d}", "", "daily", 31, END.isoformat())
+
+
+def _fresh_user(db, context, iteration):
+    return (f"bench_user_{iteration:05d}",)
+
+
+def _rename(db, context, iteration):
+    # Rename back and forth, so every round finds the habit under its current name
+    names = context["rename"]
+    return (names[iteration % 2], names[(iteration + 1) % 2])
+
+
+def _new_event(db, context, iteration):
+    # One new day per round after the synthetic history: the incremental streak path
+    return (context["probe"]["daily"], date.fromordinal(END.toordinal() + 1 + iteration).isoformat())
+
+
+def _bulk_events(db, context, iteration):
+    habit = f"bench_bulk_{iteration:05d}"
+    db.execute("INSERT INTO counter (name, description, interval, period, creation) VALUES (?, '', 'daily', ?, ?)",
+               (habit, BULK_ROWS, END.isoformat()))
+    db.commit()
+    first = END.toordinal()
+    return ([(date.fromordinal(first + day).isoformat(), habit) for day in range(BULK_ROWS)],)
+
+
+def _unseed(db, context, iteration):
+    # Remove the seed marker and the seeded events, so the full load runs every round
+    db.execute("DELETE FROM meta WHERE key = 'tracker_seed_version'")
+    db.execute("DELETE FROM events WHERE habit_id IN (SELECT id FROM counter WHERE name IN "
+               "('Meditation', 'Reading', 'Exercise', 'Cleaning'))")
+    db.commit()
+    return ()
+
+
+def _no_args(db, context, iteration):
+    return ()
+
+
+def _initial_load_tracker(db):
+    cur = db.cursor()
+    try:
+        database.initial_load_tracker(cur)
+        db.commit()
+    finally:
+        cur.close()
+
+
+def _plot_tracker_counts(db, habit_name):
+    import matplotlib.pyplot as plt
+
+    analyse.plot_tracker_counts(db, habit_name)
+    plt.close("all")
+
+
+CASES = [
+    # db.py
+    Case("db.get_db", lambda db, path: database.get_db(path).close(),
+         lambda db, context, iteration: (context["path"],)),
+    Case("db.create_table", database.create_table, _no_args),
+    Case("db.get_schema_version", database.get_schema_version, _no_args),
+    Case("db.migrate", database.migrate, _no_args),
+    Case("db.add_user", database.add_user, _fresh_user),
+    Case("db.get_user_id", database.get_user_id, lambda db, context, iteration: ("default",)),
+    Case("db.add_counter", database.add_counter, _fresh_name),
+    Case("db.rename_counter", database.rename_counter, _rename),
+    Case("db.get_counter_id", database.get_counter_id, _probe("daily")),
+    Case("db.increment_counter", database.increment_counter, _new_event),
+    Case("db.bulk_increment", database.bulk_increment, _bulk_events),
+    Case("db.rebuild_streak_state", database.rebuild_streak_state, _probe("daily")),
+    Case("db.rebuild_streak_state[all]", database.rebuild_streak_state, _no_args),
+    Case("db.rebuild_rollups[all]", database.rebuild_rollups, _no_args),
+    Case("db.get_streak_state", database.get_streak_state, _probe("daily")),
+    Case("db.get_counter_data", database.get_counter_data, _probe("daily")),
+    Case("db.get_predefined_habits", database.get_predefined_habits, _no_args),
+    Case("db.get_habit_dates", database.get_habit_dates, _probe("daily")),
+    Case("db.get_existing_habits", database.get_existing_habits, _no_args),
+    Case("db.get_existing_habits_short", database.get_existing_habits_short, _no_args),
+    Case("db.initial_load_tracker", _initial_load_tracker, _unseed),
+    # analyse.py
+    Case("analyse.total_habit", analyse.total_habit, _no_args),
+    Case("analyse.total_tracker", analyse.total_tracker, _no_args),
+    Case("analyse.total_tracker_habit", analyse.total_tracker_habit, _probe("daily")),
+    Case("analyse.total_tracker_per_habit", analyse.total_tracker_per_habit, _no_args),
+    Case("analyse.daily_count_series", analyse.daily_count_series, _probe("daily")),
+    Case("analyse.daily_count_series[weekly]", analyse.daily_count_series,
+         lambda db, context, iteration: (context["probe"]["daily"], None, None, "weekly")),
+    Case("analyse.daily_count_series[yearly]", analyse.daily_count_series,
+         lambda db, context, iteration: (context["probe"]["daily"], None, None, "yearly")),
+    Case("analyse.plot_tracker_counts", _plot_tracker_counts, _probe("daily")),
+    Case("analyse.get_streak[daily]", analyse.get_streak, _probe("daily")),
+    Case("analyse.get_streak[weekly]", analyse.get_streak, _probe("weekly")),
+    Case("analyse.get_materialized_streak", analyse.get_materialized_streak, _probe("daily")),
+    Case("analyse.analyze_streak", analyse.analyze_streak, _probe("daily")),
+    Case("analyse.analyze_all_streaks", analyse.analyze_all_streaks, _no_args),
+]
+
+
+def build_database(path, habits, years, adherence, intervals, seed):
+    """
+    Creates the benchmark database and picks the probe habits.
+
+    Returns:
+        dict: The context passed to the case setups: 'path', 'probe' (a habit name
+        per interval, the one with the most events) and 'rename' (two names of a
+        habit used by the rename case).
+    """
+    db = database.get_db(path, "fast")
+    with redirect_stdout(None):
+        generated = populate(db, habits, years, adherence, intervals, seed)
+        database.add_counter(db, "bench_rename_a", "", "daily", 31, END.isoformat())
+    db.close()
+
+    probe = {}
+    for name, interval, events in generated:
+        if interval not in probe or events > probe[interval][1]:
+            probe[interval] = (name, events)
+    probe = {interval: name for interval, (name, _) in probe.items()}
+    # Fall back to any habit if the mix has no habit of an interval
+    for interval in ("daily", "weekly"):
+        probe.setdefault(interval, generated[0][0])
+    return {"path": path, "probe": probe, "rename": ("bench_rename_a", "bench_rename_b")}
+
+
+def run_case(db, case, context, rounds):
+    """
+    Times a case and returns its statistics in seconds.
+    """
+    timings = []
+    for iteration in range(rounds + 1):
+        args = case.setup(db, context, iteration)
+        RESULT_CACHE.clear()
+        with redirect_stdout(None):
+            start = time.perf_counter()
+            case.func(db, *args)
+            elapsed = time.perf_counter() - start
+        if iteration:  # The first round warms up the page cache and the statement cache
+            timings.append(elapsed)
+    return {
+        "min": min(timings),
+        "max": max(timings),
+        "mean": statistics.fmean(timings),
+        "median": statistics.median(timings),
+        "stddev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "rounds": len(timings),
+    }
+
+
+def run(habits, years, adherence, intervals, seed, rounds, profile, pattern=None):
+    """
+    Runs the benchmark suite.
+
+    Returns:
+        dict: The results in the JSON layout described in the module docstring.
+    """
+    import matplotlib
+
+    # Plots are rendered without a window
+    matplotlib.use("Agg")
+
+    results = {
+        "machine_info": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "params": {"habits": habits, "years": years, "adherence": adherence, "intervals": intervals,
+                   "seed": seed, "rounds": rounds, "profile": profile},
+        "benchmarks": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "suite.db")
+        context = build_database(path, habits, years, adherence, intervals, seed)
+        db = database.get_db(path, profile)
+        try:
+            for case in CASES:
+                if pattern and pattern not in case.name:
+                    continue
+                stats = run_case(db, case, context, rounds)
+                results["benchmarks"].append({"name": case.name, "stats": stats})
+                print(f"{case.name:<40} {stats['median'] * 1000:>10.3f} ms  (min {stats['min'] * 1000:.3f})",
+                      file=sys.stderr)
+        finally:
+            db.close()
+    return results
+
+
+def compare(results, baseline):
+    """
+    Prints the change of the median time per case against a baseline.
+    """
+    previous = {entry["name"]: entry["stats"]["median"] for entry in baseline["benchmarks"]}
+    print(f"{'case':<40} {'baseline ms':>12} {'current ms':>11} {'change':>8}")
+    for entry in results["benchmarks"]:
+        current = entry["stats"]["median"]
+        before = previous.get(entry["name"])
+        if before is None:
+            print(f"{entry['name']:<40} {'-':>12} {current * 1000:>11.3f} {'new':>8}")
+        else:
+            print(f"{entry['name']:<40} {before * 1000:>12.3f} {current * 1000:>11.3f} "
+                  f"{current / before - 1:>+8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--habits", type=int, default=50)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--adherence", type=float, default=0.8)
+    parser.add_argument("--intervals", nargs="+", default=[f"{k}={v}" for k, v in INTERVAL_MIX.items()])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--profile", choices=["durable", "fast"], default="durable")
+    parser.add_argument("--filter", help="only run cases whose name contains this text")
+    parser.add_argument("--save", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="compare the results with a saved JSON baseline")
+    args = parser.parse_args()
+
+    results = run(args.habits, args.years, args.adherence, parse_mix(args.intervals), args.seed, args.rounds,
+                  args.profile, args.filter)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            compare(results, json.load(file))
+    elif not args.save:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Deterministic generator of synthetic habits and tracking events.
+
+The same parameters and seed always produce the same database content, so
+benchmark results of different commits are comparable. Every habit gets an
+interval from the configured mix and is tracked for the given number of years
+up to a fixed end date; in every interval it is done with the probability
+'adherence' (once per day for daily habits, on one or more random days of the
+interval otherwise).
+
+Usage:
+    python -m benchmarks.synthetic out.db [--habits 50] [--years 3] [--adherence 0.8]
+        [--intervals daily=0.6 weekly=0.3 monthly=0.1] [--seed 0]
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from db import get_db, rebuild_streak_state
+from streak import interval_index, interval_start
+
+# Last day of the generated history; fixed so the data does not depend on the current date
+END = date(2024, 12, 31)
+
+# Default share of the habits per interval
+INTERVAL_MIX = {"daily": 0.6, "weekly": 0.3, "monthly": 0.1}
+
+# Maximum number of events of a habit done in a non-daily interval
+MAX_EVENTS_PER_INTERVAL = 3
+
+
+def generate_events(rng, creation, end, interval, adherence):
+    """
+    Generates the event days of one habit.
+
+    Args:
+        rng (random.Random): The random number generator.
+        creation (date): The first day of the history.
+        end (date): The last day of the history.
+        interval (str): The interval type of the habit.
+        adherence (float): The probability that the habit is done in an interval.
+
+    Returns:
+        list of int: The event days as sorted, distinct day ordinals.
+    """
+    first, last = creation.toordinal(), end.toordinal()
+    if interval == "daily":
+        return [day for day in range(first, last + 1) if rng.random() < adherence]
+
+    days = []
+    for index in range(interval_index(end, creation, interval) + 1):
+        start = max(interval_start(index, creation, interval).toordinal(), first)
+        stop = min(interval_start(index + 1, creation, interval).toordinal() - 1, last)
+        if rng.random() < adherence:
+            count = min(rng.randint(1, MAX_EVENTS_PER_INTERVAL), stop - start + 1)
+            days.extend(sorted(rng.sample(range(start, stop + 1), count)))
+    return days
+
+
+def populate(db, habits=50, years=3, adherence=0.8, intervals=None, seed=0, prefix="habit"):
+    """
+    Adds synthetic habits and their events to a database.
+
+    Events are written to the 'events' table directly and the materialized
+    streak state is rebuilt once at the end.
+
+    Args:
+        db: The database connection object.
+        habits (int, optional): The number of habits. Defaults to 50.
+        years (int, optional): The years of history per habit. Defaults to 3.
+        adherence (float, optional): The probability that a habit is done in an interval. Defaults to 0.8.
+        intervals (dict, optional): The share of habits per interval type. Defaults to INTERVAL_MIX.
+        seed (int, optional): The random seed. Defaults to 0.
+        prefix (str, optional): The prefix of the habit names. Defaults to "habit".
+
+    Returns:
+        list of tuple: (name, interval, number of events) per generated habit.
+    """
+    rng = random.Random(seed)
+    intervals = intervals or INTERVAL_MIX
+    kinds, weights = list(intervals), list(intervals.values())
+    creation = END - timedelta(days=round(365.25 * years) - 1)
+
+    generated = []
+    for number in range(habits):
+        name = f"{prefix}_{number:05d}"
+        interval = rng.choices(kinds, weights)[0]
+        period = interval_index(END, creation, interval) + 1
+        cur = db.execute(
+            "INSERT INTO counter (name, description, interval, period, creation) VALUES (?, ?, ?, ?, ?)",
+            (name, f"Synthetic {interval} habit", interval, period, creation.isoformat()),
+        )
+        days = generate_events(rng, creation, END, interval, adherence)
+        db.executemany("INSERT INTO events (habit_id, day) VALUES (?, ?)",
+                       [(cur.lastrowid, day) for day in days])
+        generated.append((name, interval, len(days)))
+    db.commit()
+    rebuild_streak_state(db)
+    return generated
+
+
+def parse_mix(values):
+    """
+    Parses "interval=share" arguments into an interval mix.
+    """
+    mix = {}
+    for value in values:
+        interval, _, share = value.partition("=")
+        mix[interval] = float(share or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", help="database file to fill")
+    parser.add_argument("--habits", type=int, default=50)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--adherence", type=float, default=0.8)
+    parser.add_argument("--intervals", nargs="+", default=[f"{k}={v}" for k, v in INTERVAL_MIX.items()])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    db = get_db(args.path, "fast")
+    generated = populate(db, args.habits, args.years, args.adherence, parse_mix(args.intervals), args.seed)
+    db.close()
+    print(f"Generated {len(generated)} habits with {sum(events for *_, events in generated)} events "
+          f"in '{args.path}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+
+# Cache scopes: which writes invalidate a cached result
+HABITS = "habits"  # The list of habits; changed by adding or removing habits
+TRACKER = "tracker"  # Aggregates over all habits; changed by any tracker write
+HABIT = "habit"  # Per-habit results; changed by writes for that habit
+
+
+class ResultCache:
+    """
+    A bounded LRU cache for read results with tag-based invalidation.
+
+    Every entry belongs to a database file and carries tags naming the data it
+    was computed from. Write functions invalidate the tags they affect, so only
+    the results that can have changed are dropped. Hit, miss and eviction
+    counters are kept for inspection.
+
+    Attributes:
+        maxsize (int): The maximum number of entries before the least recently used is evicted.
+        enabled (bool): If False, lookups always miss and nothing is stored.
+        hits (int): The number of lookups answered from the cache.
+        misses (int): The number of lookups that had to be computed.
+        evictions (int): The number of entries dropped because the cache was full.
+        generation (int): Incremented by every invalidation; results computed before an
+            invalidation are not stored, so a read racing a write cannot cache stale data.
+
+    Args:
+        maxsize (int, optional): Defaults to 1024.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+        self._entries = OrderedDict()  # key -> (value, tags)
+        self._tags = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Looks up an entry and marks it as most recently used.
+
+        Returns:
+            tuple: (True, value) on a hit, (False, None) on a miss.
+        """
+        with self._lock:
+            if self.enabled and key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key][0]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value, tags, generation=None):
+        """
+        Stores an entry, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key: The entry key.
+            value: The cached result.
+            tags (tuple): The tags that invalidate the entry.
+            generation (int, optional): The generation read before computing the value;
+                the entry is not stored if an invalidation happened since.
+        """
+        with self._lock:
+            if not self.enabled or (generation is not None and generation != self.generation):
+                return
+            self._discard(key)
+            self._entries[key] = (value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tags):
+        """
+        Drops all entries carrying any of the given tags.
+
+        Args:
+            tags (iterable): The invalidated tags.
+
+        Returns:
+            int: The number of dropped entries.
+        """
+        with self._lock:
+            self.generation += 1
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.get(tag, set())
+            for key in keys:
+                self._discard(key)
+            return len(keys)
+
+    def invalidate_database(self, database):
+        """
+        Drops all entries of a database file.
+
+        Args:
+            database (str): The database key (see 'database_key').
+
+        Returns:
+            int: The number of dropped entries.
+        """
+        with self._lock:
+            self.generation += 1
+            keys = [key for key in self._entries if key[0] == database]
+            for key in keys:
+                self._discard(key)
+            return len(keys)
+
+    def clear(self):
+        """
+        Drops all entries and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """
+        Returns the cache statistics.
+
+        Returns:
+            dict: 'hits', 'misses', 'evictions', 'size' and 'maxsize'.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "size": len(self._entries), "maxsize": self.maxsize}
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._tags.get(tag)
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+
+# The process-wide cache used by the db and analyse functions
+RESULT_CACHE = ResultCache()
+
+
+class CachedConnection(sqlite3.Connection):
+    """
+    A connection whose reads may be answered from RESULT_CACHE ('db.get_db' opens these).
+
+    'PRAGMA data_version' of a connection changes whenever another connection,
+    in this or another process, commits to the database file. Before a cached
+    result is served, the current value is compared with the last one seen by
+    this connection; on a change (or the first read of the connection), all
+    cached results of the file are dropped. Writes of the connection itself do
+    not change the value and are covered by the invalidation functions below.
+    Reads on other connections bypass the cache.
+
+    Attributes:
+        data_version (int): The 'PRAGMA data_version' seen by the last cached read, or None.
+    """
+    data_version = None
+
+
+def database_key(db):
+    """
+    Identifies the database file of a connection, so that all connections to
+    the same file share cache entries and invalidations.
+
+    Args:
+        db: The database connection object.
+
+    Returns:
+        str: The file path, or a per-connection key for in-memory databases.
+    """
+    path = db.execute("PRAGMA database_list").fetchone()[2]
+    return path or f":memory:{id(db)}"
+
+
+def cached(scope, daily=False):
+    """
+    Caches the results of a read function 'func(db, *args, **kwargs)' in RESULT_CACHE.
+
+    Only calls on a CachedConnection use the cache; the results are dropped once
+    another connection committed to the file (see CachedConnection).
+
+    Args:
+        scope (str): HABITS, TRACKER or HABIT. For HABIT, the first argument after
+            'db' is the habit name and must be passed positionally; habits of
+            different users with the same name share their invalidations.
+        daily (bool, optional): The result depends on the current date (e.g. streaks),
+            so it is cached per day. Defaults to False.
+
+    Returns:
+        The decorator.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(db, *args, **kwargs):
+            if not isinstance(db, CachedConnection):
+                return func(db, *args, **kwargs)
+            database = database_key(db)
+            version = db.execute("PRAGMA data_version").fetchone()[0]
+            if version != db.data_version:
+                # The file was changed by another connection since this one last read it
+                RESULT_CACHE.invalidate_database(database)
+                db.data_version = version
+            tag = (database, scope, args[0]) if scope == HABIT else (database, scope)
+            key = (database, func.__name__, args, tuple(sorted(kwargs.items())), date.today() if daily else None)
+
+            generation = RESULT_CACHE.generation
+            hit, value = RESULT_CACHE.get(key)
+            if not hit:
+                value = func(db, *args, **kwargs)
+                RESULT_CACHE.put(key, value, (tag,), generation)
+            # Hand out copies of containers, so callers cannot modify cached results
+            return value.copy() if isinstance(value, (list, dict)) else value
+        return wrapper
+    return decorator
+
+
+def invalidate_habits(db, *names):
+    """
+    Invalidates cached results after habits were added, removed or renamed.
+
+    Args:
+        db: The database connection object.
+        *names (str): The names of the affected habits.
+    """
+    database = database_key(db)
+    RESULT_CACHE.invalidate([(database, HABITS), (database, TRACKER)] + [(database, HABIT, name) for name in names])
+
+
+def invalidate_tracker(db, *names):
+    """
+    Invalidates cached results after tracker events of the given habits changed.
+
+    Args:
+        db: The database connection object.
+        *names (str): The names of the affected habits.
+    """
+    database = database_key(db)
+    RESULT_CACHE.invalidate([(database, TRACKER)] + [(database, HABIT, name) for name in names])
+
+
+def invalidate_database(db):
+    """
+    Invalidates all cached results of a database file, e.g. after a new connection
+    was opened, as the file may have been changed or replaced in the meantime.
+
+    Args:
+        db: The database connection object.
+    """
+    RESULT_CACHE.invalidate_database(database_key(db))
@@ -1,32 +1,43 @@
-from db import add_counter, increment_counter
+from db import DEFAULT_USER_ID, add_counter, rename_counter, get_counter_id, increment_counter, bulk_increment
+from cache import invalidate_habits
+from instrument import instrumented
 from datetime import datetime
+import sys
+import time
 
 class Counter:
     """
     A class to represent a counter for tracking events.
 
     Attributes:
+        id (int): The id of the counter in the database, or None until it is stored or looked up.
         name (str): The name of the counter.
         description (str): A brief description of the counter's purpose.
         interval (str): The interval for the counter (e.g., daily, weekly).
         creation (str): The creation date of the counter in 'YYYY-MM-DD' format. Defaults to the current date.
         count (int): The current count of events. Defaults to 0.
+        user_id (int): The id of the user owning the counter.
 
     Args:
         name (str): The name of the counter.
         description (str): A description of the counter.
         interval (str): The interval type for the counter.
         creation (str, optional): The creation timestamp. Defaults to the current date.
+        user_id (int, optional): The id of the owning user. Defaults to DEFAULT_USER_ID.
     """
 
-    def __init__(self, name: str, description: str, interval: str, period: str, creation=None):
+    def __init__(self, name: str, description: str, interval: str, period: str, creation=None,
+                 user_id: int = DEFAULT_USER_ID):
+        self.id = None
         self.name = name
         self.description = description
         self.interval = interval
         self.period = period
         self.creation = creation or datetime.now().strftime('%Y-%m-%d')
         self.count = 0
+        self.user_id = user_id
 
+    @instrumented
     def delete(self, db):
         """
         Deletes the counter and all associated tracking data from the database.
@@ -40,21 +51,26 @@ class Counter:
         Side Effects:
             - Removes the counter from the 'counter' table.
             - Removes all associated entries from the 'tracker' table.
+            - Removes the counter's materialized streak state.
             - Commits the changes to the database.
+            - Invalidates the cached results of the counter and the habit lists.
             - Prints a success or error message to the console.
         """
         try:
             cur = db.cursor()
 
-            # Delete the counter from the counter table
-            cur.execute("DELETE FROM counter WHERE name = ?", (self.name,))
-            counter_deleted = cur.rowcount  # Number of deleted rows in counter
+            self.id = get_counter_id(db, self.name, self.user_id)
+
+            # Delete associated tracking events
+            cur.execute("DELETE FROM events WHERE habit_id = ?", (self.id,))
+            tracker_deleted = cur.rowcount  # Number of deleted tracker entries
 
-            # Delete associated entries from the tracker table
-            cur.execute("DELETE FROM tracker WHERE counterName = ?", (self.name,))
-            tracker_deleted = cur.rowcount  # Number of deleted rows in tracker
+            # Delete the counter from the counter table; its streak state is removed by a trigger
+            cur.execute("DELETE FROM counter WHERE id = ?", (self.id,))
+            counter_deleted = cur.rowcount  # Number of deleted rows in counter
 
             db.commit()
+            invalidate_habits(db, self.name)
 
             # Provide confirmation based on deletion results
             if counter_deleted > 0:
@@ -70,6 +86,7 @@ class Counter:
             # Close the cursor to ensure cleanup
             cur.close()
 
+    @instrumented
     def reset(self, db):
         """
         Resets the counter by deleting all associated tracking data
@@ -80,21 +97,26 @@ class Counter:
 
         Side Effects:
             - Removes all entries in the 'tracker' table associated with this counter.
+            - Removes the counter's materialized streak state.
             - Commits the changes to the database.
+            - Invalidates the cached results of the counter and the habit lists.
             - Prints a success or error message to the console.
         """
         try:
             cur = db.cursor()
 
-            # Delete associated entries from the tracker table
-            cur.execute("DELETE FROM tracker WHERE counterName = ?", (self.name,))
-            tracker_deleted = cur.rowcount  # Number of deleted rows in tracker
+            self.id = get_counter_id(db, self.name, self.user_id)
 
-            # Delete the counter itself
-            cur.execute("DELETE FROM counter WHERE name = ?", (self.name,))
+            # Delete associated tracking events
+            cur.execute("DELETE FROM events WHERE habit_id = ?", (self.id,))
+            tracker_deleted = cur.rowcount  # Number of deleted tracker entries
+
+            # Delete the counter itself; its streak state is removed by a trigger
+            cur.execute("DELETE FROM counter WHERE id = ?", (self.id,))
             counter_deleted = cur.rowcount  # Number of deleted rows in counter
 
             db.commit()
+            invalidate_habits(db, self.name)
 
             # Provide confirmation based on deletion results
             if counter_deleted > 0:
@@ -111,6 +133,7 @@ class Counter:
             # Close the cursor to ensure cleanup
             cur.close()
 
+    @instrumented
     def store(self, db):
         """
         Store the counter in the database.
@@ -118,18 +141,141 @@ class Counter:
         Args:
             db: The database connection object.
         """
-        add_counter(db, self.name, self.description, self.interval, self.period, self.creation)
+        self.id = add_counter(db, self.name, self.description, self.interval, self.period, self.creation,
+                              self.user_id)
+
+    @instrumented
+    def rename(self, db, new_name: str):
+        """
+        Renames the counter in the database, keeping its tracking history.
+
+        Args:
+            db: The database connection object.
+            new_name (str): The new name of the counter.
+
+        Returns:
+            bool: True if the counter was renamed.
+        """
+        if not rename_counter(db, self.name, new_name, self.user_id):
+            return False
+        self.name = new_name
+        return True
 
-    def add_event(self, db, date: str = None):
+    @instrumented
+    def add_event(self, db, date: str = None, session=None):
         """
         Add an event for this counter to the database.
 
         Args:
             db: The database connection object.
             date (str): The date of the event (in 'YYYY-MM-DD' format). Defaults to today's date.
+            session (TrackerSession, optional): If given, the event is buffered in the
+                session and written with its next group commit instead of immediately.
+                The session must belong to the same user as the counter.
         """
         if date is None:
             from datetime import datetime
             date = datetime.now().strftime('%Y-%m-%d')
 
-        increment_counter(db, self.name, date)
\ No newline at end of file
+        if session is not None:
+            session.add_event(self.name, date)
+        else:
+            increment_counter(db, self.name, date, self.user_id)
+
+
+class TrackerSession:
+    """
+    Buffers tracking events and writes them in group commits.
+
+    Events are collected in memory and flushed with a single transaction when
+    an event is added while 'max_events' are pending or the oldest pending
+    event is at least 'max_delay' seconds old. There is no background timer:
+    an idle session keeps its events until the next 'add_event', 'flush' or
+    the end of the block. Used as a context manager, the session flushes all
+    pending events on exit, also when the block raises an exception, so
+    accepted events are not lost. If that flush fails as well, its error is
+    reported and the block's exception is raised; the events stay pending.
+
+    Attributes:
+        db: The database connection object.
+        max_events (int): The number of pending events that triggers a flush.
+        max_delay (float): The age in seconds of the oldest pending event at which the next
+            'add_event' flushes the session.
+        inserted (int): The number of events written so far.
+        rejected (int): The number of events dropped because their habit does not exist.
+        user_id (int): The user whose habits receive the events.
+
+    Args:
+        db: The database connection object.
+        max_events (int, optional): Defaults to 1000.
+        max_delay (float, optional): Defaults to 1.0 second.
+        user_id (int, optional): Defaults to DEFAULT_USER_ID.
+    """
+
+    def __init__(self, db, max_events: int = 1000, max_delay: float = 1.0, user_id: int = DEFAULT_USER_ID):
+        self.db = db
+        self.user_id = user_id
+        self.max_events = max_events
+        self.max_delay = max_delay
+        self.inserted = 0
+        self.rejected = 0
+        self._pending = []
+        self._oldest = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+            return False
+        try:
+            self.flush()
+        except Exception as error:
+            # The block's exception is re-raised; a failed flush must not replace it
+            print(f"Error flushing {self.pending} pending events: {error}", file=sys.stderr)
+        return False
+
+    @property
+    def pending(self):
+        """int: The number of buffered events not yet written."""
+        return len(self._pending)
+
+    def add_event(self, name: str, date: str = None):
+        """
+        Buffers an event and flushes the session if a threshold is reached.
+
+        Args:
+            name (str): The name of the counter.
+            date (str): The date of the event (in 'YYYY-MM-DD' format). Defaults to today's date.
+        """
+        if date is None:
+            date = datetime.now().strftime('%Y-%m-%d')
+
+        if not self._pending:
+            self._oldest = time.monotonic()
+        self._pending.append((date, name))
+
+        if len(self._pending) >= self.max_events or time.monotonic() - self._oldest >= self.max_delay:
+            self.flush()
+
+    @instrumented
+    def flush(self):
+        """
+        Writes all pending events in one transaction.
+
+        Returns:
+            int: The number of newly inserted events.
+
+        Raises:
+            sqlite3.Error: If the write fails; the events stay pending.
+        """
+        if not self._pending:
+            return 0
+
+        # Pending events are only discarded once the transaction succeeded
+        inserted, rejected = bulk_increment(self.db, self._pending, len(self._pending), self.user_id)
+        self._pending = []
+        self.inserted += inserted
+        self.rejected += rejected
+        return inserted
\ No newline at end of file
@@ -1,19 +1,96 @@
 import sqlite3
+from dataclasses import astuple
 from datetime import date
-
-
-def get_db(name="main.db"):
+from itertools import islice
+from pathlib import Path
+from streak import StreakState
+from cache import HABITS, CachedConnection, cached, invalidate_database, invalidate_habits, invalidate_tracker
+from instrument import attach, enabled, instrumented
+
+
+# Connection settings per performance profile, applied as PRAGMA statements
+PROFILES = {
+    # WAL with full fsync on every commit: no committed event is ever lost
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+    },
+    # WAL with fsync only at checkpoints: a power loss may drop the latest commits
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+    },
+    # Read-only access for analysis, e.g. from worker processes or threads
+    "readonly": {
+        "query_only": "ON",
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+    },
+}
+
+# SQL expression converting an ISO date column to its proleptic Gregorian ordinal (date.toordinal)
+ORDINAL_SQL = "CAST(julianday({0}) - 1721424.5 AS INTEGER)"
+
+# SQL expression converting a day ordinal column back to an ISO date string
+DATE_SQL = "date({0} + 1721424.5)"
+
+# SQL expressions mapping a day ordinal to the ordinal of the first day of its rollup bucket.
+# There is no daily rollup: 'events' holds at most one row per habit and day already.
+ROLLUP_GRAINS = {
+    # Ordinal 1 (0001-01-01) is a Monday, so weeks are ISO weeks
+    "weekly": "{0} - ({0} - 1) % 7",
+    "monthly": "CAST(julianday({0} + 1721424.5, 'start of month') - 1721424.5 AS INTEGER)",
+    "yearly": "CAST(julianday({0} + 1721424.5, 'start of year') - 1721424.5 AS INTEGER)",
+}
+
+
+@instrumented
+def get_db(name="main.db", profile="durable", **connect_args):
     """
     Connects to the specified SQLite database, initializes necessary tables, and returns the database connection.
 
+    The connection is tuned according to a named performance profile (see
+    PROFILES). The schema is only created or migrated if its version is not
+    current, so reconnecting to an up-to-date database runs no DDL. The
+    "readonly" profile opens the file in read-only mode and never touches the
+    schema.
+
     Args:
         name (str): The name of the database file. Defaults to "main.db".
+        profile (str): "durable", "fast" or "readonly". Defaults to "durable".
+        **connect_args: Further arguments for 'sqlite3.connect', e.g. 'cached_statements'
+            or 'check_same_thread'.
 
     Returns:
-        sqlite3.Connection: The database connection object.
+        cache.CachedConnection: The database connection object.
+
+    Raises:
+        ValueError: If the profile is unknown.
     """
-    db = sqlite3.connect(name)
-    create_table(db)
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown database profile '{profile}'. Use one of: {', '.join(PROFILES)}.")
+
+    # Reads of the app's connections may be answered from the result cache
+    connect_args.setdefault("factory", CachedConnection)
+    if profile == "readonly":
+        db = sqlite3.connect(f"{Path(name).absolute().as_uri()}?mode=ro", uri=True, **connect_args)
+    else:
+        db = sqlite3.connect(name, **connect_args)
+    if enabled():
+        attach(db)
+
+    for pragma, value in PROFILES[profile].items():
+        db.execute(f"PRAGMA {pragma} = {value}")
+
+    if profile != "readonly":
+        if get_schema_version(db) != SCHEMA_VERSION:
+            create_table(db)
+        # The file may have been changed by other processes since results were cached
+        invalidate_database(db)
     return db
 
 def create_table(db):
@@ -22,7 +99,8 @@ def create_table(db):
 
     This function sets up the database schema by creating the 'counter', 'tracker',
     and 'predefinedHabits' tables. It also populates the 'counter' and
-    'predefinedHabits' tables with default values if they are empty.
+    'predefinedHabits' tables with default values if they are empty. Finally, any
+    pending schema migrations are applied (see 'migrate').
 
     Args:
         db: The database connection object.
@@ -89,9 +167,469 @@ def create_table(db):
         cur.executemany("INSERT INTO predefinedHabits (name, description, interval) VALUES (?, ?, ?)", prehabits)
 
     db.commit()
+    cur.close()
+
+    # Bring the schema up to the current version
+    migrate(db)
+
+
+def _migrate_v1(cur):
+    """
+    Deduplicates tracker events and adds a unique (counterName, date) index.
+
+    The index covers every per-habit lookup on the tracker table (count, date
+    listing, grouping by date), so these queries no longer scan the full table.
+
+    Args:
+        cur: Cursor object of the database connection.
+    """
+    # Keep only the first row of every (counterName, date) pair
+    cur.execute("""
+        DELETE FROM tracker
+        WHERE rowid NOT IN (
+            SELECT MIN(rowid) FROM tracker GROUP BY counterName, date
+        )
+    """)
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_tracker_counter_date
+        ON tracker (counterName, date)
+    """)
+
+
+def _migrate_v2(cur):
+    """
+    Adds the materialized 'streak_state' table; it is filled by '_migrate_v6'.
+
+    Args:
+        cur: Cursor object of the database connection.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS streak_state (
+            counterName TEXT PRIMARY KEY,
+            current_streak INTEGER NOT NULL,
+            longest_streak INTEGER NOT NULL,
+            last_interval INTEGER NOT NULL,
+            last_event DATE,
+            intervals_covered INTEGER NOT NULL,
+            tracking_entries INTEGER NOT NULL,
+            breaks INTEGER NOT NULL,
+            FOREIGN KEY (counterName) REFERENCES counter(name)
+        )
+    """)
+
+
+def _migrate_v3(cur):
+    """
+    Adds the 'meta' key/value table for database-level settings such as the seed version.
+
+    Args:
+        cur: Cursor object of the database connection.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+
+
+def _migrate_v4(cur):
+    """
+    Discards the streak state after intervals switched to calendar buckets.
+
+    The state is recomputed from the history by '_migrate_v6'.
+
+    Args:
+        cur: Cursor object of the database connection.
+    """
+    cur.execute("DELETE FROM streak_state")
+
+
+def _migrate_v5(cur):
+    """
+    Moves tracker events into the compact 'events' table and turns 'tracker' into a view.
+
+    Habits get an integer id, and every event is stored as (habit id, day
+    ordinal) in a WITHOUT ROWID table clustered by its primary key, instead of
+    repeating the habit name and an ISO date string per row. The 'tracker'
+    view presents the events in the previous layout; INSTEAD OF triggers map
+    inserts and deletes on the view to 'events', so existing queries keep
+    working. Events of unknown habits or with invalid dates cannot be stored
+    in the new layout and are dropped.
+
+    Args:
+        cur: Cursor object of the database connection.
+    """
+    # Rebuild 'counter' with an integer primary key, keeping the habit order
+    cur.execute("""
+        CREATE TABLE counter_v5 (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            description TEXT,
+            interval TEXT,
+            period INTEGER,
+            creation DATE
+        )
+    """)
+    cur.execute("""
+        INSERT INTO counter_v5 (name, description, interval, period, creation)
+        SELECT name, description, interval, period, creation FROM counter ORDER BY rowid
+    """)
+    cur.execute("DROP TABLE counter")
+    cur.execute("ALTER TABLE counter_v5 RENAME TO counter")
+
+    cur.execute("""
+        CREATE TABLE events (
+            habit_id INTEGER NOT NULL REFERENCES counter(id),
+            day INTEGER NOT NULL,
+            PRIMARY KEY (habit_id, day)
+        ) WITHOUT ROWID
+    """)
+    cur.execute(f"""
+        INSERT OR IGNORE INTO events (habit_id, day)
+        SELECT c.id, {ORDINAL_SQL.format("t.date")} AS day
+        FROM tracker t
+        JOIN counter c ON c.name = t.counterName
+        WHERE day IS NOT NULL
+        ORDER BY 1, 2
+    """)
+    cur.execute("DROP TABLE tracker")
+
+    # Compatibility view with the columns of the former 'tracker' table
+    cur.execute(f"""
+        CREATE VIEW tracker (date, counterName) AS
+        SELECT {DATE_SQL.format("e.day")}, c.name
+        FROM events e
+        JOIN counter c ON c.id = e.habit_id
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER tracker_insert INSTEAD OF INSERT ON tracker
+        BEGIN
+            INSERT OR IGNORE INTO events (habit_id, day)
+            SELECT id, {ORDINAL_SQL.format("NEW.date")} FROM counter WHERE name = NEW.counterName;
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER tracker_delete INSTEAD OF DELETE ON tracker
+        BEGIN
+            DELETE FROM events
+            WHERE habit_id = (SELECT id FROM counter WHERE name = OLD.counterName)
+              AND day = {ORDINAL_SQL.format("OLD.date")};
+        END
+    """)
+    # Events of a deleted habit are deleted with it
+    cur.execute("""
+        CREATE TRIGGER counter_delete AFTER DELETE ON counter
+        BEGIN
+            DELETE FROM events WHERE habit_id = OLD.id;
+        END
+    """)
+
+
+def _migrate_v6(cur):
+    """
+    Keys the materialized streak state by habit id and recomputes it.
+
+    Habits can be renamed in place since their events reference the id, so no
+    table refers to a habit by name anymore. The state of a deleted habit is
+    removed together with its events.
+
+    Args:
+        cur: Cursor object of the database connection.
+    """
+    cur.execute("DROP TABLE streak_state")
+    cur.execute("""
+        CREATE TABLE streak_state (
+            habit_id INTEGER PRIMARY KEY REFERENCES counter(id),
+            current_streak INTEGER NOT NULL,
+            longest_streak INTEGER NOT NULL,
+            last_interval INTEGER NOT NULL,
+            last_event DATE,
+            intervals_covered INTEGER NOT NULL,
+            tracking_entries INTEGER NOT NULL,
+            breaks INTEGER NOT NULL
+        )
+    """)
+    cur.execute("DROP TRIGGER counter_delete")
+    cur.execute("""
+        CREATE TRIGGER counter_delete AFTER DELETE ON counter
+        BEGIN
+            DELETE FROM events WHERE habit_id = OLD.id;
+            DELETE FROM streak_state WHERE habit_id = OLD.id;
+        END
+    """)
+    _rebuild_streak_state(cur)
 
 
-def add_counter(db, name, description, interval, period, creation):
+def _migrate_v7(cur):
+    """
+    Adds users and makes habit names unique per user instead of globally.
+
+    Every habit belongs to a user; existing habits are assigned to the default
+    user (DEFAULT_USER_ID). The 'counter' table is rebuilt with a unique
+    (user_id, name) key, whose index leads on the user id, so the habits of a
+    user are found by an index range and name lookups stay O(log n) with any
+    number of users in one database. Events and the streak state reference the
+    habit id, which is unique across users, and keep their layout. The
+    'tracker' view gains a 'user_id' column; habits and view rows inserted
+    without one belong to the default user.
+
+    Args:
+        cur: Cursor object of the database connection.
+    """
+    cur.execute("""
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    cur.execute("INSERT INTO users (id, name) VALUES (?, 'default')", (DEFAULT_USER_ID,))
+
+    # The view and its triggers refer to 'counter' and are recreated on the new table
+    cur.execute("DROP VIEW tracker")
+    cur.execute(f"""
+        CREATE TABLE counter_v7 (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL DEFAULT {DEFAULT_USER_ID} REFERENCES users(id),
+            name TEXT NOT NULL,
+            description TEXT,
+            interval TEXT,
+            period INTEGER,
+            creation DATE,
+            UNIQUE (user_id, name)
+        )
+    """)
+    cur.execute("""
+        INSERT INTO counter_v7 (id, user_id, name, description, interval, period, creation)
+        SELECT id, ?, name, description, interval, period, creation FROM counter ORDER BY id
+    """, (DEFAULT_USER_ID,))
+    cur.execute("DROP TABLE counter")
+    cur.execute("ALTER TABLE counter_v7 RENAME TO counter")
+
+    cur.execute(f"""
+        CREATE VIEW tracker (date, counterName, user_id) AS
+        SELECT {DATE_SQL.format("e.day")}, c.name, c.user_id
+        FROM events e
+        JOIN counter c ON c.id = e.habit_id
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER tracker_insert INSTEAD OF INSERT ON tracker
+        BEGIN
+            INSERT OR IGNORE INTO events (habit_id, day)
+            SELECT id, {ORDINAL_SQL.format("NEW.date")} FROM counter
+            WHERE user_id = COALESCE(NEW.user_id, {DEFAULT_USER_ID}) AND name = NEW.counterName;
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER tracker_delete INSTEAD OF DELETE ON tracker
+        BEGIN
+            DELETE FROM events
+            WHERE habit_id = (SELECT id FROM counter WHERE user_id = OLD.user_id AND name = OLD.counterName)
+              AND day = {ORDINAL_SQL.format("OLD.date")};
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER counter_delete AFTER DELETE ON counter
+        BEGIN
+            DELETE FROM events WHERE habit_id = OLD.id;
+            DELETE FROM streak_state WHERE habit_id = OLD.id;
+        END
+    """)
+
+
+def _migrate_v8(cur):
+    """
+    Adds the 'rollup' table of event counts per habit and week, month and year.
+
+    The counts are maintained by triggers on 'events' (inserted events are
+    added, deleted events subtracted, empty buckets removed), so every way of
+    writing events keeps them current; '_rebuild_rollups' recomputes them in
+    bulk. Long-range charts and totals read a few rows per habit and year from
+    the table instead of one row per event.
+
+    Args:
+        cur: Cursor object of the database connection.
+    """
+    cur.execute("""
+        CREATE TABLE rollup (
+            habit_id INTEGER NOT NULL REFERENCES counter(id),
+            grain TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (habit_id, grain, bucket)
+        ) WITHOUT ROWID
+    """)
+    increments = "".join(f"""
+            INSERT INTO rollup (habit_id, grain, bucket, count)
+            VALUES (NEW.habit_id, '{grain}', {bucket.format("NEW.day")}, 1)
+            ON CONFLICT (habit_id, grain, bucket) DO UPDATE SET count = count + 1;""" for grain, bucket in ROLLUP_GRAINS.items())
+    decrements = "".join(f"""
+            UPDATE rollup SET count = count - 1
+            WHERE habit_id = OLD.habit_id AND grain = '{grain}' AND bucket = {bucket.format("OLD.day")};
+            DELETE FROM rollup
+            WHERE habit_id = OLD.habit_id AND grain = '{grain}' AND bucket = {bucket.format("OLD.day")} AND count = 0;"""
+                         for grain, bucket in ROLLUP_GRAINS.items())
+    cur.execute(f"CREATE TRIGGER events_insert AFTER INSERT ON events BEGIN {increments} END")
+    cur.execute(f"CREATE TRIGGER events_delete AFTER DELETE ON events BEGIN {decrements} END")
+    _rebuild_rollups(cur)
+
+
+def _migrate_v9(cur):
+    """
+    Makes inserts through the 'tracker' view discard the habit's streak state.
+
+    The view's insert trigger writes to 'events' only, so the materialized
+    state would miss these events and later incremental updates would fold
+    new days into an outdated state. Dropping the row makes the next write
+    of the habit rebuild it from the history, and reads fall back to a full
+    computation until then. Cached results cannot be invalidated from SQL;
+    other connections notice the commit (see 'cache.CachedConnection'), but a
+    connection reading its own writes through the view must call
+    'cache.invalidate_database'.
+
+    Args:
+        cur: Cursor object of the database connection.
+    """
+    habit = f"SELECT id FROM counter WHERE user_id = COALESCE(NEW.user_id, {DEFAULT_USER_ID}) AND name = NEW.counterName"
+    cur.execute("DROP TRIGGER tracker_insert")
+    cur.execute(f"""
+        CREATE TRIGGER tracker_insert INSTEAD OF INSERT ON tracker
+        BEGIN
+            INSERT OR IGNORE INTO events (habit_id, day)
+            SELECT id, {ORDINAL_SQL.format("NEW.date")} FROM counter
+            WHERE user_id = COALESCE(NEW.user_id, {DEFAULT_USER_ID}) AND name = NEW.counterName;
+            DELETE FROM streak_state WHERE habit_id = ({habit});
+        END
+    """)
+    # Habits written through the view before this version may have an outdated state
+    _rebuild_streak_state(cur)
+
+
+# Ordered list of schema migrations; entry i upgrades the schema to version i + 1
+MIGRATIONS = [
+    _migrate_v1,
+    _migrate_v2,
+    _migrate_v3,
+    _migrate_v4,
+    _migrate_v5,
+    _migrate_v6,
+    _migrate_v7,
+    _migrate_v8,
+    _migrate_v9,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# User owning the habits of single-user databases and of calls without an explicit user
+DEFAULT_USER_ID = 1
+
+# Version of the predefined tracking data loaded by 'initial_load_tracker'
+TRACKER_SEED_VERSION = 1
+
+
+def get_schema_version(db):
+    """
+    Reads the schema version stored in the database header.
+
+    Args:
+        db: The database connection object.
+
+    Returns:
+        int: The value of 'PRAGMA user_version' (0 for unversioned databases).
+    """
+    return db.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _get_meta(cur, key):
+    """
+    Reads a value from the 'meta' table, or returns None if the key is not set.
+    """
+    row = cur.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(cur, key, value):
+    """
+    Stores a value in the 'meta' table.
+    """
+    cur.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+@instrumented
+def migrate(db, target=None):
+    """
+    Applies all pending schema migrations to the database.
+
+    The current version is tracked via 'PRAGMA user_version'. Each migration runs
+    in its own transaction together with the version bump, so an interrupted
+    upgrade leaves the database at the last completed version.
+
+    Args:
+        db: The database connection object.
+        target (int, optional): Stop at this schema version. Defaults to SCHEMA_VERSION.
+
+    Returns:
+        int: The number of migrations that were applied.
+
+    Raises:
+        sqlite3.Error: If a migration fails; its transaction is rolled back.
+    """
+    version = get_schema_version(db)
+    applied = 0
+    for new_version, step in enumerate(MIGRATIONS[version:target], start=version + 1):
+        cur = db.cursor()
+        try:
+            cur.execute("BEGIN")
+            step(cur)
+            # PRAGMA does not accept bound parameters; new_version is an int we control
+            cur.execute(f"PRAGMA user_version = {new_version}")
+            db.commit()
+            applied += 1
+        except sqlite3.Error:
+            db.rollback()
+            raise
+        finally:
+            cur.close()
+    return applied
+
+
+@instrumented
+def add_user(db, name):
+    """
+    Adds a user, or looks up the id of an existing user with the same name.
+
+    Args:
+        db: The database connection object.
+        name (str): The unique name of the user.
+
+    Returns:
+        int: The id of the user.
+
+    Side Effects:
+        - Inserts a row into the 'users' table if the user does not exist.
+        - Commits the transaction.
+    """
+    db.execute("INSERT OR IGNORE INTO users (name) VALUES (?)", (name,))
+    db.commit()
+    return get_user_id(db, name)
+
+@instrumented
+def get_user_id(db, name):
+    """
+    Looks up the integer id of a user.
+
+    Args:
+        db: The database connection object.
+        name (str): The name of the user.
+
+    Returns:
+        int: The id of the user, or None if it does not exist.
+    """
+    row = db.execute("SELECT id FROM users WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+@instrumented
+def add_counter(db, name, description, interval, period, creation, user_id=DEFAULT_USER_ID):
     """
     Adds a new counter to the 'counter' table in the database.
 
@@ -103,60 +641,436 @@ def add_counter(db, name, description, interval, period, creation):
         description (str): A description of the counter.
         interval (str): The interval type (e.g., "daily", "weekly").
         creation (str): The creation timestamp in ISO format (YYYY-MM-DD).
+        user_id (int, optional): The owner of the counter. Defaults to DEFAULT_USER_ID.
 
     Returns:
-        None
+        int: The id of the new counter, or None if it could not be added.
 
     Side Effects:
         - Inserts a row into the 'counter' table.
         - Commits the transaction.
+        - Invalidates the cached habit lists and aggregates.
         - Prints a success or error message.
     """
     try:
         cur = db.cursor()
         cur.execute("""
-            INSERT INTO counter (name, description, interval, period, creation)
-            VALUES (?, ?, ?, ?, ?)
-        """, (name, description, interval, period, creation))
+            INSERT INTO counter (user_id, name, description, interval, period, creation)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (user_id, name, description, interval, period, creation))
         db.commit()
+        invalidate_habits(db, name)
         print(f"Counter '{name}' added successfully.")
+        return cur.lastrowid
     except Exception as e:
         print(f"Error adding counter '{name}': {e}")
+        return None
     finally:
         cur.close()
 
-def increment_counter(db, name, event_date=None):
+@instrumented
+def rename_counter(db, name, new_name, user_id=DEFAULT_USER_ID):
     """
-    Increments a counter by adding a new entry to the 'tracker' table.
+    Renames a counter.
 
-    This function inserts a new row into the 'tracker' table with the specified
-    counter name and an event date. If no event date is provided, the current
-    date (in ISO format) is used by default.
+    Tracking events and the streak state refer to the counter by its id, so
+    only the counter row itself changes.
+
+    Args:
+        db: The database connection object.
+        name (str): The current name of the counter.
+        new_name (str): The new name of the counter.
+        user_id (int, optional): The owner of the counter. Defaults to DEFAULT_USER_ID.
+
+    Returns:
+        bool: True if the counter was renamed, False if it does not exist or the new name is taken.
+
+    Side Effects:
+        - Updates the name in the 'counter' table.
+        - Commits the transaction.
+        - Invalidates the cached results of both names and the habit lists.
+        - Prints a success or error message.
+    """
+    cur = db.cursor()
+    try:
+        cur.execute("UPDATE counter SET name = ? WHERE user_id = ? AND name = ?", (new_name, user_id, name))
+        db.commit()
+        if not cur.rowcount:
+            print(f"Counter '{name}' does not exist in the database.")
+            return False
+        invalidate_habits(db, name, new_name)
+        print(f"Counter '{name}' renamed to '{new_name}'.")
+        return True
+    except sqlite3.IntegrityError:
+        db.rollback()
+        print(f"Error renaming counter '{name}': a counter named '{new_name}' already exists.")
+        return False
+    finally:
+        cur.close()
+
+@instrumented
+def get_counter_id(db, name, user_id=DEFAULT_USER_ID):
+    """
+    Looks up the integer id of a counter.
+
+    Args:
+        db: The database connection object.
+        name (str): The name of the counter.
+        user_id (int, optional): The owner of the counter. Defaults to DEFAULT_USER_ID.
+
+    Returns:
+        int: The id of the counter, or None if it does not exist.
+    """
+    row = db.execute("SELECT id FROM counter WHERE user_id = ? AND name = ?", (user_id, name)).fetchone()
+    return row[0] if row else None
+
+@instrumented
+def increment_counter(db, name, event_date=None, user_id=DEFAULT_USER_ID):
+    """
+    Increments a counter by adding a new tracking event.
+
+    This function inserts a new row into the 'events' table with the id of the
+    specified counter and the event date as day ordinal. If no event date is
+    provided, the current date is used by default. An event that already
+    exists for the same counter and date is ignored, as events are unique per
+    day, and so are events of counters that do not exist.
 
     Args:
         db: The database connection object, which provides access to the database.
         name (str): The name of the counter to increment.
         event_date (str, optional): The date associated with the increment.
         If not provided, the current date in ISO format (YYYY-MM-DD) is used.
+        user_id (int, optional): The owner of the counter. Defaults to DEFAULT_USER_ID.
 
     Returns:
         None
 
     Raises:
+        ValueError: If the event date is not a valid ISO date.
         Exception: Any exceptions during database operations are propagated to the caller.
 
     Side Effects:
-        - Inserts a new row into the 'tracker' table.
+        - Inserts a new row into the 'events' table.
+        - Updates the habit's row in the 'streak_state' table.
         - Commits the transaction to the database.
+        - Invalidates the cached aggregates of the habit.
     """
+    day = date.fromisoformat(event_date).toordinal() if event_date else date.today().toordinal()
     cur = db.cursor()
-    if not event_date:
-        event_date = date.today().isoformat()  # Use ISO format for consistency
-    cur.execute("INSERT INTO tracker (date, counterName) VALUES (?, ?)", (event_date, name))
-    db.commit()
+    try:
+        habit_id = get_counter_id(db, name, user_id)
+        if habit_id is None:
+            return
+        cur.execute("INSERT OR IGNORE INTO events (habit_id, day) VALUES (?, ?)", (habit_id, day))
+        inserted = cur.rowcount > 0
+        if inserted:
+            _update_streak_state(cur, habit_id, [day])
+        db.commit()
+        if inserted:
+            invalidate_tracker(db, name)
+    finally:
+        cur.close()
+
+
+@instrumented
+def bulk_increment(db, rows, batch_size=10000, user_id=DEFAULT_USER_ID):
+    """
+    Inserts many tracker events in a single transaction.
+
+    The rows are consumed in batches of 'batch_size' and written with
+    'executemany', so arbitrarily large iterables are streamed without being
+    held in memory and without a commit per event. Habit names are mapped to
+    their ids once for the whole load; rows of unknown habits or with invalid
+    dates are rejected. Events that already exist are ignored.
+
+    Args:
+        db: The database connection object.
+        rows (iterable of tuple): The events as (date, counter name) tuples,
+            with dates in ISO format (YYYY-MM-DD).
+        batch_size (int, optional): The number of rows per 'executemany' call.
+        user_id (int, optional): The owner of the counters. Defaults to DEFAULT_USER_ID.
+
+    Returns:
+        tuple: (number of inserted rows, number of rejected rows).
 
+    Raises:
+        sqlite3.Error: If the load fails.
+        Exception: Any error raised while reading 'rows' (e.g. by a file reader) or by a
+            row that is not a (date, name) pair.
+        In all cases the whole transaction is rolled back before the error is propagated.
+
+    Side Effects:
+        - Inserts rows into the 'events' table; triggers update the 'rollup' counts.
+        - Updates the 'streak_state' rows of all habits that received events.
+        - Commits the transaction to the database.
+        - Invalidates the cached aggregates of these habits.
+    """
+    cur = db.cursor()
+    try:
+        ids = dict(cur.execute("SELECT name, id FROM counter WHERE user_id = ?", (user_id,)).fetchall())
+        touched = {}  # Habit id -> new event days, or None once too many to keep
+        inserted = rejected = 0
+        rows = iter(rows)
+
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            events = []
+            for event_date, name in batch:
+                habit_id = ids.get(name)
+                try:
+                    if habit_id is not None:
+                        events.append((habit_id, date.fromisoformat(event_date).toordinal()))
+                        continue
+                except (TypeError, ValueError):
+                    pass
+                rejected += 1
+            # rowcount sums the rows of all executions, without the rollup rows written by triggers
+            cur.executemany("INSERT OR IGNORE INTO events (habit_id, day) VALUES (?, ?)", events)
+            inserted += cur.rowcount
+            for habit_id, day in events:
+                days = touched.setdefault(habit_id, [])
+                if days is not None:
+                    days.append(day)
+                    if len(days) > batch_size:
+                        touched[habit_id] = None
+
+        # Small appends update the streak state incrementally, large loads rebuild it
+        for habit_id, days in touched.items():
+            if days is None:
+                _rebuild_streak_state(cur, habit_id)
+            else:
+                _update_streak_state(cur, habit_id, days)
+        db.commit()
+        names = {habit_id: name for name, habit_id in ids.items()}
+        invalidate_tracker(db, *(names[habit_id] for habit_id in touched))
+        return inserted, rejected
+    except BaseException:
+        # Also on errors of the row source, so no partial load is committed by a later write
+        db.rollback()
+        raise
+    finally:
+        cur.close()
 
-def get_counter_data(db, name):
+
+def _load_habit(cur, habit_id):
+    """
+    Reads the streak parameters of a habit.
+
+    Args:
+        cur: Cursor object of the database connection.
+        habit_id (int): The id of the habit.
+
+    Returns:
+        tuple: (creation date, interval, period as int), or None if the habit does
+        not exist or its creation date or period is invalid.
+    """
+    habit = cur.execute("SELECT creation, interval, period FROM counter WHERE id = ?", (habit_id,)).fetchone()
+    if not habit:
+        return None
+    creation, interval, period = habit
+    try:
+        return date.fromisoformat(creation), interval, int(period)
+    except (TypeError, ValueError):
+        return None
+
+
+def _update_streak_state(cur, habit_id, days):
+    """
+    Folds new events into the materialized streak state of a habit.
+
+    The events are applied incrementally if all of them are dated after the
+    habit's latest known event, which also guarantees that none of them was
+    recorded before. Otherwise, or if the habit has no stored state (e.g.
+    after events were written through the 'tracker' view), the habit's state
+    is rebuilt from the history.
+
+    Args:
+        cur: Cursor object of the database connection.
+        habit_id (int): The id of the habit.
+        days (list of int): The event dates as day ordinals.
+    """
+    habit = _load_habit(cur, habit_id)
+    if habit is None or not days:
+        return
+
+    row = cur.execute("""
+        SELECT current_streak, longest_streak, last_interval, last_event,
+               intervals_covered, tracking_entries, breaks
+        FROM streak_state
+        WHERE habit_id = ?
+    """, (habit_id,)).fetchone()
+    if row is None:
+        _rebuild_streak_state(cur, habit_id)
+        return
+    state = StreakState(*row)
+
+    days = sorted(set(days))
+    if state.last_event is not None and date.fromordinal(days[0]).isoformat() <= state.last_event:
+        _rebuild_streak_state(cur, habit_id)
+        return
+    for day in days:
+        state.add(date.fromordinal(day), *habit)
+    _store_streak_state(cur, habit_id, state)
+
+
+def _store_streak_state(cur, habit_id, state):
+    """
+    Writes the streak state of a habit to the 'streak_state' table.
+    """
+    cur.execute("""
+        INSERT OR REPLACE INTO streak_state (
+            habit_id, current_streak, longest_streak, last_interval, last_event,
+            intervals_covered, tracking_entries, breaks
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (habit_id, *astuple(state)))
+
+
+def _rebuild_streak_state(cur, habit_id=None):
+    """
+    Recomputes the materialized streak state from the tracker history.
+
+    Args:
+        cur: Cursor object of the database connection.
+        habit_id (int, optional): The id of the habit to rebuild. Defaults to all habits.
+    """
+    if habit_id is None:
+        cur.execute("DELETE FROM streak_state")
+        habit_ids = [row[0] for row in cur.execute("SELECT id FROM counter").fetchall()]
+    else:
+        cur.execute("DELETE FROM streak_state WHERE habit_id = ?", (habit_id,))
+        habit_ids = [habit_id]
+
+    for habit_id in habit_ids:
+        habit = _load_habit(cur, habit_id)
+        if habit is None:
+            continue
+        state = StreakState()
+        days = cur.execute("SELECT day FROM events WHERE habit_id = ? ORDER BY day ASC", (habit_id,)).fetchall()
+        for (day,) in days:
+            state.add(date.fromordinal(day), *habit)
+        _store_streak_state(cur, habit_id, state)
+
+
+@instrumented
+def rebuild_streak_state(db, name=None, user_id=DEFAULT_USER_ID):
+    """
+    Rebuilds the materialized streak state after tracking history was removed or changed.
+
+    Args:
+        db: The database connection object.
+        name (str, optional): The habit to rebuild. Defaults to all habits of all users.
+        user_id (int, optional): The owner of the habit 'name'. Defaults to DEFAULT_USER_ID.
+
+    Side Effects:
+        - Replaces the affected rows of the 'streak_state' table.
+        - Commits the transaction to the database.
+        - Invalidates the affected cached results.
+    """
+    cur = db.cursor()
+    try:
+        if name is None:
+            _rebuild_streak_state(cur)
+        else:
+            habit_id = get_counter_id(db, name, user_id)
+            if habit_id is not None:
+                _rebuild_streak_state(cur, habit_id)
+        db.commit()
+        if name is None:
+            invalidate_database(db)
+        else:
+            invalidate_tracker(db, name)
+    finally:
+        cur.close()
+
+
+def _rebuild_rollups(cur, habit_id=None):
+    """
+    Recomputes the 'rollup' counts from the events with one grouped insert per grain.
+
+    Args:
+        cur: Cursor object of the database connection.
+        habit_id (int, optional): The id of the habit to rebuild. Defaults to all habits.
+    """
+    if habit_id is None:
+        cur.execute("DELETE FROM rollup")
+        condition, params = "", ()
+    else:
+        cur.execute("DELETE FROM rollup WHERE habit_id = ?", (habit_id,))
+        condition, params = "WHERE habit_id = ?", (habit_id,)
+
+    for grain, bucket in ROLLUP_GRAINS.items():
+        cur.execute(f"""
+            INSERT INTO rollup (habit_id, grain, bucket, count)
+            SELECT habit_id, '{grain}', {bucket.format("day")} AS start, COUNT(*)
+            FROM events
+            {condition}
+            GROUP BY habit_id, start
+        """, params)
+
+
+@instrumented
+def rebuild_rollups(db, name=None, user_id=DEFAULT_USER_ID):
+    """
+    Rebuilds the per-period event counts of the 'rollup' table in bulk.
+
+    The counts are kept current by triggers on every insert and delete; a
+    rebuild is only needed after the table was modified by hand or its
+    contents are in doubt.
+
+    Args:
+        db: The database connection object.
+        name (str, optional): The habit to rebuild. Defaults to all habits of all users.
+        user_id (int, optional): The owner of the habit 'name'. Defaults to DEFAULT_USER_ID.
+
+    Side Effects:
+        - Replaces the affected rows of the 'rollup' table.
+        - Commits the transaction to the database.
+        - Invalidates the affected cached results.
+    """
+    cur = db.cursor()
+    try:
+        if name is None:
+            _rebuild_rollups(cur)
+        else:
+            habit_id = get_counter_id(db, name, user_id)
+            if habit_id is not None:
+                _rebuild_rollups(cur, habit_id)
+        db.commit()
+        if name is None:
+            invalidate_database(db)
+        else:
+            invalidate_tracker(db, name)
+    finally:
+        cur.close()
+
+
+@instrumented
+def get_streak_state(db, name, user_id=DEFAULT_USER_ID):
+    """
+    Fetches the materialized streak state of a habit.
+
+    Args:
+        db: The database connection object.
+        name (str): The name of the habit.
+        user_id (int, optional): The owner of the habit. Defaults to DEFAULT_USER_ID.
+
+    Returns:
+        StreakState: The stored state, or None if no state exists for the habit.
+    """
+    row = db.execute("""
+        SELECT current_streak, longest_streak, last_interval, last_event,
+               intervals_covered, tracking_entries, breaks
+        FROM streak_state
+        WHERE habit_id = (SELECT id FROM counter WHERE user_id = ? AND name = ?)
+    """, (user_id, name)).fetchone()
+    return StreakState(*row) if row else None
+
+
+@instrumented
+def get_counter_data(db, name, user_id=DEFAULT_USER_ID):
     """
     Fetches all data from the 'tracker' table for a specific counter name.
 
@@ -167,9 +1081,10 @@ def get_counter_data(db, name):
     Args:
         db: The database connection object, which provides access to the database.
         name (str): The name of the counter to filter rows by.
+        user_id (int, optional): The owner of the counter. Defaults to DEFAULT_USER_ID.
 
     Returns:
-        list of tuple: A list of rows (as tuples) that match the specified counter name.
+        list of tuple: A list of (date, counterName) rows that match the specified counter name.
         Each tuple represents a row in the table. If no matching rows are found,
         an empty list is returned.
 
@@ -177,10 +1092,14 @@ def get_counter_data(db, name):
          Exception: Any exceptions during database operations are propagated to the caller.
     """
     cur = db.cursor()
-    cur.execute("SELECT * FROM tracker WHERE counterName = ?", (name,))
-    return cur.fetchall()
+    try:
+        cur.execute("SELECT date, counterName FROM tracker WHERE user_id = ? AND counterName = ?", (user_id, name))
+        return cur.fetchall()
+    finally:
+        cur.close()
 
 
+@instrumented
 def get_predefined_habits(db):
     """
     Fetches all predefined habits with concatenated details from the database.
@@ -209,13 +1128,15 @@ def get_predefined_habits(db):
         return []
 
 
-def get_habit_dates(db, habit_name):
+@instrumented
+def get_habit_dates(db, habit_name, user_id=DEFAULT_USER_ID):
     """
     Fetch all dates associated with a given habit name from the database.
 
     Args:
         db: Database connection object.
         habit_name (str): The name of the habit to fetch dates for.
+        user_id (int, optional): The owner of the habit. Defaults to DEFAULT_USER_ID.
 
     Returns:
         list: A list of dates (strings) associated with the habit.
@@ -223,7 +1144,8 @@ def get_habit_dates(db, habit_name):
     try:
         # Query to retrieve all dates for the given habit name
         dates = db.execute(
-            "SELECT date FROM tracker WHERE Name = ? ORDER BY date ASC", (habit_name,)
+            "SELECT date FROM tracker WHERE user_id = ? AND counterName = ? ORDER BY date ASC",
+            (user_id, habit_name)
         ).fetchall()
 
         # Extract dates from the query result
@@ -232,12 +1154,15 @@ def get_habit_dates(db, habit_name):
         print(f"Error fetching dates for habit '{habit_name}': {e}")
         return []
 
-def get_existing_habits(db):
+@instrumented
+@cached(HABITS)
+def get_existing_habits(db, user_id=DEFAULT_USER_ID):
     """
     Retrieves concatenated habit details from the 'counter' table.
 
     Args:
         db: The database connection object.
+        user_id (int, optional): The owner of the habits. Defaults to DEFAULT_USER_ID.
 
     Returns:
         list of str: A list of habit details in the format "name - description (interval)",
@@ -248,7 +1173,8 @@ def get_existing_habits(db):
         habits = db.execute("""
             SELECT name || ' - ' || description || ' (' || interval || ')' AS habit_details
             FROM counter
-        """).fetchall()
+            WHERE user_id = ?
+        """, (user_id,)).fetchall()
 
         # If no habits exist, return an empty list
         if not habits:
@@ -262,12 +1188,15 @@ def get_existing_habits(db):
         print(f"Error fetching existing habits: {e}")
         return []
 
-def get_existing_habits_short(db):
+@instrumented
+@cached(HABITS)
+def get_existing_habits_short(db, user_id=DEFAULT_USER_ID):
     """
     Retrieves habit names from the 'counter' table.
 
     Args:
         db: The database connection object.
+        user_id (int, optional): The owner of the habits. Defaults to DEFAULT_USER_ID.
 
     Returns:
         list of str: A list of habit names, or an empty list if no habits exist or an error occurs.
@@ -277,7 +1206,8 @@ def get_existing_habits_short(db):
         habits = db.execute("""
             SELECT name
             FROM counter
-        """).fetchall()
+            WHERE user_id = ?
+        """, (user_id,)).fetchall()
 
         # Check if any habits exist
         if not habits:
@@ -291,15 +1221,27 @@ def get_existing_habits_short(db):
         print(f"Database error while fetching habits: {e}")
         return []
 
+@instrumented
 def initial_load_tracker(cur):
     """
     Initializes the tracker by inserting predefined data only if it does not already exist.
 
+    The seed is applied once per database: its version is recorded in the 'meta'
+    table, and later calls return immediately without touching the tracker.
+    Rows are inserted with 'INSERT OR IGNORE' against the (habit id, day)
+    primary key, so the existing history is never read. The seed belongs to the
+    default user; events of predefined habits that were deleted are skipped.
+
     Args:
         cur: Cursor object of the database connection.
 
     Returns:
         int: Number of newly inserted rows.
+
+    Side Effects:
+        - Inserts rows into the 'tracker' table and records the seed version.
+        - Invalidates the cached aggregates of the seeded habits.
+        - The caller is responsible for committing the transaction.
     """
     # Example data for the initial load
     tracking_data = [
@@ -408,25 +1350,33 @@ def initial_load_tracker(cur):
         ('2021-12-09', 'Cleaning')
     ]
 
-    # Step 1: Retrieve existing data
-    existing_data_query = """
-        SELECT date, counterName FROM tracker
-    """
-    cur.execute(existing_data_query)
-    existing_data = set(cur.fetchall())
-
-    # Step 2: Filter new data
-    new_data = [entry for entry in tracking_data if entry not in existing_data]
-
-    # Step 3: Insert new data
-    if new_data:
-        cur.executemany("""
-            INSERT INTO tracker (date, counterName) 
-            VALUES (?, ?)
-        """, new_data)
-        print(f"Inserted {len(new_data)} new rows into tracker.")
+    # Step 1: Skip the seed if this database already received it
+    seed_version = _get_meta(cur, "tracker_seed_version")
+    if seed_version is not None and int(seed_version) >= TRACKER_SEED_VERSION:
+        print("Initial tracker data has already been loaded.")
+        return 0
+
+    # Step 2: Insert the seed for the default user's predefined habits that exist; rows
+    # that already exist are skipped by the primary key of the 'events' table
+    ids = dict(cur.execute("SELECT name, id FROM counter WHERE user_id = ?", (DEFAULT_USER_ID,)).fetchall())
+    events = [
+        (ids[name], date.fromisoformat(event_date).toordinal())
+        for event_date, name in tracking_data if name in ids
+    ]
+    cur.executemany("INSERT OR IGNORE INTO events (habit_id, day) VALUES (?, ?)", events)
+    inserted = cur.rowcount
+
+    # Step 3: Refresh the streak state of the seeded habits and record the seed
+    seeded = {name for _, name in tracking_data if name in ids}
+    for name in seeded:
+        _rebuild_streak_state(cur, ids[name])
+    _set_meta(cur, "tracker_seed_version", TRACKER_SEED_VERSION)
+    invalidate_tracker(cur.connection, *seeded)
+
+    if inserted:
+        print(f"Inserted {inserted} new rows into tracker.")
     else:
         print("No new data to insert. All values already exist.")
 
     # Return the number of inserted rows
-    return len(new_data)
\ No newline at end of file
+    return inserted
@@ -0,0 +1,235 @@
+import csv
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from datetime import date
+
+from db import DATE_SQL, ORDINAL_SQL
+
+# File formats written by the exporter, keyed by file extension
+FORMATS = {
+    ".csv": "csv",
+    ".htc": "columnar",
+}
+
+# Exported columns per table as (column, columnar type):
+#   "date": day ordinal (date.toordinal) as int32
+#   "int":  int32
+#   "dict": dictionary-encoded string, stored as an int32 index into the file's dictionary
+TABLES = {
+    "tracker": [("date", "date"), ("counterName", "dict"), ("user", "dict")],
+    "counter": [("name", "dict"), ("description", "dict"), ("interval", "dict"), ("period", "int"),
+                ("creation", "date"), ("user", "dict")],
+}
+
+# Export query per (table, format); the columnar format reads dates as day ordinals.
+# Habit names are unique per user only, so rows carry the user name and are grouped by user.
+_QUERIES = {
+    ("tracker", "csv"): f"""
+        SELECT {DATE_SQL.format("e.day")}, c.name, u.name
+        FROM events e JOIN counter c ON c.id = e.habit_id JOIN users u ON u.id = c.user_id
+        ORDER BY c.user_id, c.name, e.day
+    """,
+    ("tracker", "columnar"): """
+        SELECT e.day, c.name, u.name
+        FROM events e JOIN counter c ON c.id = e.habit_id JOIN users u ON u.id = c.user_id
+        ORDER BY c.user_id, c.name, e.day
+    """,
+    ("counter", "csv"): """
+        SELECT c.name, c.description, c.interval, c.period, c.creation, u.name
+        FROM counter c JOIN users u ON u.id = c.user_id
+        ORDER BY c.user_id, c.name
+    """,
+    ("counter", "columnar"): f"""
+        SELECT c.name, c.description, c.interval, CAST(c.period AS INTEGER), {ORDINAL_SQL.format("c.creation")}, u.name
+        FROM counter c JOIN users u ON u.id = c.user_id
+        ORDER BY c.user_id, c.name
+    """,
+}
+
+# Columnar file layout (little-endian):
+#   MAGIC, uint32 header length, JSON header {"table": ..., "columns": [[name, type], ...]}
+#   Row groups, each: uint32 row count, then per "dict" column the new dictionary entries
+#   (uint32 count, then uint32 length + UTF-8 bytes per entry), then per column an int32 array
+#   A row count of 0 ends the file. NULL values (and invalid dates) are stored as NULL_VALUE.
+MAGIC = b"HTCOL\x00\x01\x00"
+NULL_VALUE = -2 ** 31
+
+
+def _int32_bytes(values):
+    """
+    Packs integers into a little-endian int32 array.
+    """
+    data = array("i", values)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data.tobytes()
+
+
+def _write_csv(cur, file, columns, batch_size):
+    """
+    Streams the query result into a CSV file with a header row.
+
+    Returns:
+        int: The number of exported rows.
+    """
+    writer = csv.writer(file)
+    writer.writerow([name for name, _ in columns])
+    rows = 0
+    while batch := cur.fetchmany(batch_size):
+        writer.writerows(batch)
+        rows += len(batch)
+    return rows
+
+
+def _write_columnar(cur, file, table, columns, batch_size):
+    """
+    Streams the query result into a columnar file, one row group per fetched batch.
+
+    Only the dictionaries of the string columns are kept across batches, so the
+    memory use is bounded by the batch size and the number of distinct strings.
+
+    Returns:
+        int: The number of exported rows.
+    """
+    header = json.dumps({"table": table, "columns": columns}).encode("utf-8")
+    file.write(MAGIC + struct.pack("<I", len(header)) + header)
+
+    dictionaries = {index: {} for index, (_, kind) in enumerate(columns) if kind == "dict"}
+    rows = 0
+    while batch := cur.fetchmany(batch_size):
+        file.write(struct.pack("<I", len(batch)))
+        vectors = [list(column) for column in zip(*batch)]
+
+        # Encode the string columns and append their new dictionary entries
+        for index, dictionary in dictionaries.items():
+            new_entries = []
+            codes = []
+            for value in vectors[index]:
+                if value is None:
+                    codes.append(NULL_VALUE)
+                    continue
+                code = dictionary.get(value)
+                if code is None:
+                    code = dictionary[value] = len(dictionary)
+                    new_entries.append(value.encode("utf-8"))
+                codes.append(code)
+            vectors[index] = codes
+            file.write(struct.pack("<I", len(new_entries)))
+            for entry in new_entries:
+                file.write(struct.pack("<I", len(entry)) + entry)
+
+        for index, vector in enumerate(vectors):
+            if index not in dictionaries:
+                vector = [NULL_VALUE if value is None else value for value in vector]
+            file.write(_int32_bytes(vector))
+        rows += len(batch)
+
+    file.write(struct.pack("<I", 0))
+    return rows
+
+
+def export_table(db, path, table="tracker", fmt=None, batch_size=10000):
+    """
+    Exports the 'tracker' or 'counter' table to a CSV or columnar file.
+
+    The rows are streamed from the cursor with 'fetchmany', so the memory use
+    does not grow with the size of the table. The columnar format stores dates
+    as int32 day ordinals and strings dictionary-encoded (see 'read_columnar').
+
+    Args:
+        db: The database connection object.
+        path (str): The path of the file to write.
+        table (str, optional): "tracker" or "counter". Defaults to "tracker".
+        fmt (str, optional): "csv" or "columnar". Defaults to detection by file extension.
+        batch_size (int, optional): The number of rows fetched per batch.
+
+    Returns:
+        dict: Export statistics with the keys 'rows', 'bytes', 'seconds' and 'rows_per_second'.
+
+    Raises:
+        ValueError: If the table or file format is unknown.
+
+    Side Effects:
+        - Writes the file.
+        - Prints a summary of the export.
+    """
+    if table not in TABLES:
+        raise ValueError(f"Unknown table '{table}'. Use one of: {', '.join(TABLES)}.")
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in ("csv", "columnar"):
+        raise ValueError(f"Unknown export format for '{path}'. Use one of: csv, columnar.")
+
+    start = time.perf_counter()
+    cur = db.cursor()
+    try:
+        cur.execute(_QUERIES[table, fmt])
+        if fmt == "csv":
+            with open(path, "w", newline="", encoding="utf-8") as file:
+                rows = _write_csv(cur, file, TABLES[table], batch_size)
+        else:
+            with open(path, "wb") as file:
+                rows = _write_columnar(cur, file, table, TABLES[table], batch_size)
+    finally:
+        cur.close()
+
+    stats = {"rows": rows, "bytes": os.path.getsize(path), "seconds": time.perf_counter() - start}
+    stats["rows_per_second"] = rows / stats["seconds"] if stats["seconds"] else 0.0
+    print(f"Exported {rows} rows of '{table}' to '{path}' ({stats['bytes']} bytes) "
+          f"in {stats['seconds']:.2f}s - {stats['rows_per_second']:.0f} rows/s.")
+    return stats
+
+
+def read_columnar(path):
+    """
+    Streams the rows of a columnar export file.
+
+    Dates are decoded to ISO format strings, so the rows match the CSV export.
+
+    Args:
+        path (str): The path of the file to read.
+
+    Yields:
+        tuple: One row per exported record, in column order.
+
+    Raises:
+        ValueError: If the file is not a columnar export.
+    """
+    def read(size):
+        data = file.read(size)
+        if len(data) != size:
+            raise ValueError(f"Truncated columnar file '{path}'.")
+        return data
+
+    def read_uint32():
+        return struct.unpack("<I", read(4))[0]
+
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{path}' is not a columnar habit tracker export.")
+        columns = json.loads(read(read_uint32()))["columns"]
+        dictionaries = {index: [] for index, (_, kind) in enumerate(columns) if kind == "dict"}
+
+        while rows := read_uint32():
+            for dictionary in dictionaries.values():
+                for _ in range(read_uint32()):
+                    dictionary.append(read(read_uint32()).decode("utf-8"))
+
+            vectors = []
+            for index, (_, kind) in enumerate(columns):
+                vector = array("i")
+                vector.frombytes(read(4 * rows))
+                if sys.byteorder == "big":
+                    vector.byteswap()
+                if kind == "dict":
+                    dictionary = dictionaries[index]
+                    vectors.append([None if code == NULL_VALUE else dictionary[code] for code in vector])
+                elif kind == "date":
+                    vectors.append([None if day == NULL_VALUE else date.fromordinal(day).isoformat()
+                                    for day in vector])
+                else:
+                    vectors.append([None if value == NULL_VALUE else value for value in vector])
+            yield from zip(*vectors)
@@ -0,0 +1,222 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from db import DEFAULT_USER_ID
+from streak import compute_streak_from_indices, interval_index
+
+# Ordinal of the NumPy datetime64 epoch (1970-01-01)
+EPOCH_ORDINAL = 719163
+
+
+def _ordinal(day):
+    """
+    Converts a date, an ISO date string or an ordinal to an ordinal.
+    """
+    if isinstance(day, int):
+        return day
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    return day.toordinal()
+
+
+class HabitHistory:
+    """
+    The tracking history of a habit as a sorted array of day ordinals.
+
+    Events are stored as 'date.toordinal()' values in an 'array("i")' (4 bytes
+    per event instead of a date object each), so the streak, count and plot
+    code work on plain integers. Lookups and range counts use binary search;
+    set operations return new histories.
+
+    Dates can be passed to all methods as date objects, ISO strings or ordinals.
+
+    Attributes:
+        name (str): The name of the habit.
+        days (array): The event day ordinals in ascending order; one entry per tracker row.
+
+    Args:
+        name (str): The name of the habit.
+        days (iterable of int, optional): The event day ordinals in ascending order.
+    """
+    __slots__ = ("name", "days")
+
+    def __init__(self, name, days=()):
+        self.name = name
+        self.days = days if isinstance(days, array) else array("i", days)
+
+    @classmethod
+    def from_db(cls, db, name, start=None, end=None, user_id=DEFAULT_USER_ID):
+        """
+        Loads the history of a habit, optionally limited to a date range.
+
+        The day ordinals are read from the 'events' table as stored, fetched as a
+        single concatenated string instead of one row per event, which avoids
+        most of the per-row overhead of the sqlite3 module.
+
+        Args:
+            db: The database connection object.
+            name (str): The name of the habit.
+            start (optional): The first date (YYYY-MM-DD). Defaults to the first event.
+            end (optional): The last date (YYYY-MM-DD). Defaults to the last event.
+            user_id (int, optional): The owner of the habit. Defaults to DEFAULT_USER_ID.
+
+        Returns:
+            HabitHistory: The history of the habit; empty if the habit does not exist.
+        """
+        # Range conditions are only added when given; COALESCE placeholders would be evaluated per row
+        conditions = ["habit_id = (SELECT id FROM counter WHERE user_id = ? AND name = ?)"]
+        params = [user_id, name]
+        if start is not None:
+            conditions.append("day >= ?")
+            params.append(_ordinal(start))
+        if end is not None:
+            conditions.append("day <= ?")
+            params.append(_ordinal(end))
+
+        cur = db.cursor()
+        try:
+            days = cur.execute(f"""
+                SELECT group_concat(day)
+                FROM (
+                    SELECT day
+                    FROM events
+                    WHERE {" AND ".join(conditions)}
+                    ORDER BY day ASC
+                )
+            """, params).fetchone()[0]
+        finally:
+            cur.close()
+        return cls(name, array("i", map(int, days.split(","))) if days else ())
+
+    def __len__(self):
+        return len(self.days)
+
+    def __iter__(self):
+        return iter(self.days)
+
+    def __contains__(self, day):
+        day = _ordinal(day)
+        index = bisect_left(self.days, day)
+        return index < len(self.days) and self.days[index] == day
+
+    def __eq__(self, other):
+        return isinstance(other, HabitHistory) and self.name == other.name and self.days == other.days
+
+    def __repr__(self):
+        return f"HabitHistory({self.name!r}, {len(self.days)} events)"
+
+    @property
+    def first(self):
+        """date: The first event date, or None if the history is empty."""
+        return date.fromordinal(self.days[0]) if self.days else None
+
+    @property
+    def last(self):
+        """date: The last event date, or None if the history is empty."""
+        return date.fromordinal(self.days[-1]) if self.days else None
+
+    def dates(self):
+        """
+        Returns the events as date objects.
+
+        Returns:
+            list of date: The event dates in ascending order.
+        """
+        return [date.fromordinal(day) for day in self.days]
+
+    def count(self, start=None, end=None):
+        """
+        Counts the events in a date range by binary search.
+
+        Args:
+            start (optional): The first date of the range. Defaults to the first event.
+            end (optional): The last date of the range. Defaults to the last event.
+
+        Returns:
+            int: The number of events between 'start' and 'end', both inclusive.
+        """
+        low = bisect_left(self.days, _ordinal(start)) if start is not None else 0
+        high = bisect_right(self.days, _ordinal(end)) if end is not None else len(self.days)
+        return max(0, high - low)
+
+    def between(self, start=None, end=None):
+        """
+        Returns the events in a date range as a new history.
+
+        Args:
+            start (optional): The first date of the range. Defaults to the first event.
+            end (optional): The last date of the range. Defaults to the last event.
+
+        Returns:
+            HabitHistory: The events between 'start' and 'end', both inclusive.
+        """
+        low = bisect_left(self.days, _ordinal(start)) if start is not None else 0
+        high = bisect_right(self.days, _ordinal(end)) if end is not None else len(self.days)
+        return HabitHistory(self.name, self.days[low:high])
+
+    def union(self, other):
+        """HabitHistory: The days with an event in either history."""
+        return HabitHistory(self.name, sorted(set(self.days) | set(other.days)))
+
+    def intersection(self, other):
+        """HabitHistory: The days with an event in both histories."""
+        return HabitHistory(self.name, sorted(set(self.days) & set(other.days)))
+
+    def difference(self, other):
+        """HabitHistory: The days with an event in this history but not in 'other'."""
+        return HabitHistory(self.name, sorted(set(self.days) - set(other.days)))
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    def to_numpy(self):
+        """
+        Returns the events as a NumPy array of dates.
+
+        Returns:
+            numpy.ndarray: The event days as datetime64[D].
+        """
+        import numpy as np
+
+        return (np.frombuffer(self.days, dtype=np.int32) - EPOCH_ORDINAL).astype("datetime64[D]")
+
+    def interval_indices(self, creation, interval):
+        """
+        Maps the events to the indices of their tracking intervals (see 'streak.interval_index').
+
+        Daily and weekly indices are computed from the ordinals directly; only
+        calendar months, quarters and years need date objects.
+
+        Args:
+            creation (date): The creation date of the habit.
+            interval (str): The interval type (e.g., "daily", "weekly").
+
+        Returns:
+            iterator of int: The interval index of every event, in ascending order.
+        """
+        origin = creation.toordinal()
+        if interval in ("monthly", "quarterly", "yearly"):
+            return (interval_index(date.fromordinal(day), creation, interval) for day in self.days)
+        if interval == "weekly":
+            # Ordinal 1 (0001-01-01) is a Monday, so (ordinal - 1) // 7 numbers the ISO weeks
+            week = (origin - 1) // 7
+            return ((day - 1) // 7 - week for day in self.days)
+        return (day - origin for day in self.days)
+
+    def streak(self, creation, interval, period, today=None):
+        """
+        Computes the streak statistics of the habit (see 'streak.compute_streak').
+
+        Args:
+            creation (date): The start date of the first interval.
+            interval (str): The interval type (e.g., "daily", "weekly").
+            period (int): The number of intervals the habit is tracked for.
+            today (date, optional): The reference date. Defaults to the current date.
+
+        Returns:
+            StreakResult: The streak statistics of the habit.
+        """
+        return compute_streak_from_indices(self.name, creation, interval, period,
+                                           self.interval_indices(creation, interval), len(self.days), today)
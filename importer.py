@@ -0,0 +1,100 @@
+import csv
+import json
+import os
+import time
+from datetime import date
+
+from db import DEFAULT_USER_ID, bulk_increment
+
+# File formats understood by the importer, keyed by file extension
+FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+
+def read_records(path, fmt=None):
+    """
+    Streams raw event records from a CSV or JSONL file.
+
+    CSV files need a header row; JSONL files contain one JSON object per line.
+    Each record provides a 'date' and the habit name as 'counterName' or 'habit',
+    and optionally the owner of the habit as 'user' (as written by the exporter).
+
+    Args:
+        path (str): The path of the file to read.
+        fmt (str, optional): "csv" or "jsonl". Defaults to detection by file extension.
+
+    Yields:
+        dict: One record per event.
+
+    Raises:
+        ValueError: If the file format is unknown.
+    """
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt == "csv":
+        with open(path, newline="", encoding="utf-8") as file:
+            yield from csv.DictReader(file)
+    elif fmt == "jsonl":
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        raise ValueError(f"Unknown import format for '{path}'. Use one of: csv, jsonl.")
+
+
+def import_events(db, path, fmt=None, batch_size=10000, user_id=DEFAULT_USER_ID):
+    """
+    Imports tracker events from a CSV or JSONL file in a single transaction.
+
+    Records are normalized and streamed into 'bulk_increment', so the file is
+    never loaded into memory as a whole. Records with a missing habit name or
+    an invalid date are counted as malformed and skipped. Records naming a
+    'user' other than the importing user are skipped, so a multi-user export
+    is re-imported one user at a time.
+
+    Args:
+        db: The database connection object.
+        path (str): The path of the file to import.
+        fmt (str, optional): "csv" or "jsonl". Defaults to detection by file extension.
+        batch_size (int, optional): The number of rows per insert batch.
+        user_id (int, optional): The user whose habits receive the events. Defaults to DEFAULT_USER_ID.
+
+    Returns:
+        dict: Import statistics with the keys 'read', 'inserted', 'rejected'
+        (unknown habit), 'malformed', 'other_user', 'seconds' and 'rows_per_second'.
+
+    Raises:
+        OSError, ValueError, csv.Error: If the file cannot be read or decoded; nothing is imported.
+        sqlite3.Error: If the events cannot be stored; nothing is imported.
+
+    Side Effects:
+        - Inserts rows into the 'tracker' table.
+        - Prints a summary of the import.
+    """
+    stats = {"read": 0, "malformed": 0, "other_user": 0}
+    user = db.execute("SELECT name FROM users WHERE id = ?", (user_id,)).fetchone()
+
+    def events():
+        for record in read_records(path, fmt):
+            stats["read"] += 1
+            try:
+                if record.get("user") and (user is None or record["user"] != user[0]):
+                    stats["other_user"] += 1
+                    continue
+                name = record.get("counterName") or record["habit"]
+                yield date.fromisoformat(record["date"]).isoformat(), name
+            except (AttributeError, KeyError, TypeError, ValueError):
+                stats["malformed"] += 1
+
+    start = time.perf_counter()
+    stats["inserted"], stats["rejected"] = bulk_increment(db, events(), batch_size, user_id)
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_second"] = stats["read"] / stats["seconds"] if stats["seconds"] else 0.0
+
+    print(f"Imported {stats['inserted']} of {stats['read']} rows from '{path}' "
+          f"({stats['rejected']} unknown habit, {stats['malformed']} malformed, {stats['other_user']} other user) "
+          f"in {stats['seconds']:.2f}s - {stats['rows_per_second']:.0f} rows/s.")
+    return stats
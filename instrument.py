@@ -0,0 +1,225 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Environment variable enabling the instrumentation: "table" (or "1") prints a
+# summary table on exit, "json" prints the summary as JSON
+ENV_VAR = "HABITTRACKER_PROFILE"
+
+_lock = threading.Lock()
+_local = threading.local()
+_stats = {}
+_format = None
+
+
+class _Frame:
+    """
+    Counters of one running instrumented call; SQL statements and rows are
+    added to every frame on the stack, so callers include their callees.
+    """
+    __slots__ = ("statements", "rows")
+
+    def __init__(self):
+        self.statements = 0
+        self.rows = 0
+
+
+def _stack():
+    """
+    Returns the stack of running instrumented calls of the current thread.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def enabled():
+    """
+    bool: True if calls are currently recorded.
+    """
+    return _format is not None
+
+
+def enable(fmt="table"):
+    """
+    Starts recording instrumented calls.
+
+    Connections opened by 'db.get_db' afterwards report their SQL statements
+    and fetched rows (see 'attach').
+
+    Args:
+        fmt (str, optional): The format of 'report': "table" or "json". Defaults to "table".
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    global _format
+    if fmt not in ("table", "json"):
+        raise ValueError(f"Unknown report format '{fmt}'. Use one of: table, json.")
+    _format = fmt
+
+
+def disable():
+    """
+    Stops recording; the collected statistics are kept until 'reset'.
+    """
+    global _format
+    _format = None
+
+
+def reset():
+    """
+    Discards the collected statistics.
+    """
+    with _lock:
+        _stats.clear()
+
+
+def _on_statement(statement):
+    for frame in _stack():
+        frame.statements += 1
+
+
+def _on_row(cursor, row):
+    for frame in _stack():
+        frame.rows += 1
+    return row
+
+
+def attach(db):
+    """
+    Counts the SQL statements executed and the rows fetched on a connection.
+
+    Statements are counted with a 'sqlite3' trace callback and rows with a
+    row factory that returns the rows unchanged. Both are only called while
+    the connection is used, so an attached connection costs nothing when idle.
+
+    Args:
+        db: The database connection object.
+    """
+    db.set_trace_callback(_on_statement)
+    db.row_factory = _on_row
+
+
+def _record(name, seconds, frame, failed):
+    with _lock:
+        entry = _stats.get(name)
+        if entry is None:
+            entry = _stats[name] = {"calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0,
+                                    "statements": 0, "rows": 0}
+        entry["calls"] += 1
+        entry["errors"] += failed
+        entry["seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+        entry["statements"] += frame.statements
+        entry["rows"] += frame.rows
+
+
+@contextmanager
+def measure(name):
+    """
+    Records the wall time, SQL statements and fetched rows of a block of code.
+
+    Does nothing unless the instrumentation is enabled. Blocks can be nested;
+    the statements and rows of inner blocks are included in the outer ones.
+
+    Args:
+        name (str): The name the block is reported under, e.g. a menu action.
+    """
+    if _format is None:
+        yield
+        return
+
+    stack = _stack()
+    frame = _Frame()
+    stack.append(frame)
+    failed = True
+    start = time.perf_counter()
+    try:
+        yield
+        failed = False
+    finally:
+        seconds = time.perf_counter() - start
+        stack.pop()
+        _record(name, seconds, frame, failed)
+
+
+def instrumented(func):
+    """
+    Records every call of a function under its qualified name (see 'measure').
+
+    While the instrumentation is disabled, the wrapper only checks a flag and
+    calls the function.
+
+    Args:
+        func: The function to instrument.
+
+    Returns:
+        The wrapped function.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _format is None:
+            return func(*args, **kwargs)
+        with measure(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def summary():
+    """
+    Returns the collected statistics.
+
+    Returns:
+        dict: Per recorded name a dict with 'calls', 'errors' (calls that raised),
+        'seconds' (total wall time), 'max_seconds', 'statements' and 'rows',
+        sorted by total wall time, slowest first.
+    """
+    with _lock:
+        entries = sorted(_stats.items(), key=lambda item: item[1]["seconds"], reverse=True)
+        return {name: dict(entry) for name, entry in entries}
+
+
+def report(fmt=None, file=None):
+    """
+    Prints the collected statistics as a table or as JSON.
+
+    Args:
+        fmt (str, optional): "table" or "json". Defaults to the enabled format.
+        file (optional): The stream to write to. Defaults to sys.stderr.
+    """
+    fmt = fmt or _format or "table"
+    file = file or sys.stderr
+    stats = summary()
+    if fmt == "json":
+        print(json.dumps(stats, indent=2), file=file)
+        return
+
+    width = max([len(name) for name in stats] + [8])
+    print(f"{'function':<{width}} {'calls':>7} {'errors':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9} "
+          f"{'sql':>7} {'rows':>9}", file=file)
+    for name, entry in stats.items():
+        print(f"{name:<{width}} {entry['calls']:>7} {entry['errors']:>6} {entry['seconds'] * 1000:>10.2f} "
+              f"{entry['seconds'] * 1000 / entry['calls']:>9.2f} {entry['max_seconds'] * 1000:>9.2f} "
+              f"{entry['statements']:>7} {entry['rows']:>9}", file=file)
+
+
+def enable_from_env():
+    """
+    Enables the instrumentation if the environment variable ENV_VAR is set.
+
+    Returns:
+        bool: True if the instrumentation was enabled.
+    """
+    value = os.environ.get(ENV_VAR, "").strip().lower()
+    if value in ("", "0", "off", "false"):
+        return False
+    enable("json" if value == "json" else "table")
+    return True
@@ -1,13 +1,22 @@
-import questionary
-from db import get_db, get_predefined_habits, get_existing_habits, initial_load_tracker, get_existing_habits_short
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from db import get_db, get_predefined_habits, get_existing_habits, initial_load_tracker, get_existing_habits_short, \
+    rebuild_streak_state, rebuild_rollups, rename_counter, get_counter_id, get_user_id, DEFAULT_USER_ID
 from counter import Counter
+from instrument import enable_from_env, report
 from datetime import datetime
-from analyse import total_habit, total_tracker, total_tracker_habit, plot_tracker_counts, analyze_streak
+from analyse import total_habit, total_tracker, total_tracker_habit, plot_tracker_counts, analyze_streak, \
+    analyze_all_streaks, total_tracker_per_habit, get_materialized_streak
 
 
-def cli():
+def cli(db_path="main.db"):
     global datetime
-    db = get_db()
+    # The prompt library is only needed for the interactive mode
+    import questionary
+    db = get_db(db_path)
     cursor = db.cursor()
     initial_load_tracker(db.cursor())  # Initial-Load durchführen
     db.commit()
@@ -30,7 +39,8 @@ def cli():
         if choice == "Habit Administration":
             choice = questionary.select(
                 "What you want to do?",
-                choices=["Creation of a new habit", "Selection of a predefined habit", "Delete existing habit", "Exit"]
+                choices=["Creation of a new habit", "Selection of a predefined habit", "Delete existing habit",
+                         "Rename existing habit", "Rebuild streak statistics", "Exit"]
             ).ask()
 
             if choice == "Creation of a new habit":
@@ -42,8 +52,8 @@ def cli():
                     return
 
                 # Check if the name already exists in the table
-                existing_counter = db.execute("SELECT name FROM counter WHERE LOWER(name) = LOWER(?)",
-                                              (name,)).fetchone()
+                existing_counter = db.execute("SELECT name FROM counter WHERE user_id = ? AND LOWER(name) = LOWER(?)",
+                                              (DEFAULT_USER_ID, name)).fetchone()
 
                 if existing_counter:
                     print(f"A habit with the name '{name}' already exists. Please choose a different name.")
@@ -118,7 +128,8 @@ def cli():
                                 # Check if the name already exists in the counter table
                                 db.execute("PRAGMA foreign_keys = ON;")
                                 existing_counter = db.execute(
-                                    "SELECT name FROM counter WHERE LOWER(name) = LOWER(?)", (name,)
+                                    "SELECT name FROM counter WHERE user_id = ? AND LOWER(name) = LOWER(?)",
+                                    (DEFAULT_USER_ID, name)
                                 ).fetchone()
                                 if existing_counter:
                                     print(
@@ -154,8 +165,8 @@ def cli():
 
                     # Retrieve habit details (name, description, interval) from the database
                     habit_details = db.execute(
-                        "SELECT name, description, interval, period, creation FROM counter WHERE name = ?",
-                        (habit_name,)
+                        "SELECT name, description, interval, period, creation FROM counter WHERE user_id = ? AND name = ?",
+                        (DEFAULT_USER_ID, habit_name)
                     ).fetchone()
 
                     if habit_details:
@@ -176,6 +187,35 @@ def cli():
                         print(f"Error: Habit '{habit_name}' not found in the database.")
                 db.commit()
 
+            if choice == "Rename existing habit":
+                existing_habits = get_existing_habits_short(db)
+
+                if not existing_habits:
+                    print("No existing habits available.")
+                else:
+                    habit_name = questionary.select(
+                        "Please select the habit to rename:",
+                        choices=existing_habits
+                    ).ask()
+
+                    # Handle case where user cancels the selection
+                    if not habit_name:
+                        print("No habit selected. Aborting rename.")
+                        return
+
+                    new_name = questionary.text(f"What is the new name of '{habit_name}'?").ask()
+
+                    # The tracking history refers to the habit id and is kept as it is;
+                    # 'rename_counter' reports the outcome
+                    if new_name:
+                        rename_counter(db, habit_name, new_name)
+
+            if choice == "Rebuild streak statistics":
+                # Recompute the materialized streak state and rollup counts of all habits from the tracker history
+                rebuild_streak_state(db)
+                rebuild_rollups(db)
+                print("Streak statistics have been rebuilt for all habits.")
+
         elif choice == "Habit Tracking":
             choice = questionary.select(
                 "What you want to do?",
@@ -200,8 +240,8 @@ def cli():
 
                     # Fetch habit details from the database
                     habit_details = db.execute(
-                        "SELECT name, description, interval, period, creation FROM counter WHERE name = ?",
-                        (name,)
+                        "SELECT name, description, interval, period, creation FROM counter WHERE user_id = ? AND name = ?",
+                        (DEFAULT_USER_ID, name)
                     ).fetchone()
 
                     if habit_details:
@@ -211,18 +251,19 @@ def cli():
 
                         # Check if an entry already exists for today
                         from datetime import datetime
-                        today = datetime.now().strftime('%Y-%m-%d')
+                        today = datetime.now().date()
 
+                        # Seek on the (habit_id, day) key of 'events' instead of scanning the 'tracker' view
                         existing_entry = db.execute(
-                            "SELECT 1 FROM tracker WHERE date = ? AND counterName = ?",
-                            (today, name)
+                            "SELECT 1 FROM events WHERE habit_id = ? AND day = ?",
+                            (get_counter_id(db, name, DEFAULT_USER_ID), today.toordinal())
                         ).fetchone()
 
                         if existing_entry:
                             print(f"An entry for '{name}' already exists for {today}.")
                         else:
                             # Add the event since it does not exist
-                            counter.add_event(db)
+                            counter.add_event(db, today.isoformat())
                             db.commit()  # Commit only after an event is added
                             print(f"A new entry for '{name}' on {today} was successfully created.")
                     else:
@@ -248,8 +289,8 @@ def cli():
 
                     # Retrieve habit details (name, description, interval, period, creation) from the database
                     habit_details = db.execute(
-                        "SELECT name, description, interval, period, creation FROM counter WHERE name = ?",
-                        (selected_habit,)  # Pass the selected habit as a scalar value
+                        "SELECT name, description, interval, period, creation FROM counter WHERE user_id = ? AND name = ?",
+                        (DEFAULT_USER_ID, selected_habit)
                     ).fetchone()
 
                     if habit_details:
@@ -278,7 +319,7 @@ def cli():
         if choice == "Habit Analysis":
             choice = questionary.select(
                 "What you want to do?",
-                choices=["Habit count total", "Tracker count total", "Tracker count per habit", "Tracker count per habit - visualized", "Streak analysis", "Exit"]
+                choices=["Habit count total", "Tracker count total", "Tracker count per habit", "Tracker count per habit - visualized", "Streak analysis", "Streak analysis - all habits", "Exit"]
             ).ask()
 
             if choice == "Habit count total":
@@ -365,9 +406,234 @@ def cli():
                     else:
                         print("No habit selected. Exiting.")
 
+            if choice == "Streak analysis - all habits":
+                results = analyze_all_streaks(db)
+
+                if not results:
+                    print("No existing habits available.")
+                for result in results.values():
+                    print(result.report())  # Display the streak analysis report per habit
+
         else:
             print("Bye!")
             stop = True
 
+def print_output(data, as_json, text):
+    """
+    Prints the result of a subcommand either as JSON or as human-readable text.
+
+    Args:
+        data: JSON-serializable result data.
+        as_json (bool): Print 'data' as JSON instead of 'text'.
+        text (str): The human-readable representation.
+    """
+    print(json.dumps(data, indent=2) if as_json else text)
+
+
+def track_command(db, args):
+    """
+    Records an event for a habit ('main.py track').
+
+    Args:
+        db: The database connection object.
+        args: The parsed command line arguments.
+
+    Returns:
+        int: The exit code (1 if the habit or date is invalid).
+    """
+    habit_details = db.execute(
+        "SELECT name, description, interval, period, creation FROM counter WHERE user_id = ? AND name = ?",
+        (args.user_id, args.habit)
+    ).fetchone()
+    if not habit_details:
+        print_output({"error": f"Habit '{args.habit}' not found"}, args.json,
+                     f"Error: Habit '{args.habit}' not found in the database.")
+        return 1
+
+    event_date = args.date or datetime.now().strftime('%Y-%m-%d')
+    try:
+        datetime.strptime(event_date, '%Y-%m-%d')
+    except ValueError:
+        print_output({"error": f"Invalid date '{args.date}'"}, args.json,
+                     f"Error: Invalid date '{args.date}', expected YYYY-MM-DD.")
+        return 1
+
+    changes = db.total_changes
+    Counter(*habit_details, user_id=args.user_id).add_event(db, event_date)
+    inserted = db.total_changes > changes
+    print_output({"habit": args.habit, "date": event_date, "inserted": inserted}, args.json,
+                 f"A new entry for '{args.habit}' on {event_date} was successfully created." if inserted
+                 else f"An entry for '{args.habit}' already exists for {event_date}.")
+    return 0
+
+
+def streak_command(db, args):
+    """
+    Prints the streak analysis of one or all habits ('main.py streak').
+
+    Args:
+        db: The database connection object.
+        args: The parsed command line arguments.
+
+    Returns:
+        int: The exit code (1 if the habit does not exist).
+    """
+    if args.all:
+        results = list(analyze_all_streaks(db, args.user_id).values())
+    elif args.habit:
+        result = get_materialized_streak(db, args.habit, args.user_id)
+        if result is None:
+            print_output({"error": f"Habit '{args.habit}' not found"}, args.json,
+                         f"Habit '{args.habit}' not found in the database.")
+            return 1
+        results = [result]
+    else:
+        print("Error: Specify a habit or --all.", file=sys.stderr)
+        return 2
+
+    print_output([result.to_dict() for result in results], args.json,
+                 "\n".join(result.report() for result in results))
+    return 0
+
+
+def stats_command(db, args):
+    """
+    Prints the total and per-habit tracker counts ('main.py stats').
+
+    Args:
+        db: The database connection object.
+        args: The parsed command line arguments.
+
+    Returns:
+        int: The exit code.
+    """
+    per_habit = total_tracker_per_habit(db, args.user_id)
+    data = {"habits": total_habit(db, args.user_id), "tracker_entries": total_tracker(db, args.user_id),
+            "tracker_entries_per_habit": per_habit}
+    text = f"Total number of habit entries: {data['habits']}\n"
+    text += f"Total number of tracker entries: {data['tracker_entries']}"
+    for name, count in per_habit.items():
+        text += f"\n- {name}: {count}"
+    print_output(data, args.json, text)
+    return 0
+
+
+def import_command(db, args):
+    """
+    Imports tracker events from a CSV or JSONL file ('main.py import').
+
+    Args:
+        db: The database connection object.
+        args: The parsed command line arguments.
+
+    Returns:
+        int: The exit code (1 if the file cannot be read or the events cannot be stored).
+    """
+    from importer import import_events
+
+    try:
+        import_events(db, args.path, args.format, args.batch_size, args.user_id)
+    except (OSError, ValueError, csv.Error, sqlite3.Error) as e:
+        print(f"Error importing '{args.path}': {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def export_command(db, args):
+    """
+    Exports the tracker or counter table to a CSV or columnar file ('main.py export').
+
+    Args:
+        db: The database connection object.
+        args: The parsed command line arguments.
+
+    Returns:
+        int: The exit code (1 if the file cannot be written).
+    """
+    from exporter import export_table
+
+    try:
+        export_table(db, args.path, args.table, args.format, args.batch_size)
+    except (OSError, ValueError) as e:
+        print(f"Error exporting to '{args.path}': {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None):
+    """
+    Parses the command line and runs the requested subcommand.
+
+    Without a subcommand, the interactive CLI is started. Subcommands run
+    without prompts and without the initial tracker load, and share a single
+    database connection. If the environment variable HABITTRACKER_PROFILE is
+    set ("table" or "json"), per-function timings and SQL statistics are
+    printed to stderr on exit (see 'instrument').
+
+    Args:
+        argv (list of str, optional): The command line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: The exit code.
+    """
+    parser = argparse.ArgumentParser(description="Habit tracking app")
+    parser.add_argument("--db", default="main.db", help="database file (default: main.db)")
+    parser.add_argument("--user", help="name of the user whose habits are used (default: the default user)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    track = subparsers.add_parser("track", help="record an event for a habit")
+    track.add_argument("habit", help="name of the habit")
+    track.add_argument("--date", help="event date as YYYY-MM-DD (default: today)")
+    track.add_argument("--json", action="store_true", help="print the result as JSON")
+    track.set_defaults(handler=track_command)
+
+    streak = subparsers.add_parser("streak", help="show the streak analysis of a habit")
+    streak.add_argument("habit", nargs="?", help="name of the habit")
+    streak.add_argument("--all", action="store_true", help="analyze all habits")
+    streak.add_argument("--json", action="store_true", help="print the result as JSON")
+    streak.set_defaults(handler=streak_command)
+
+    stats = subparsers.add_parser("stats", help="show habit and tracker counts")
+    stats.add_argument("--json", action="store_true", help="print the result as JSON")
+    stats.set_defaults(handler=stats_command)
+
+    importer = subparsers.add_parser("import", help="import tracker events from a CSV or JSONL file")
+    importer.add_argument("path", help="file with 'date' and 'counterName' (or 'habit') fields")
+    importer.add_argument("--format", choices=["csv", "jsonl"], help="file format (default: by extension)")
+    importer.add_argument("--batch-size", type=int, default=10000, help="rows per insert batch")
+    importer.set_defaults(handler=import_command)
+
+    exporter = subparsers.add_parser("export", help="export the tracker or counter table to a CSV or columnar file")
+    exporter.add_argument("path", help="output file (.csv or .htc)")
+    exporter.add_argument("--table", choices=["tracker", "counter"], default="tracker", help="table to export")
+    exporter.add_argument("--format", choices=["csv", "columnar"], help="file format (default: by extension)")
+    exporter.add_argument("--batch-size", type=int, default=10000, help="rows fetched per batch")
+    exporter.set_defaults(handler=export_command)
+
+    args = parser.parse_args(argv)
+    # Opt-in timing and SQL statistics, printed to stderr when the command or the CLI ends
+    profiling = enable_from_env()
+    try:
+        if args.command is None:
+            # The interactive CLI works on the habits of the default user only
+            if args.user:
+                parser.error("--user requires a subcommand; the interactive CLI uses the default user")
+            cli(args.db)
+            return 0
+
+        db = get_db(args.db)
+        try:
+            args.user_id = get_user_id(db, args.user) if args.user else DEFAULT_USER_ID
+            if args.user_id is None:
+                print(f"Error: User '{args.user}' not found in the database.", file=sys.stderr)
+                return 1
+            return args.handler(db, args)
+        finally:
+            db.close()
+    finally:
+        if profiling:
+            report()
+
+
 if __name__ == '__main__':
-    cli()
\ No newline at end of file
+    sys.exit(main())
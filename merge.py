@@ -0,0 +1,136 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+from db import get_db, add_user, rebuild_rollups, rebuild_streak_state
+from cache import invalidate_database
+
+
+def merge_database(db, path, user_name=None, batch_size=10000):
+    """
+    Merges the habits and tracking events of a per-user database file into a shared database.
+
+    The source file is copied with the SQLite backup API (including a pending
+    WAL) and the copy is migrated to the current schema, so files of any
+    earlier version can be merged without being modified. All habits of the
+    file are assigned to one user; habits the user already has are matched by
+    name and their events are merged, so merging the same file twice adds
+    nothing. The merge of a file runs in a single transaction; afterwards the
+    streak state and rollup counts of the merged habits are rebuilt and the
+    cached results of the shared database are dropped.
+
+    Args:
+        db: The connection to the shared database.
+        path (str): The path of the per-user database file.
+        user_name (str, optional): The user owning the merged habits. Defaults to the file name
+            without extension; the user is created if it does not exist.
+        batch_size (int, optional): The number of events copied per batch.
+
+    Returns:
+        dict: Merge statistics with the keys 'user', 'user_id', 'habits' (habits in the file),
+        'new_habits' and 'events' (newly inserted events).
+
+    Raises:
+        sqlite3.Error: If a database cannot be read or written; the shared database is rolled back.
+
+    Side Effects:
+        - Inserts rows into the 'users', 'counter' and 'events' tables.
+        - Replaces the merged habits' rows of the 'streak_state' and 'rollup' tables.
+        - Commits the transactions.
+        - Invalidates the cached results of the shared database.
+        - Prints a summary of the merge.
+    """
+    user_name = user_name or Path(path).stem
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, "source.db")
+        source = sqlite3.connect(f"{Path(path).absolute().as_uri()}?mode=ro", uri=True)
+        target = sqlite3.connect(copy)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+
+        source = get_db(copy, "fast")
+        try:
+            user_id = add_user(db, user_name)
+            cur = db.cursor()
+            try:
+                habits = source.execute(
+                    "SELECT id, name, description, interval, period, creation FROM counter ORDER BY id"
+                ).fetchall()
+                before = db.total_changes
+                cur.executemany("""
+                    INSERT OR IGNORE INTO counter (user_id, name, description, interval, period, creation)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, [(user_id, *habit[1:]) for habit in habits])
+                new_habits = db.total_changes - before
+
+                # Map the habit ids of the file to the ids in the shared database
+                ids = dict(cur.execute("SELECT name, id FROM counter WHERE user_id = ?", (user_id,)).fetchall())
+                mapping = {habit[0]: ids[habit[1]] for habit in habits}
+
+                events = source.execute("SELECT habit_id, day FROM events ORDER BY habit_id, day")
+                inserted = 0
+                while batch := events.fetchmany(batch_size):
+                    cur.executemany("INSERT OR IGNORE INTO events (habit_id, day) VALUES (?, ?)",
+                                    [(mapping[habit_id], day) for habit_id, day in batch])
+                    # Not 'total_changes', which also counts the rollup rows written by triggers
+                    inserted += cur.rowcount
+                db.commit()
+            except sqlite3.Error:
+                db.rollback()
+                raise
+            finally:
+                cur.close()
+        finally:
+            source.close()
+
+    for habit in habits:
+        rebuild_streak_state(db, habit[1], user_id)
+        rebuild_rollups(db, habit[1], user_id)
+    invalidate_database(db)
+    stats = {"user": user_name, "user_id": user_id, "habits": len(habits), "new_habits": new_habits,
+             "events": inserted}
+    print(f"Merged '{path}' into user '{user_name}': {len(habits)} habits ({new_habits} new), "
+          f"{inserted} new events.")
+    return stats
+
+
+def main(argv=None):
+    """
+    Merges per-user database files into a shared database ('python merge.py').
+
+    Args:
+        argv (list of str, optional): The command line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: The exit code (1 if a file could not be merged).
+    """
+    parser = argparse.ArgumentParser(description="Merge per-user habit tracker databases into one shared database")
+    parser.add_argument("target", help="shared database file (created if it does not exist)")
+    parser.add_argument("sources", nargs="+", help="per-user database files")
+    parser.add_argument("--users", nargs="+", help="user name per source file (default: the file names)")
+    args = parser.parse_args(argv)
+    if args.users and len(args.users) != len(args.sources):
+        parser.error("--users needs one name per source file")
+
+    db = get_db(args.target)
+    status = 0
+    try:
+        for index, path in enumerate(args.sources):
+            try:
+                merge_database(db, path, args.users[index] if args.users else None)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Error merging '{path}': {e}", file=sys.stderr)
+                status = 1
+    finally:
+        db.close()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
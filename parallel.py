@@ -0,0 +1,89 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from analyse import _analyze_streaks
+from db import DEFAULT_USER_ID, get_db
+
+# The read-only connection of a worker process, opened once by '_init_worker'
+_worker_db = None
+
+
+def _init_worker(path):
+    """
+    Opens the read-only connection of a worker process.
+    """
+    global _worker_db
+    _worker_db = get_db(path, "readonly")
+
+
+def _analyze_range(user_id, first_id, last_id):
+    """
+    Computes the streak statistics of the habits with ids from 'first_id' to 'last_id' in a worker process.
+    """
+    return _analyze_streaks(_worker_db, user_id, first_id, last_id)
+
+
+def partition(ids, parts):
+    """
+    Splits sorted habit ids into contiguous, roughly equally sized id ranges.
+
+    Args:
+        ids (list of int): The sorted habit ids.
+        parts (int): The maximum number of ranges.
+
+    Returns:
+        list of tuple: (first id, last id) per range, in id order.
+    """
+    parts = max(1, min(parts, len(ids)))
+    size, rest = divmod(len(ids), parts)
+    ranges, start = [], 0
+    for index in range(parts):
+        stop = start + size + (index < rest)
+        if stop > start:
+            ranges.append((ids[start], ids[stop - 1]))
+        start = stop
+    return ranges
+
+
+def analyze_all_streaks_parallel(path, workers=None, chunks_per_worker=4, user_id=DEFAULT_USER_ID):
+    """
+    Computes the streak statistics of every habit of a user in parallel worker processes.
+
+    The streak computation is pure Python and bound by one CPU core per
+    process, so for large databases the habits are split into contiguous id
+    ranges that are analyzed by a process pool. Every worker opens its own
+    read-only connection to the database file; only the id ranges and the
+    StreakResult objects are passed between processes. A few ranges per worker
+    even out habits with very different numbers of events.
+
+    The result equals 'analyse.analyze_all_streaks' for the same database, but
+    is not cached, as the workers do not share the result cache.
+
+    Args:
+        path (str): The path of the database file.
+        workers (int, optional): The number of worker processes. Defaults to the number of CPUs.
+        chunks_per_worker (int, optional): The number of id ranges per worker. Defaults to 4.
+        user_id (int, optional): The owner of the habits. Defaults to DEFAULT_USER_ID.
+
+    Returns:
+        dict: A mapping of habit name to StreakResult, in habit name order.
+    """
+    workers = workers or os.cpu_count() or 1
+    db = get_db(path, "readonly")
+    try:
+        ids = [row[0] for row in db.execute("SELECT id FROM counter WHERE user_id = ? ORDER BY id", (user_id,))]
+    finally:
+        db.close()
+    if not ids:
+        return {}
+
+    ranges = partition(ids, workers * chunks_per_worker)
+    # "spawn" starts clean interpreters on every platform, without inheriting open connections
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=get_context("spawn"),
+                             initializer=_init_worker, initargs=(path,)) as executor:
+        futures = [executor.submit(_analyze_range, user_id, first, last) for first, last in ranges]
+        merged = {}
+        for future in futures:
+            merged.update(future.result())
+    return dict(sorted(merged.items()))
@@ -0,0 +1,147 @@
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+
+from db import get_db
+
+
+class ConnectionPool:
+    """
+    Thread-safe access to one database file for the db and analyse functions.
+
+    Every thread gets its own read-only connection, created on first use, so
+    analysis functions can run concurrently in worker threads. All writes go
+    through a single writer connection that is serialized by a lock, which
+    avoids lock contention between writers inside SQLite. Connections keep a
+    cache of prepared statements, so repeated queries are not parsed again.
+
+    Usage:
+        with ConnectionPool("main.db") as pool:
+            pool.write(increment_counter, "Reading")
+            report = pool.read(analyze_streak, "Reading")
+
+    Attributes:
+        path (str): The database file.
+        profile (str): The 'get_db' profile of the writer connection.
+        cached_statements (int): The size of the statement cache per connection.
+
+    Args:
+        path (str, optional): Defaults to "main.db".
+        profile (str, optional): Defaults to "fast".
+        cached_statements (int, optional): Defaults to 256.
+    """
+
+    def __init__(self, path="main.db", profile="fast", cached_statements=256):
+        self.path = path
+        self.profile = profile
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()  # Guards the writer connection
+        self._readers_lock = threading.Lock()  # Guards the list of reader connections
+        self._readers = []
+        self._closed = False
+        # The writer is opened first, so the schema exists before any reader connects
+        self._writer = get_db(path, profile, cached_statements=cached_statements, check_same_thread=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    @contextmanager
+    def reader(self):
+        """
+        Provides the read-only connection of the calling thread.
+
+        Yields:
+            sqlite3.Connection: A connection that must only be used by the calling thread.
+
+        Raises:
+            sqlite3.ProgrammingError: If the pool is closed.
+        """
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed.")
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Readers are closed by 'close' from another thread, hence check_same_thread=False
+            db = get_db(self.path, "readonly", cached_statements=self.cached_statements, check_same_thread=False)
+            self._local.db = db
+            with self._readers_lock:
+                self._readers.append(db)
+        yield db
+
+    @contextmanager
+    def writer(self):
+        """
+        Provides exclusive access to the writer connection.
+
+        A transaction left open by the block is committed on success and
+        rolled back if the block raises.
+
+        Yields:
+            sqlite3.Connection: The writer connection.
+
+        Raises:
+            sqlite3.ProgrammingError: If the pool is closed.
+        """
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed.")
+            try:
+                yield self._writer
+            except BaseException:
+                self._writer.rollback()
+                raise
+            else:
+                if self._writer.in_transaction:
+                    self._writer.commit()
+
+    @contextmanager
+    def cursor(self, write=False):
+        """
+        Provides a cursor that is closed when the block ends.
+
+        Args:
+            write (bool, optional): Use the writer instead of the thread's reader. Defaults to False.
+
+        Yields:
+            sqlite3.Cursor: The cursor.
+        """
+        with (self.writer() if write else self.reader()) as db, closing(db.cursor()) as cur:
+            yield cur
+
+    def read(self, func, *args, **kwargs):
+        """
+        Calls 'func(db, *args, **kwargs)' with the calling thread's read-only connection.
+
+        Returns:
+            The return value of 'func'.
+        """
+        with self.reader() as db:
+            return func(db, *args, **kwargs)
+
+    def write(self, func, *args, **kwargs):
+        """
+        Calls 'func(db, *args, **kwargs)' with exclusive access to the writer connection.
+
+        Returns:
+            The return value of 'func'.
+        """
+        with self.writer() as db:
+            return func(db, *args, **kwargs)
+
+    def close(self):
+        """
+        Closes the writer and all reader connections.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._writer.close()
+        with self._readers_lock:
+            for db in self._readers:
+                db.close()
+            self._readers.clear()
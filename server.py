@@ -0,0 +1,236 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from analyse import get_materialized_streak, total_habit, total_tracker, total_tracker_habit
+from db import DEFAULT_USER_ID, bulk_increment
+from pool import ConnectionPool
+
+
+class IngestionServer:
+    """
+    An asyncio server that accepts habit check-ins from many clients concurrently.
+
+    Clients send newline-delimited JSON requests over TCP or a Unix socket and
+    receive one JSON response line per request. Supported operations:
+
+        {"op": "track", "habit": "Reading", "date": "2021-12-01"}  ("date" is optional)
+        {"op": "count", "habit": "Reading"}
+        {"op": "streak", "habit": "Reading"}
+        {"op": "stats"}
+
+    All "track" events are funneled through a queue into a single writer task,
+    which inserts everything that queued up while the previous batch was being
+    written in one transaction (group commit) through the writer connection of
+    a ConnectionPool. Read operations run on a pool of threads, each using its
+    own read-only connection of the ConnectionPool.
+
+    Attributes:
+        path (str): The database file.
+        readers (int): The number of read threads and connections.
+        max_batch (int): The maximum number of events per write transaction.
+        profile (str): The 'get_db' profile of the writer connection.
+
+    Args:
+        path (str, optional): Defaults to "main.db".
+        readers (int, optional): Defaults to 4.
+        max_batch (int, optional): Defaults to 1000.
+        profile (str, optional): Defaults to "fast".
+    """
+
+    def __init__(self, path="main.db", readers=4, max_batch=1000, profile="fast"):
+        self.path = path
+        self.readers = readers
+        self.max_batch = max_batch
+        self.profile = profile
+        self._pool = None
+        self._write_executor = None
+        self._read_executor = None
+        self._queue = None
+        self._writer_task = None
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=0, unix_path=None):
+        """
+        Opens the database connections and starts listening.
+
+        Args:
+            host (str, optional): The TCP host. Defaults to "127.0.0.1".
+            port (int, optional): The TCP port; 0 picks a free port. Defaults to 0.
+            unix_path (str, optional): Listen on this Unix socket instead of TCP.
+
+        Returns:
+            The bound address: (host, port) for TCP, or the socket path.
+        """
+        self._pool = ConnectionPool(self.path, self.profile)
+        self._write_executor = ThreadPoolExecutor(1)
+        self._read_executor = ThreadPoolExecutor(self.readers)
+
+        self._queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._write_loop())
+
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self._handle, path=unix_path)
+            return unix_path
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        """
+        Serves requests until the task is cancelled.
+        """
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """
+        Stops accepting connections, writes all queued events and closes the database connections.
+        """
+        self._server.close()
+        await self._server.wait_closed()
+        await self._queue.join()
+        self._writer_task.cancel()
+        self._write_executor.shutdown()
+        self._read_executor.shutdown()
+        self._pool.close()
+
+    async def _handle(self, reader, writer):
+        """
+        Serves the requests of a single client connection.
+        """
+        try:
+            while line := await reader.readline():
+                try:
+                    response = await self._dispatch(json.loads(line))
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request):
+        """
+        Executes a single request.
+
+        Returns:
+            dict: The response, with "ok" set to False and an "error" message on failure.
+        """
+        op = request.get("op")
+        loop = asyncio.get_running_loop()
+
+        if op == "track":
+            event_date = date.fromisoformat(request.get("date") or date.today().isoformat()).isoformat()
+            done = loop.create_future()
+            await self._queue.put(((event_date, request["habit"]), done))
+            return await done
+
+        if op == "count":
+            count = await loop.run_in_executor(self._read_executor, self._pool.read, total_tracker_habit,
+                                               request["habit"])
+            return {"ok": True, "habit": request["habit"], "count": count}
+
+        if op == "streak":
+            result = await loop.run_in_executor(self._read_executor, self._pool.read, get_materialized_streak,
+                                                request["habit"])
+            if result is None:
+                return {"ok": False, "error": f"Habit '{request['habit']}' not found"}
+            return {"ok": True, **result.to_dict()}
+
+        if op == "stats":
+            habits = await loop.run_in_executor(self._read_executor, self._pool.read, total_habit)
+            entries = await loop.run_in_executor(self._read_executor, self._pool.read, total_tracker)
+            return {"ok": True, "habits": habits, "tracker_entries": entries}
+
+        return {"ok": False, "error": f"Unknown operation '{op}'"}
+
+    async def _write_loop(self):
+        """
+        Writes queued events in group commits until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # Everything that queued up in the meantime goes into the same transaction
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                responses = await loop.run_in_executor(self._write_executor, self._pool.write, self._write,
+                                                       [event for event, _ in batch])
+                for (_, done), response in zip(batch, responses):
+                    done.set_result(response)
+            except Exception as e:
+                for _, done in batch:
+                    done.set_result({"ok": False, "error": str(e)})
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _write(db, events):
+        """
+        Inserts a batch of events in one transaction on the writer connection.
+
+        Returns:
+            list of dict: One response per event.
+        """
+        known = {row[0] for row in db.execute("SELECT name FROM counter WHERE user_id = ?", (DEFAULT_USER_ID,))}
+        bulk_increment(db, [event for event in events if event[1] in known])
+        return [
+            {"ok": True, "habit": name, "date": event_date} if name in known
+            else {"ok": False, "error": f"Habit '{name}' not found"}
+            for event_date, name in events
+        ]
+
+
+async def request(reader, writer, payload):
+    """
+    Sends a request to an ingestion server and waits for its response.
+
+    Args:
+        reader (asyncio.StreamReader): The reader of an open client connection.
+        writer (asyncio.StreamWriter): The writer of an open client connection.
+        payload (dict): The request.
+
+    Returns:
+        dict: The response.
+    """
+    writer.write(json.dumps(payload).encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def serve(path, host, port, unix_path, readers):
+    """
+    Runs an ingestion server until interrupted.
+    """
+    server = IngestionServer(path, readers)
+    address = await server.start(host, port, unix_path)
+    print(f"Serving habit check-ins for '{path}' on {address}.")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asynchronous check-in server for the habit tracker")
+    parser.add_argument("--db", default="main.db", help="database file (default: main.db)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--readers", type=int, default=4, help="number of read-only connections")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.unix, args.readers))
+    except KeyboardInterrupt:
+        print("Server stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from analyse import (analyze_all_streaks, analyze_streak, get_materialized_streak, total_habit, total_tracker,
+                     total_tracker_habit, total_tracker_per_habit)
+from db import DEFAULT_USER_ID, add_counter, add_user, get_counter_data, get_user_id, increment_counter
+from cache import invalidate_database
+from pool import ConnectionPool
+
+
+def shard_paths(path, count):
+    """
+    Derives the file names of the shards of a database, e.g. "main.db" -> "main.0.db", "main.1.db", ...
+
+    Args:
+        path (str): The path of the unsharded database file.
+        count (int): The number of shards.
+
+    Returns:
+        list of str: The shard file paths.
+    """
+    path = Path(path)
+    return [str(path.with_name(f"{path.stem}.{index}{path.suffix}")) for index in range(count)]
+
+
+class ShardedDatabase:
+    """
+    Distributes habits across several SQLite files, so writes to different shards do not share a file lock.
+
+    Every habit lives in exactly one shard, chosen by the CRC-32 of its name
+    (or of its user's name with route="user", which keeps all habits of a user
+    together). Per-habit functions are dispatched to that shard; aggregations
+    over all habits run on every shard in parallel threads and are merged.
+    Each shard is accessed through a ConnectionPool, so the shard's writes are
+    serialized while reads run concurrently.
+
+    The number and order of the shard files must not change once habits were
+    added, as the routing depends on them.
+
+    Usage:
+        with ShardedDatabase(shard_paths("main.db", 4)) as shards:
+            shards.increment_counter("Reading")
+            total = shards.total_tracker()
+
+    Attributes:
+        paths (list of str): The shard files, in routing order.
+        route (str): "habit" or "user", the name the routing hash is computed from.
+
+    Args:
+        paths (list of str): The shard files; missing files are created.
+        route (str, optional): "habit" or "user". Defaults to "habit".
+        profile (str, optional): The 'get_db' profile of the writer connections. Defaults to "fast".
+
+    Raises:
+        ValueError: If no shard is given or the route is unknown.
+    """
+
+    def __init__(self, paths, route="habit", profile="fast"):
+        if not paths:
+            raise ValueError("A sharded database needs at least one shard.")
+        if route not in ("habit", "user"):
+            raise ValueError(f"Unknown shard route '{route}'. Use one of: habit, user.")
+        self.paths = list(paths)
+        self.route = route
+        self._pools = [ConnectionPool(path, profile) for path in self.paths]
+        self._executor = ThreadPoolExecutor(max_workers=len(self._pools), thread_name_prefix="shard")
+        for index, pool in enumerate(self._pools):
+            pool.write(self._drop_misrouted, index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def shard_index(self, name, user=None):
+        """
+        Returns the index of the shard that stores a habit.
+
+        Args:
+            name (str): The name of the habit.
+            user (str, optional): The name of the habit's user. Defaults to the default user.
+
+        Returns:
+            int: The shard index.
+        """
+        key = name if self.route == "habit" else (user or "default")
+        return zlib.crc32(key.encode("utf-8")) % len(self._pools)
+
+    def _drop_misrouted(self, db, index):
+        """
+        Removes the predefined habits that every new database file receives from
+        the shards they are not routed to, so each habit exists in one shard only.
+
+        Only habits of the default user without any events are removed.
+        """
+        habits = db.execute("""
+            SELECT name FROM counter c
+            WHERE user_id = ? AND NOT EXISTS (SELECT 1 FROM events e WHERE e.habit_id = c.id)
+        """, (DEFAULT_USER_ID,)).fetchall()
+        misrouted = [(DEFAULT_USER_ID, name) for (name,) in habits if self.shard_index(name) != index]
+        if misrouted:
+            db.executemany("DELETE FROM counter WHERE user_id = ? AND name = ?", misrouted)
+            invalidate_database(db)
+
+    def _user_id(self, db, user, create=False):
+        """
+        Resolves a user name to its id in one shard; user ids are local to a shard file.
+        """
+        if user is None:
+            return DEFAULT_USER_ID
+        return add_user(db, user) if create else get_user_id(db, user)
+
+    def _read_habit(self, func, name, user, missing, *args):
+        """
+        Calls 'func(db, name, *args, user_id=...)' on the shard of a habit.
+        """
+        def call(db):
+            user_id = self._user_id(db, user)
+            return missing if user_id is None else func(db, name, *args, user_id=user_id)
+        return self._pools[self.shard_index(name, user)].read(call)
+
+    def fan_out(self, func, *args, user=None):
+        """
+        Calls 'func(db, *args, user_id=...)' on every shard in parallel threads.
+
+        Shards in which the user does not exist are skipped.
+
+        Args:
+            func: A read function of the db or analyse module.
+            *args: Further positional arguments of 'func'.
+            user (str, optional): The name of the user. Defaults to the default user.
+
+        Returns:
+            list: The results of the shards, in shard order.
+        """
+        def call(db):
+            user_id = self._user_id(db, user)
+            return None if user_id is None else (func(db, *args, user_id=user_id),)
+
+        futures = [self._executor.submit(pool.read, call) for pool in self._pools]
+        return [result[0] for result in (future.result() for future in futures) if result is not None]
+
+    def add_counter(self, name, description, interval, period, creation, user=None):
+        """
+        Adds a habit to its shard (see 'db.add_counter').
+
+        Returns:
+            int: The id of the habit within its shard, or None if it could not be added.
+        """
+        def call(db):
+            return add_counter(db, name, description, interval, period, creation, self._user_id(db, user, True))
+        return self._pools[self.shard_index(name, user)].write(call)
+
+    def increment_counter(self, name, event_date=None, user=None):
+        """
+        Records an event for a habit in its shard (see 'db.increment_counter').
+
+        Raises:
+            ValueError: If the user does not exist in the habit's shard.
+        """
+        def call(db):
+            user_id = self._user_id(db, user)
+            if user_id is None:
+                raise ValueError(f"User '{user}' not found in the database.")
+            increment_counter(db, name, event_date, user_id)
+        self._pools[self.shard_index(name, user)].write(call)
+
+    def get_counter_data(self, name, user=None):
+        """
+        Fetches the tracker rows of a habit from its shard (see 'db.get_counter_data').
+        """
+        return self._read_habit(get_counter_data, name, user, [])
+
+    def total_tracker_habit(self, name, user=None):
+        """
+        Counts the events of a habit in its shard (see 'analyse.total_tracker_habit').
+        """
+        return self._read_habit(total_tracker_habit, name, user, 0)
+
+    def get_materialized_streak(self, name, user=None):
+        """
+        Looks up the streak statistics of a habit in its shard (see 'analyse.get_materialized_streak').
+        """
+        return self._read_habit(get_materialized_streak, name, user, None)
+
+    def analyze_streak(self, name, user=None):
+        """
+        Returns the streak report of a habit from its shard (see 'analyse.analyze_streak').
+        """
+        return self._read_habit(analyze_streak, name, user, f"Habit '{name}' not found in the database.")
+
+    def total_habit(self, user=None):
+        """
+        Counts the habits of all shards (see 'analyse.total_habit').
+        """
+        return sum(self.fan_out(total_habit, user=user))
+
+    def total_tracker(self, user=None):
+        """
+        Counts the events of all shards (see 'analyse.total_tracker').
+        """
+        return sum(self.fan_out(total_tracker, user=user))
+
+    def total_tracker_per_habit(self, user=None):
+        """
+        Counts the events per habit of all shards (see 'analyse.total_tracker_per_habit').
+
+        Returns:
+            dict: A mapping of habit name to its number of events, in name order.
+        """
+        merged = {}
+        for counts in self.fan_out(total_tracker_per_habit, user=user):
+            merged.update(counts)
+        return dict(sorted(merged.items()))
+
+    def analyze_all_streaks(self, user=None):
+        """
+        Computes the streak statistics of the habits of all shards (see 'analyse.analyze_all_streaks').
+
+        Returns:
+            dict: A mapping of habit name to StreakResult, in habit name order.
+        """
+        merged = {}
+        for results in self.fan_out(analyze_all_streaks, user=user):
+            merged.update(results)
+        return dict(sorted(merged.items()))
+
+    def close(self):
+        """
+        Stops the worker threads and closes the connections of all shards.
+        """
+        self._executor.shutdown()
+        for pool in self._pools:
+            pool.close()
@@ -0,0 +1,302 @@
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+
+def interval_index(day, creation, interval):
+    """
+    Maps a date to the index of its tracking interval relative to the habit's creation.
+
+    Intervals follow the calendar: ISO weeks (Monday to Sunday), calendar months,
+    quarters and years. Interval 0 is the one containing 'creation', so it may
+    start before the creation date. Unknown intervals are treated as daily. The
+    mapping is constant time per date.
+
+    Args:
+        day (date): The date to map.
+        creation (date): The creation date of the habit.
+        interval (str): The interval type (e.g., "daily", "weekly").
+
+    Returns:
+        int: The interval index; negative for dates before the first interval.
+    """
+    if interval == "weekly":
+        return ((day - creation).days + creation.weekday() - day.weekday()) // 7
+    if interval == "monthly":
+        return (day.year - creation.year) * 12 + day.month - creation.month
+    if interval == "quarterly":
+        return (day.year - creation.year) * 4 + (day.month - 1) // 3 - (creation.month - 1) // 3
+    if interval == "yearly":
+        return day.year - creation.year
+    return (day - creation).days
+
+
+def interval_start(index, creation, interval):
+    """
+    Returns the first date of a tracking interval, clipped to the creation date.
+
+    This is the inverse of 'interval_index'.
+
+    Args:
+        index (int): The interval index (0 or greater).
+        creation (date): The creation date of the habit.
+        interval (str): The interval type (e.g., "daily", "weekly").
+
+    Returns:
+        date: The start date of the interval.
+    """
+    if interval == "weekly":
+        start = creation - timedelta(days=creation.weekday()) + timedelta(weeks=index)
+    elif interval in ("monthly", "quarterly", "yearly"):
+        months = {"monthly": 1, "quarterly": 3, "yearly": 12}[interval]
+        first = creation.month - 1 - (creation.month - 1) % months  # First month of interval 0, zero-based
+        year, month = divmod(creation.year * 12 + first + index * months, 12)
+        start = date(year, month + 1, 1)
+    else:
+        start = creation + timedelta(days=index)
+    return max(start, creation)
+
+
+@dataclass
+class StreakResult:
+    """
+    The outcome of a streak analysis for a single habit.
+
+    Attributes:
+        habit_name (str): The name of the analyzed habit.
+        current_streak (int): Covered intervals in a row up to the latest evaluated interval.
+        longest_streak (int): The longest run of covered intervals.
+        intervals_checked (int): The number of intervals evaluated (up to the period and today).
+        intervals_covered (int): The number of evaluated intervals with at least one event.
+        tracking_entries (int): The number of tracking entries of the habit.
+        breaks (int): The number of runs of missed intervals.
+        break_points (list of date): The start date of every run of missed intervals. Only
+            filled when the result is computed from the full event history.
+    """
+    habit_name: str
+    current_streak: int = 0
+    longest_streak: int = 0
+    intervals_checked: int = 0
+    intervals_covered: int = 0
+    tracking_entries: int = 0
+    breaks: int = 0
+    break_points: list = field(default_factory=list)
+
+    @property
+    def consistent(self):
+        """bool: True if no evaluated interval was missed."""
+        return self.breaks == 0
+
+    @property
+    def coverage(self):
+        """float: The share of evaluated intervals with at least one event."""
+        return self.intervals_covered / self.intervals_checked if self.intervals_checked else 0.0
+
+    def to_dict(self):
+        """
+        Converts the result into JSON-serializable data.
+
+        Returns:
+            dict: All fields plus 'consistent' and 'coverage', with dates in ISO format.
+        """
+        data = asdict(self)
+        data["break_points"] = [day.isoformat() for day in self.break_points]
+        data["consistent"] = self.consistent
+        data["coverage"] = self.coverage
+        return data
+
+    def report(self):
+        """
+        Formats the result as the streak report shown to the user.
+
+        Returns:
+            str: A multi-line report of the habit streak analysis.
+        """
+        report = f"Habit '{self.habit_name}':\n"
+        report += f"- Current Streak: {self.current_streak} intervals\n"
+        report += f"- Longest Streak: {self.longest_streak} intervals\n"
+        report += f"- Total Intervals Checked: {self.intervals_checked}\n"
+        report += f"- Intervals Covered: {self.intervals_covered}\n"
+        report += f"- Tracking Entries: {self.tracking_entries}\n"
+        if self.consistent:
+            report += "- The habit was maintained consistently without any breaks.\n"
+        else:
+            report += "- The habit was not maintained consistently; there were breaks in the streak.\n"
+        return report
+
+
+def compute_streak(habit_name, creation, interval, period, dates, today=None):
+    """
+    Computes streak statistics for a habit in a single pass over its events.
+
+    The time since 'creation' is split into 'period' calendar intervals (see
+    'interval_index'); intervals starting after 'today' are not evaluated. Each
+    event is mapped to its interval index in constant time, so the sorted
+    events are merged into runs of covered intervals without rescanning the
+    event list per interval.
+
+    Args:
+        habit_name (str): The name of the habit.
+        creation (date): The start date of the first interval.
+        interval (str): The interval type (e.g., "daily", "weekly").
+        period (int): The number of intervals the habit is tracked for.
+        dates (list of date): The event dates, sorted in ascending order.
+        today (date, optional): The reference date. Defaults to the current date.
+
+    Returns:
+        StreakResult: The streak statistics of the habit.
+    """
+    indices = (interval_index(event, creation, interval) for event in dates)
+    return compute_streak_from_indices(habit_name, creation, interval, period, indices, len(dates), today)
+
+
+def compute_streak_from_indices(habit_name, creation, interval, period, indices, entries, today=None):
+    """
+    Computes streak statistics from the interval indices of a habit's events.
+
+    This is the core of 'compute_streak' for callers that map events to
+    interval indices themselves, e.g. 'history.HabitHistory' from day ordinals.
+
+    Args:
+        habit_name (str): The name of the habit.
+        creation (date): The start date of the first interval.
+        interval (str): The interval type (e.g., "daily", "weekly").
+        period (int): The number of intervals the habit is tracked for.
+        indices (iterable of int): The interval index of every event, in ascending order.
+        entries (int): The number of tracking entries of the habit.
+        today (date, optional): The reference date. Defaults to the current date.
+
+    Returns:
+        StreakResult: The streak statistics of the habit.
+    """
+    today = today or date.today()
+    result = StreakResult(habit_name, tracking_entries=entries)
+
+    if today < creation or period <= 0:
+        return result
+
+    # Number of intervals that have started by today, capped by the period
+    checked = min(period, interval_index(today, creation, interval) + 1)
+    result.intervals_checked = checked
+
+    run = longest = covered = 0
+    previous = -1  # Index of the last covered interval
+    for index in indices:
+        if index <= previous or index < 0:
+            continue  # Same interval as the previous event, or before creation
+        if index >= checked:
+            break  # Sorted input: all remaining events are outside the evaluated range
+
+        if index == previous + 1:
+            run += 1
+        else:
+            result.break_points.append(interval_start(previous + 1, creation, interval))
+            longest = max(longest, run)
+            run = 1
+        covered += 1
+        previous = index
+
+    result.longest_streak = max(longest, run)
+    result.intervals_covered = covered
+    if previous == checked - 1:
+        result.current_streak = run
+    else:
+        # The latest evaluated interval is not covered
+        result.break_points.append(interval_start(previous + 1, creation, interval))
+
+    result.breaks = len(result.break_points)
+    return result
+
+
+@dataclass
+class StreakState:
+    """
+    Incrementally maintained streak statistics of a habit, independent of the current date.
+
+    Events are folded in with 'add' in ascending interval order. The state covers
+    all intervals up to the last covered one; 'result' derives the streak as of a
+    given date without looking at the event history again.
+
+    Attributes:
+        current_streak (int): Covered intervals in a row ending at 'last_interval'.
+        longest_streak (int): The longest run of covered intervals.
+        last_interval (int): The index of the last covered interval, -1 if none.
+        last_event (str): The latest event date in ISO format, or None.
+        intervals_covered (int): The number of covered intervals within the period.
+        tracking_entries (int): The number of tracking entries of the habit.
+        breaks (int): The number of runs of missed intervals before 'last_interval'.
+    """
+    current_streak: int = 0
+    longest_streak: int = 0
+    last_interval: int = -1
+    last_event: str = None
+    intervals_covered: int = 0
+    tracking_entries: int = 0
+    breaks: int = 0
+
+    def add(self, event, creation, interval, period):
+        """
+        Folds a single new event into the state.
+
+        Args:
+            event (date): The date of the new event.
+            creation (date): The start date of the first interval.
+            interval (str): The interval type (e.g., "daily", "weekly").
+            period (int): The number of intervals the habit is tracked for.
+
+        Returns:
+            bool: False if the event falls before the last covered interval, in which
+            case the state is left unchanged and must be rebuilt from the history.
+        """
+        index = interval_index(event, creation, interval)
+        if 0 <= index < self.last_interval:
+            return False
+
+        self.tracking_entries += 1
+        if self.last_event is None or event.isoformat() > self.last_event:
+            self.last_event = event.isoformat()
+        if index < 0 or index >= period or index == self.last_interval:
+            return True  # Outside the period, or an interval that is already covered
+
+        if index == self.last_interval + 1:
+            self.current_streak += 1
+        else:
+            self.breaks += 1
+            self.current_streak = 1
+        self.longest_streak = max(self.longest_streak, self.current_streak)
+        self.intervals_covered += 1
+        self.last_interval = index
+        return True
+
+    def result(self, habit_name, creation, interval, period, today=None):
+        """
+        Derives the streak statistics as of a given date in constant time.
+
+        Args:
+            habit_name (str): The name of the habit.
+            creation (date): The start date of the first interval.
+            interval (str): The interval type (e.g., "daily", "weekly").
+            period (int): The number of intervals the habit is tracked for.
+            today (date, optional): The reference date. Defaults to the current date.
+
+        Returns:
+            StreakResult: The streak statistics without break point dates, or None if
+            the state contains intervals after 'today' and cannot answer the query.
+        """
+        today = today or date.today()
+        result = StreakResult(habit_name, tracking_entries=self.tracking_entries)
+        if today < creation or period <= 0:
+            return result if self.last_interval < 0 else None
+
+        checked = min(period, interval_index(today, creation, interval) + 1)
+        if self.last_interval >= checked:
+            return None
+
+        result.intervals_checked = checked
+        result.intervals_covered = self.intervals_covered
+        result.longest_streak = self.longest_streak
+        if self.last_interval == checked - 1:
+            result.current_streak = self.current_streak
+            result.breaks = self.breaks
+        else:
+            # The latest evaluated interval is not covered
+            result.breaks = self.breaks + 1
+        return result
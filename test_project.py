@@ -103,4 +103,1075 @@ class TestCounter:
         if hasattr(self, 'db') and self.db is not None:
             self.db.close()
         if os.path.exists("test.db"):
-            os.remove("test.db")
\ No newline at end of file
+            os.remove("test.db")
+
+class TestSchema:
+
+    def setup_method(self):
+        """
+        Creates a legacy, unversioned 'test.db' with duplicate tracker events.
+        """
+        import sqlite3
+        self.db = sqlite3.connect("test.db")
+        self.db.execute("CREATE TABLE counter (name TEXT PRIMARY KEY, description TEXT, interval TEXT, period INTEGER, creation DATE)")
+        self.db.execute("CREATE TABLE tracker (date DATE NOT NULL, counterName TEXT NOT NULL)")
+        self.db.execute("INSERT INTO counter VALUES ('legacy', '', 'daily', 31, '2021-12-01')")
+        self.db.executemany("INSERT INTO tracker VALUES (?, 'legacy')", [("2021-12-01",), ("2021-12-01",), ("2021-12-02",)])
+        self.db.commit()
+        self.db.close()
+
+    def test_migration(self):
+        """
+        Tests that opening a legacy database upgrades it to the indexed schema.
+
+        Assertions:
+            - The schema version equals the latest migration.
+            - Duplicate (counterName, date) events are removed.
+            - Per-user habit lookups use the indexes instead of a table scan.
+            - Existing habits belong to the default user.
+            - Events are stored as integer day ordinals behind the 'tracker' view.
+        """
+        from db import SCHEMA_VERSION, get_schema_version
+        self.db = get_db("test.db")
+
+        assert get_schema_version(self.db) == SCHEMA_VERSION
+        assert len(get_counter_data(self.db, "legacy")) == 2, "Expected duplicate event to be removed"
+
+        plan = self.db.execute(
+            "EXPLAIN QUERY PLAN SELECT date FROM tracker WHERE user_id = 1 AND counterName = ? ORDER BY date",
+            ("legacy",)
+        ).fetchall()
+        assert not any(step[-1].startswith("SCAN") for step in plan), f"Expected index lookups, got {plan}"
+
+        assert self.db.execute("SELECT DISTINCT user_id FROM counter").fetchall() == [(1,)], "Expected the default user"
+
+        events = self.db.execute("SELECT habit_id, day FROM events").fetchall()
+        assert all(isinstance(day, int) for _, day in events), "Events should be stored as day ordinals"
+        assert [row[0] for row in get_counter_data(self.db, "legacy")] == ["2021-12-01", "2021-12-02"], \
+            "The tracker view should present the events as ISO dates"
+
+    def teardown_method(self):
+        """
+        Closes the database connection and deletes the 'test.db' file.
+        """
+        import os
+        self.db.close()
+        if os.path.exists("test.db"):
+            os.remove("test.db")
+
+
+class TestStreak:
+
+    def test_compute_streak(self):
+        """
+        Tests the streak engine on a daily habit with two breaks.
+
+        Assertions:
+            - Current and longest streak, coverage and break points match the events.
+        """
+        from datetime import date
+        from streak import compute_streak
+
+        dates = [date(2021, 12, day) for day in (1, 2, 3, 5, 6, 9, 10)]
+        result = compute_streak("test", date(2021, 12, 1), "daily", 31, dates, today=date(2021, 12, 10))
+
+        assert result.intervals_checked == 10
+        assert result.intervals_covered == 7
+        assert result.longest_streak == 3
+        assert result.current_streak == 2
+        assert result.break_points == [date(2021, 12, 4), date(2021, 12, 7)]
+
+    def test_calendar_intervals(self):
+        """
+        Tests that monthly intervals follow calendar months instead of 30-day blocks.
+
+        Assertions:
+            - Events on Jan 31 and Mar 1 cover January and March but not February.
+        """
+        from datetime import date
+        from streak import compute_streak
+
+        dates = [date(2021, 1, 31), date(2021, 3, 1)]
+        result = compute_streak("test", date(2021, 1, 15), "monthly", 12, dates, today=date(2021, 3, 10))
+
+        assert result.intervals_checked == 3
+        assert result.intervals_covered == 2
+        assert result.break_points == [date(2021, 2, 1)]
+
+    def test_analyze_all_streaks(self):
+        """
+        Tests that the batch analysis matches the per-habit analysis.
+
+        Assertions:
+            - Every habit of the seeded database is reported.
+            - Each batch result equals the result of 'get_streak' for that habit.
+        """
+        import os
+        from analyse import analyze_all_streaks, get_streak
+        from db import initial_load_tracker
+
+        db = get_db("test.db")
+        try:
+            initial_load_tracker(db.cursor())
+            results = analyze_all_streaks(db)
+            names = [row[0] for row in db.execute("SELECT name FROM counter ORDER BY name")]
+            assert list(results) == names
+            for name in names:
+                assert results[name] == get_streak(db, name)
+        finally:
+            db.close()
+            os.remove("test.db")
+
+    def test_streak_state(self):
+        """
+        Tests that the materialized streak state matches a full recomputation.
+
+        Events are added out of order, so both the incremental update and the
+        rebuild fallback for back-dated events are exercised.
+
+        Assertions:
+            - The materialized result equals the full result except for the break point dates.
+        """
+        import os
+        from dataclasses import replace
+        from analyse import get_materialized_streak, get_streak
+
+        db = get_db("test.db")
+        try:
+            add_counter(db, "streak", "", "daily", 365, "2021-12-01")
+            for day in ("2021-12-01", "2021-12-02", "2021-12-05", "2021-12-03", "2021-12-05", "2021-12-09"):
+                increment_counter(db, "streak", day)
+
+            full = get_streak(db, "streak")
+            assert get_materialized_streak(db, "streak") == replace(full, break_points=[])
+        finally:
+            db.close()
+            os.remove("test.db")
+
+    def test_streak_state_after_view_insert(self, tmp_path):
+        """
+        Tests that events written through the 'tracker' view are not lost by the materialized state.
+
+        Assertions:
+            - After view inserts and an increment, the materialized result equals the full result.
+        """
+        from dataclasses import replace
+        from analyse import get_materialized_streak, get_streak
+
+        db = get_db(str(tmp_path / "view.db"))
+        try:
+            add_counter(db, "streak", "", "daily", 365, "2021-12-01")
+            increment_counter(db, "streak", "2021-12-01")
+            db.executemany("INSERT INTO tracker (date, counterName) VALUES (?, 'streak')",
+                           [("2021-12-02",), ("2021-12-03",), ("2021-12-04",)])
+            db.commit()
+            increment_counter(db, "streak", "2021-12-05")
+
+            full = get_streak(db, "streak")
+            assert full.longest_streak == 5
+            assert get_materialized_streak(db, "streak") == replace(full, break_points=[])
+        finally:
+            db.close()
+
+
+class TestStartup:
+
+    def test_lazy_imports(self):
+        """
+        Tests that starting the CLI does not import the plotting dependencies.
+
+        Assertions:
+            - Importing 'main' in a fresh interpreter leaves matplotlib, pandas and numpy unloaded.
+        """
+        import subprocess
+        import sys
+        from benchmarks.importtime import HEAVY_MODULES
+
+        code = f"import sys, main; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+        loaded = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        assert loaded.strip() == "[]", f"Heavy modules imported at startup: {loaded}"
+
+
+class TestImport:
+
+    def setup_method(self):
+        """
+        Sets up an empty test database with a single daily habit.
+        """
+        self.db = get_db("test.db")
+        self.db.execute("DELETE FROM counter")
+        self.db.commit()
+        add_counter(self.db, "import_counter", "test_description", "daily", "365", "2021-12-01")
+
+    def test_bulk_increment(self):
+        """
+        Tests the bulk insert of tracker events across several batches.
+
+        Assertions:
+            - Events of unknown habits are rejected.
+            - Duplicate events are ignored.
+            - All valid events are stored.
+        """
+        from db import bulk_increment
+
+        rows = [(f"2021-12-{day:02d}", "import_counter") for day in range(1, 32)]
+        rows += [("2021-12-01", "import_counter"), ("2021-12-01", "unknown")]
+        inserted, rejected = bulk_increment(self.db, rows, batch_size=7)
+
+        assert inserted == 31
+        assert rejected == 1
+        assert len(get_counter_data(self.db, "import_counter")) == 31
+
+    def test_bulk_increment_rollback(self, tmp_path):
+        """
+        Tests that a failing row source leaves no partial load behind.
+
+        Assertions:
+            - The error of the row source is propagated.
+            - Events of earlier batches are rolled back and not committed by a later write.
+            - The import subcommand reports an unreadable file with a non-zero exit code.
+        """
+        import pytest
+        from db import bulk_increment, get_streak_state
+        from main import main
+
+        def rows():
+            for day in range(1, 5):
+                yield f"2021-12-{day:02d}", "import_counter"
+            raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+
+        with pytest.raises(UnicodeDecodeError):
+            bulk_increment(self.db, rows(), batch_size=2)
+        add_counter(self.db, "import_counter_2", "", "daily", "365", "2021-12-01")
+        assert get_counter_data(self.db, "import_counter") == [], "No event of the failed load should be stored"
+        assert get_streak_state(self.db, "import_counter") is None, "No streak state for rolled back events"
+
+        broken = tmp_path / "broken.csv"
+        broken.write_bytes(b"date,counterName\n2021-12-01,import_counter\n\xff\xfe\n")
+        assert main(["--db", "test.db", "import", str(broken)]) == 1
+        assert get_counter_data(self.db, "import_counter") == []
+
+    def test_import_events(self, tmp_path):
+        """
+        Tests the CSV and JSONL importer.
+
+        Assertions:
+            - Valid records of both formats are inserted and malformed records are skipped.
+        """
+        from importer import import_events
+
+        csv_file = tmp_path / "events.csv"
+        csv_file.write_text("date,counterName\n2021-12-01,import_counter\nnot-a-date,import_counter\n")
+        jsonl_file = tmp_path / "events.jsonl"
+        jsonl_file.write_text('{"date": "2021-12-02", "habit": "import_counter"}\n')
+
+        stats = import_events(self.db, str(csv_file))
+        assert (stats["read"], stats["inserted"], stats["malformed"]) == (2, 1, 1)
+        stats = import_events(self.db, str(jsonl_file))
+        assert (stats["read"], stats["inserted"], stats["malformed"]) == (1, 1, 0)
+
+    def teardown_method(self):
+        """
+        Closes the database connection and deletes the 'test.db' file.
+        """
+        import os
+        self.db.close()
+        if os.path.exists("test.db"):
+            os.remove("test.db")
+
+
+class TestSeed:
+
+    def test_initial_load_tracker(self):
+        """
+        Tests that the predefined tracking data is loaded only once per database.
+
+        Assertions:
+            - The first call inserts the seed rows.
+            - A second call inserts nothing, even after seed rows were deleted.
+        """
+        import os
+        from db import initial_load_tracker
+
+        db = get_db("test.db")
+        try:
+            inserted = initial_load_tracker(db.cursor())
+            db.commit()
+            assert inserted == db.execute("SELECT COUNT(*) FROM tracker").fetchone()[0] > 0
+
+            db.execute("DELETE FROM tracker WHERE counterName = 'Cleaning'")
+            assert initial_load_tracker(db.cursor()) == 0
+            assert db.execute("SELECT COUNT(*) FROM tracker WHERE counterName = 'Cleaning'").fetchone()[0] == 0
+        finally:
+            db.close()
+            os.remove("test.db")
+
+
+class TestProfiles:
+
+    def test_profiles(self):
+        """
+        Tests the connection profiles of 'get_db'.
+
+        Assertions:
+            - Writable profiles use WAL journaling.
+            - The "readonly" profile rejects writes.
+            - Unknown profiles are rejected.
+        """
+        import os
+        import sqlite3
+        import pytest
+
+        db = get_db("test.db", "fast")
+        assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        db.close()
+
+        readonly = get_db("test.db", "readonly")
+        try:
+            with pytest.raises(sqlite3.OperationalError):
+                readonly.execute("DELETE FROM tracker")
+            with pytest.raises(ValueError):
+                get_db("test.db", "unknown")
+        finally:
+            readonly.close()
+            # A read-only connection cannot checkpoint, so the WAL files remain
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists("test.db" + suffix):
+                    os.remove("test.db" + suffix)
+
+
+class TestSession:
+
+    def setup_method(self):
+        """
+        Sets up an empty test database with a single daily habit.
+        """
+        self.db = get_db("test.db")
+        self.db.execute("DELETE FROM counter")
+        self.db.commit()
+        add_counter(self.db, "session_counter", "test_description", "daily", "365", "2021-12-01")
+
+    def test_group_commit(self):
+        """
+        Tests that a session writes events in groups and flushes on exit.
+
+        Assertions:
+            - Events are written once 'max_events' are pending.
+            - Pending events are flushed when the block raises an exception.
+            - A failing flush does not replace the exception of the block.
+            - Pending events are flushed when the block completes.
+        """
+        import sqlite3
+        import pytest
+        from counter import TrackerSession
+
+        counter = Counter("session_counter", "test_description", "daily", "365", "2021-12-01")
+        with pytest.raises(RuntimeError):
+            with TrackerSession(self.db, max_events=3, max_delay=60) as session:
+                for day in range(1, 5):
+                    counter.add_event(self.db, f"2021-12-{day:02d}", session=session)
+                assert len(get_counter_data(self.db, "session_counter")) == 3
+                assert session.pending == 1
+                raise RuntimeError("interrupted")
+
+        assert len(get_counter_data(self.db, "session_counter")) == 4
+        assert (session.inserted, session.pending) == (4, 0)
+
+        def failing_flush():
+            raise sqlite3.OperationalError("database is locked")
+
+        with pytest.raises(RuntimeError):
+            with TrackerSession(self.db, max_events=3, max_delay=60) as session:
+                counter.add_event(self.db, "2021-12-05", session=session)
+                session.flush = failing_flush
+                raise RuntimeError("interrupted")
+        assert session.pending == 1, "Events of a failed flush should stay pending"
+
+        with TrackerSession(self.db, max_events=3, max_delay=60) as session:
+            counter.add_event(self.db, "2021-12-05", session=session)
+        assert len(get_counter_data(self.db, "session_counter")) == 5
+        assert session.inserted == 1
+
+    def teardown_method(self):
+        """
+        Closes the database connection and deletes the 'test.db' file.
+        """
+        import os
+        self.db.close()
+        if os.path.exists("test.db"):
+            os.remove("test.db")
+
+
+class TestSeries:
+
+    def test_daily_count_series(self):
+        """
+        Tests the dense count series of a habit and its monthly resampling.
+
+        Assertions:
+            - Missing days are filled with zero counts.
+            - Monthly buckets start on the first day of the calendar month.
+        """
+        import os
+        from analyse import daily_count_series
+
+        db = get_db("test.db")
+        try:
+            add_counter(db, "series", "", "monthly", 12, "2021-11-01")
+            for day in ("2021-12-01", "2021-12-02", "2021-12-05"):
+                increment_counter(db, "series", day)
+
+            dates, counts = daily_count_series(db, "series")
+            assert [str(day) for day in dates[[0, -1]]] == ["2021-12-01", "2021-12-05"]
+            assert counts.tolist() == [1, 1, 0, 0, 1]
+
+            dates, counts = daily_count_series(db, "series", "2021-11-30", "2022-01-02", interval=None)
+            assert [str(day) for day in dates] == ["2021-11-01", "2021-12-01", "2022-01-01"]
+            assert counts.tolist() == [0, 3, 0]
+        finally:
+            db.close()
+            os.remove("test.db")
+
+
+class TestHeadless:
+
+    def test_subcommands(self, capsys):
+        """
+        Tests the non-interactive subcommands of 'main.py'.
+
+        Assertions:
+            - 'track' records an event and reports it as JSON.
+            - 'streak --all --json' and 'stats --json' emit machine-readable results.
+            - Unknown habits produce a non-zero exit code.
+        """
+        import json
+        import os
+        from main import main
+
+        try:
+            assert main(["--db", "test.db", "track", "Reading", "--date", "2021-12-01", "--json"]) == 0
+            assert json.loads(capsys.readouterr().out)["inserted"] is True
+
+            assert main(["--db", "test.db", "streak", "--all", "--json"]) == 0
+            streaks = {result["habit_name"]: result for result in json.loads(capsys.readouterr().out)}
+            assert streaks["Reading"]["tracking_entries"] == 1
+
+            assert main(["--db", "test.db", "stats", "--json"]) == 0
+            assert json.loads(capsys.readouterr().out)["tracker_entries_per_habit"]["Reading"] == 1
+
+            assert main(["--db", "test.db", "track", "unknown"]) == 1
+        finally:
+            os.remove("test.db")
+
+    def test_interactive_options(self, monkeypatch):
+        """
+        Tests the global options of 'main.py' without a subcommand.
+
+        Assertions:
+            - '--db' is passed on to the interactive CLI.
+            - '--user' is rejected, as the interactive CLI only uses the default user.
+        """
+        import pytest
+        import main
+
+        opened = []
+        monkeypatch.setattr(main, "cli", opened.append)
+        assert main.main(["--db", "other.db"]) == 0
+        assert opened == ["other.db"], "The interactive CLI should open the given database"
+
+        with pytest.raises(SystemExit) as exit_info:
+            main.main(["--db", "other.db", "--user", "bob"])
+        assert exit_info.value.code == 2 and opened == ["other.db"], "'--user' without a subcommand should fail"
+
+
+class TestServer:
+
+    def test_ingestion_server(self, tmp_path):
+        """
+        Tests concurrent check-ins and reads through the asyncio ingestion server.
+
+        Assertions:
+            - Concurrent "track" requests are all written.
+            - Unknown habits and invalid dates are reported as errors.
+            - "count" and "streak" reads see the committed events.
+        """
+        import asyncio
+        from server import IngestionServer, request
+
+        path = str(tmp_path / "server.db")
+        db = get_db(path)
+        add_counter(db, "server_counter", "", "daily", 365, "2021-12-01")
+        db.close()
+
+        async def client(address, payloads):
+            reader, writer = await asyncio.open_connection(*address)
+            responses = [await request(reader, writer, payload) for payload in payloads]
+            writer.close()
+            return responses
+
+        async def scenario():
+            server = IngestionServer(path, readers=2)
+            address = await server.start()
+            try:
+                tracks = await asyncio.gather(*(
+                    client(address, [{"op": "track", "habit": "server_counter", "date": f"2021-12-{day:02d}"}])
+                    for day in range(1, 11)
+                ))
+                errors = await client(address, [
+                    {"op": "track", "habit": "unknown"},
+                    {"op": "track", "habit": "server_counter", "date": "not-a-date"},
+                ])
+                reads = await client(address, [
+                    {"op": "count", "habit": "server_counter"},
+                    {"op": "streak", "habit": "server_counter"},
+                ])
+            finally:
+                await server.close()
+            return tracks, errors, reads
+
+        tracks, errors, reads = asyncio.run(scenario())
+        assert all(responses[0]["ok"] for responses in tracks)
+        assert not any(response["ok"] for response in errors)
+        assert reads[0]["count"] == 10
+        assert reads[1]["tracking_entries"] == 10
+
+
+class TestPool:
+
+    def test_concurrent_access(self, tmp_path):
+        """
+        Tests concurrent reads and writes from worker threads through the connection pool.
+
+        Assertions:
+            - Writes from several threads are all stored.
+            - Analysis functions run in several threads without thread-check errors.
+            - The pool rejects use after it was closed.
+        """
+        import sqlite3
+        import pytest
+        from concurrent.futures import ThreadPoolExecutor
+        from analyse import analyze_streak, total_tracker_habit
+        from pool import ConnectionPool
+
+        with ConnectionPool(str(tmp_path / "pool.db")) as pool:
+            pool.write(add_counter, "pool_counter", "", "daily", 365, "2021-01-01")
+            with ThreadPoolExecutor(8) as executor:
+                list(executor.map(
+                    lambda day: pool.write(increment_counter, "pool_counter", f"2021-01-{day:02d}"), range(1, 32)
+                ))
+                counts = list(executor.map(lambda _: pool.read(total_tracker_habit, "pool_counter"), range(16)))
+                reports = list(executor.map(lambda _: pool.read(analyze_streak, "pool_counter"), range(16)))
+
+            assert counts == [31] * 16
+            assert all("Tracking Entries: 31" in report for report in reports)
+
+        with pytest.raises(sqlite3.ProgrammingError):
+            pool.read(total_tracker_habit, "pool_counter")
+
+
+class TestCache:
+
+    def test_result_cache(self, tmp_path):
+        """
+        Tests the result cache of the read functions and its invalidation by writes.
+
+        Assertions:
+            - Repeated reads are answered from the cache and counted as hits.
+            - New events and habits are visible immediately after the write.
+            - Deleting a habit drops its cached results.
+            - Commits of another connection invalidate the cached results of a reader.
+            - The least recently used entry is evicted once the cache is full.
+        """
+        import sqlite3
+        from analyse import total_habit, total_tracker_habit, get_materialized_streak
+        from cache import RESULT_CACHE, ResultCache
+        from db import get_existing_habits_short
+
+        db = get_db(str(tmp_path / "cache.db"))
+        add_counter(db, "cache_counter", "", "daily", 365, "2021-01-01")
+        RESULT_CACHE.clear()
+
+        assert total_tracker_habit(db, "cache_counter") == 0, "No events recorded yet"
+        assert total_tracker_habit(db, "cache_counter") == 0, "No events recorded yet"
+        info = RESULT_CACHE.info()
+        assert (info["hits"], info["misses"]) == (1, 1), f"Expected one hit and one miss, got {info}"
+
+        increment_counter(db, "cache_counter", "2021-01-01")
+        assert total_tracker_habit(db, "cache_counter") == 1, "The new event should invalidate the count"
+        assert get_materialized_streak(db, "cache_counter").tracking_entries == 1, "Streak should see the event"
+
+        habits = total_habit(db)
+        add_counter(db, "cache_counter_2", "", "daily", 365, "2021-01-01")
+        assert total_habit(db) == habits + 1, "The new habit should invalidate the habit count"
+        assert "cache_counter_2" in get_existing_habits_short(db), "The new habit should be listed"
+
+        Counter("cache_counter", "", "daily", 365).delete(db)
+        assert total_tracker_habit(db, "cache_counter") == 0, "Deleting the habit should drop its events"
+        assert get_materialized_streak(db, "cache_counter") is None, "Deleted habit should have no streak"
+        db.close()
+
+        # Commits of other connections, e.g. of another process, are detected by the reader
+        reader = get_db(str(tmp_path / "cache.db"), "readonly")
+        writer = sqlite3.connect(str(tmp_path / "cache.db"))
+        habit_id = writer.execute("SELECT id FROM counter WHERE name = 'cache_counter_2'").fetchone()[0]
+        assert total_tracker_habit(reader, "cache_counter_2") == 0
+        assert total_tracker_habit(reader, "cache_counter_2") == 0
+        writer.execute("INSERT INTO events (habit_id, day) VALUES (?, 738000)", (habit_id,))
+        writer.commit()
+        assert total_tracker_habit(reader, "cache_counter_2") == 1, "The reader should see the other connection's commit"
+        writer.close()
+        reader.close()
+
+        cache = ResultCache(maxsize=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, key, ())
+        assert cache.get("a") == (False, None), "The oldest entry should have been evicted"
+        assert cache.info()["evictions"] == 1, "One eviction expected"
+
+
+class TestExport:
+
+    def test_export_table(self, tmp_path):
+        """
+        Tests the streaming export of the tracker and counter tables.
+
+        Assertions:
+            - The CSV export contains a header and all tracker rows.
+            - The columnar export reads back to the same rows as the CSV export.
+            - Counter rows survive the columnar round trip including integer columns.
+        """
+        import csv
+        from exporter import export_table, read_columnar
+
+        db = get_db(str(tmp_path / "export.db"))
+        add_counter(db, "export_counter", "Exported habit", "daily", 365, "2021-01-01")
+        for day in range(1, 11):
+            increment_counter(db, "export_counter", f"2021-01-{day:02d}")
+        expected = db.execute("SELECT date, counterName, 'default' FROM tracker ORDER BY counterName, date").fetchall()
+
+        stats = export_table(db, str(tmp_path / "tracker.csv"), batch_size=3)
+        assert stats["rows"] == len(expected), "All tracker rows should be exported"
+        with open(tmp_path / "tracker.csv", newline="") as file:
+            rows = [tuple(row) for row in csv.reader(file)]
+        assert rows == [("date", "counterName", "user")] + expected, "CSV export does not match the tracker table"
+
+        export_table(db, str(tmp_path / "tracker.htc"), batch_size=3)
+        assert list(read_columnar(str(tmp_path / "tracker.htc"))) == expected, "Columnar round trip failed"
+
+        export_table(db, str(tmp_path / "counter.htc"), table="counter")
+        counters = {row[0]: row for row in read_columnar(str(tmp_path / "counter.htc"))}
+        assert counters["export_counter"] == ("export_counter", "Exported habit", "daily", 365, "2021-01-01", "default"), \
+            "Counter row does not survive the columnar round trip"
+        db.close()
+
+    def test_export_users(self, tmp_path):
+        """
+        Tests the export and re-import of same-named habits of two users.
+
+        Assertions:
+            - Exported rows name their user and are grouped by user, habit and date.
+            - Re-importing the export with --user restores only the events of that user.
+        """
+        from db import add_user
+        from exporter import export_table, read_columnar
+        from importer import import_events
+
+        db = get_db(str(tmp_path / "users.db"))
+        users = {name: add_user(db, name) for name in ("alice", "bob")}
+        for name, days in (("alice", (3, 1)), ("bob", (2,))):
+            add_counter(db, "run", "", "daily", 365, "2021-01-01", user_id=users[name])
+            for day in days:
+                increment_counter(db, "run", f"2021-01-{day:02d}", user_id=users[name])
+
+        export_table(db, str(tmp_path / "tracker.htc"))
+        assert list(read_columnar(str(tmp_path / "tracker.htc"))) == [
+            ("2021-01-01", "run", "alice"), ("2021-01-03", "run", "alice"), ("2021-01-02", "run", "bob"),
+        ], "Rows should carry their user and be ordered by user, habit and date"
+        export_table(db, str(tmp_path / "tracker.csv"))
+        db.close()
+
+        target = get_db(str(tmp_path / "target.db"))
+        bob = add_user(target, "bob")
+        add_counter(target, "run", "", "daily", 365, "2021-01-01", user_id=bob)
+        stats = import_events(target, str(tmp_path / "tracker.csv"), user_id=bob)
+        assert (stats["inserted"], stats["other_user"]) == (1, 2), "Only bob's event should be imported"
+        assert get_counter_data(target, "run", bob) == [("2021-01-02", "run")]
+        target.close()
+
+
+class TestHistory:
+
+    def test_habit_history(self, tmp_path):
+        """
+        Tests the ordinal-based habit history loaded from the database.
+
+        Assertions:
+            - The history holds the tracker dates as sorted day ordinals.
+            - Range counts, lookups and set operations work on ordinals and dates.
+            - Streaks computed from the history match 'compute_streak' on date objects.
+        """
+        from datetime import date
+        from history import HabitHistory
+        from streak import compute_streak
+
+        db = get_db(str(tmp_path / "history.db"))
+        add_counter(db, "history_counter", "", "weekly", 52, "2021-01-04")
+        days = ["2021-01-04", "2021-01-06", "2021-01-12", "2021-01-25", "2021-02-01"]
+        for day in reversed(days):
+            increment_counter(db, "history_counter", day)
+
+        history = HabitHistory.from_db(db, "history_counter")
+        assert history.dates() == [date.fromisoformat(day) for day in days], "Dates should be sorted"
+        assert history.count("2021-01-05", "2021-01-25") == 3, "Range count is wrong"
+        assert date(2021, 1, 12) in history and "2021-01-13" not in history, "Lookup is wrong"
+        assert len(HabitHistory.from_db(db, "history_counter", start="2021-01-10")) == 3, "SQL range is wrong"
+
+        other = HabitHistory("history_counter", [date(2021, 1, 4).toordinal(), date(2021, 3, 1).toordinal()])
+        assert len(history | other) == 6 and len(history & other) == 1 and len(history - other) == 4, \
+            "Set operations are wrong"
+
+        today = date(2021, 3, 1)
+        expected = compute_streak("history_counter", date(2021, 1, 4), "weekly", 52, history.dates(), today)
+        assert history.streak(date(2021, 1, 4), "weekly", 52, today) == expected, "Streaks do not match"
+        db.close()
+
+
+class TestRename:
+
+    def test_rename_counter(self, tmp_path):
+        """
+        Tests renaming a habit that is referenced by integer id.
+
+        Assertions:
+            - 'Counter.store' assigns the id that the tracker events reference.
+            - A rename keeps the tracking history and the materialized streak state.
+            - Cached results of the old name are invalidated and a taken name is rejected.
+            - Deleting the habit removes its events and streak state.
+        """
+        from analyse import total_tracker_habit
+        from db import get_counter_id, get_streak_state, rename_counter
+
+        db = get_db(str(tmp_path / "rename.db"))
+        counter = Counter("old_name", "", "daily", 31, "2024-01-01")
+        counter.store(db)
+        assert counter.id == get_counter_id(db, "old_name"), "Stored counter should know its id"
+        for day in ("2024-01-01", "2024-01-02", "2024-01-03"):
+            counter.add_event(db, day)
+        state = get_streak_state(db, "old_name")
+        assert total_tracker_habit(db, "old_name") == 3, "Expected 3 events before the rename"
+
+        assert counter.rename(db, "new_name") and counter.name == "new_name", "Rename should succeed"
+        assert get_counter_id(db, "new_name") == counter.id, "The id should not change"
+        assert total_tracker_habit(db, "new_name") == 3, "Events should follow the rename"
+        assert total_tracker_habit(db, "old_name") == 0, "The old name should no longer have events"
+        assert get_streak_state(db, "new_name") == state, "Streak state should follow the rename"
+        assert get_counter_data(db, "new_name") == [(day, "new_name") for day in ("2024-01-01", "2024-01-02", "2024-01-03")], \
+            "The tracker view should show the new name"
+
+        add_counter(db, "other", "", "daily", 31, "2024-01-01")
+        assert not rename_counter(db, "other", "new_name"), "A taken name should be rejected"
+
+        counter.delete(db)
+        assert db.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 0, "Events should be deleted"
+        assert db.execute("SELECT COUNT(*) FROM streak_state WHERE habit_id = ?", (counter.id,)).fetchone()[0] == 0, \
+            "Streak state should be deleted"
+        db.close()
+
+
+class TestInstrument:
+
+    def test_instrumentation(self, tmp_path):
+        """
+        Tests the opt-in timing and SQL statistics of instrumented functions.
+
+        Assertions:
+            - Nothing is recorded while the instrumentation is disabled.
+            - Calls, SQL statements and fetched rows are recorded per function once enabled.
+            - Statements of nested calls are included in the outer call.
+            - The JSON report contains the recorded functions.
+        """
+        import io
+        import json
+        import instrument
+        from analyse import total_tracker_habit
+
+        instrument.reset()
+        db = get_db(str(tmp_path / "instrument.db"))
+        add_counter(db, "instrumented_counter", "", "daily", 31, "2024-01-01")
+        assert instrument.summary() == {}, "Nothing should be recorded while disabled"
+        db.close()
+
+        instrument.enable("json")
+        try:
+            db = get_db(str(tmp_path / "instrument.db"))
+            increment_counter(db, "instrumented_counter", "2024-01-02")
+            assert total_tracker_habit(db, "instrumented_counter") == 1, "Expected one event"
+            with instrument.measure("menu action"):
+                total_tracker_habit(db, "instrumented_counter")
+            db.close()
+
+            stats = instrument.summary()
+            increment = stats["db.increment_counter"]
+            assert increment["calls"] == 1 and increment["statements"] > 0, "Statements should be counted"
+            assert stats["analyse.total_tracker_habit"]["calls"] == 2, "Cached calls should be counted"
+            assert stats["analyse.total_tracker_habit"]["rows"] >= 1, "Fetched rows should be counted"
+            assert stats["menu action"]["statements"] >= 1, "Nested statements should count for the block"
+
+            output = io.StringIO()
+            instrument.report(file=output)
+            assert "db.get_db" in json.loads(output.getvalue()), "The JSON report should list get_db"
+        finally:
+            instrument.disable()
+            instrument.reset()
+
+
+class TestSynthetic:
+
+    def test_synthetic_generator(self, tmp_path):
+        """
+        Tests the deterministic generator of the benchmark suite.
+
+        Assertions:
+            - The same parameters and seed produce identical events.
+            - Habits follow the interval mix and stay within the generated history.
+            - Every benchmark case runs on the generated database.
+        """
+        from benchmarks.synthetic import END, populate
+        from benchmarks.suite import CASES, build_database, run_case
+        from db import get_habit_dates
+
+        events = []
+        for name in ("first.db", "second.db"):
+            db = get_db(str(tmp_path / name))
+            generated = populate(db, habits=6, years=1, adherence=0.5, intervals={"daily": 1, "weekly": 1}, seed=7)
+            events.append(db.execute("SELECT habit_id, day FROM events ORDER BY habit_id, day").fetchall())
+            db.close()
+        assert events[0] == events[1], "The generator should be deterministic"
+        assert {interval for _, interval, _ in generated} <= {"daily", "weekly"}, "Unexpected interval"
+        assert max(day for _, day in events[0]) <= END.toordinal(), "Events should end at the fixed end date"
+
+        context = build_database(str(tmp_path / "suite.db"), 4, 1, 0.8, {"daily": 1, "weekly": 1}, 0)
+        db = get_db(context["path"])
+        assert len(get_habit_dates(db, context["probe"]["daily"])) > 0, "The probe habit should have dates"
+        for case in CASES:
+            if case.name != "analyse.plot_tracker_counts":
+                assert run_case(db, case, context, 1)["rounds"] == 1, f"Case '{case.name}' should run"
+        db.close()
+
+
+class TestTenancy:
+
+    def test_users(self, tmp_path):
+        """
+        Tests that habits of different users with the same name are kept apart.
+
+        Assertions:
+            - Each user has its own habit list, counts and streaks.
+            - Per-user habit lookups use the (user_id, name) index.
+            - Deleting a user's habit leaves the habit of the other user intact.
+        """
+        from analyse import total_habit, total_tracker, total_tracker_habit, analyze_all_streaks
+        from db import add_user, get_existing_habits_short
+
+        db = get_db(str(tmp_path / "shared.db"))
+        alice, bob = add_user(db, "alice"), add_user(db, "bob")
+        assert add_user(db, "alice") == alice, "Adding an existing user should return its id"
+
+        for user_id, days in ((alice, ["2024-01-01", "2024-01-02"]), (bob, ["2024-01-05"])):
+            counter = Counter("Running", "", "daily", 31, "2024-01-01", user_id=user_id)
+            counter.store(db)
+            for day in days:
+                counter.add_event(db, day)
+
+        assert get_existing_habits_short(db, alice) == ["Running"], "Alice should only see her habit"
+        assert total_habit(db, bob) == 1 and total_tracker(db, bob) == 1, "Bob's totals are wrong"
+        assert total_tracker_habit(db, "Running", alice) == 2, "Alice's count is wrong"
+        assert analyze_all_streaks(db, alice)["Running"].tracking_entries == 2, "Alice's streak is wrong"
+
+        plan = db.execute("EXPLAIN QUERY PLAN SELECT id FROM counter WHERE user_id = ? AND name = ?",
+                          (alice, "Running")).fetchall()
+        assert all(step[-1].startswith("SEARCH") for step in plan), f"Expected an index search, got {plan}"
+
+        Counter("Running", "", "daily", 31, user_id=bob).delete(db)
+        assert total_tracker_habit(db, "Running", alice) == 2, "Alice's events should be kept"
+        assert total_tracker_habit(db, "Running", bob) == 0, "Bob's events should be deleted"
+        db.close()
+
+    def test_merge_database(self, tmp_path):
+        """
+        Tests merging per-user database files into a shared database.
+
+        Assertions:
+            - Every file is assigned to a user named after the file.
+            - Habits and events are copied with their streak state.
+            - Merging the same file again adds nothing.
+            - Totals and streaks reflect events merged later, despite cached results.
+        """
+        from analyse import total_tracker_habit
+        from db import get_streak_state, get_user_id
+        from merge import merge_database
+
+        for name, days in (("alice", ["2024-01-01", "2024-01-02"]), ("bob", ["2024-01-03"])):
+            source = get_db(str(tmp_path / f"{name}.db"))
+            add_counter(source, "Running", "", "daily", 31, "2024-01-01")
+            for day in days:
+                increment_counter(source, "Running", day)
+            source.close()
+
+        db = get_db(str(tmp_path / "shared.db"))
+        merge_database(db, str(tmp_path / "alice.db"))
+        stats = merge_database(db, str(tmp_path / "bob.db"))
+        alice, bob = get_user_id(db, "alice"), get_user_id(db, "bob")
+        assert stats["user_id"] == bob and stats["events"] == 1, "Expected one event for bob"
+        assert total_tracker_habit(db, "Running", alice) == 2, "Alice's events should be merged"
+        assert get_streak_state(db, "Running", alice).tracking_entries == 2, "Streak state should be rebuilt"
+
+        again = merge_database(db, str(tmp_path / "alice.db"))
+        assert again["new_habits"] == 0 and again["events"] == 0, "Merging twice should add nothing"
+
+        source = get_db(str(tmp_path / "alice.db"))
+        increment_counter(source, "Running", "2024-01-03")
+        source.close()
+        merge_database(db, str(tmp_path / "alice.db"))
+        assert total_tracker_habit(db, "Running", alice) == 3, "The cached total should be refreshed by the merge"
+        assert get_streak_state(db, "Running", alice).current_streak == 3, "Streak state should include the new event"
+        db.close()
+
+
+class TestShard:
+
+    def test_sharded_database(self, tmp_path):
+        """
+        Tests routing habits to shard files and aggregating across shards.
+
+        Assertions:
+            - Every habit is stored in exactly the shard it is routed to.
+            - Per-habit reads find the habit's events in its shard.
+            - Fan-out totals and merged results cover all shards, with predefined habits counted once.
+            - Routing by user keeps all habits of a user in one shard.
+            - Events of unknown users are rejected instead of being dropped silently.
+        """
+        import pytest
+        from shard import ShardedDatabase, shard_paths
+
+        paths = shard_paths(str(tmp_path / "main.db"), 3)
+        names = [f"habit_{i}" for i in range(12)]
+        with ShardedDatabase(paths) as shards:
+            for name in names:
+                shards.add_counter(name, "", "daily", 31, "2024-01-01")
+                shards.increment_counter(name, "2024-01-01")
+            shards.increment_counter(names[0], "2024-01-02")
+
+            for name in names:
+                index = shards.shard_index(name)
+                db = get_db(paths[index], "readonly")
+                assert db.execute("SELECT COUNT(*) FROM counter WHERE name = ?", (name,)).fetchone()[0] == 1, \
+                    f"'{name}' should be stored in shard {index}"
+                db.close()
+            assert len({shards.shard_index(name) for name in names}) == 3, "Habits should use all shards"
+
+            assert shards.total_tracker_habit(names[0]) == 2, "Expected two events for the first habit"
+            assert len(shards.get_counter_data(names[1])) == 1, "Expected one event for the second habit"
+            assert shards.total_habit() == len(names) + 4, "Predefined habits should be counted once"
+            assert shards.total_tracker() == len(names) + 1, "Expected all events across shards"
+            predefined = ["Cleaning", "Exercise", "Meditation", "Reading"]
+            assert list(shards.analyze_all_streaks()) == sorted(names + predefined), "Streaks should be merged"
+
+        user_paths = shard_paths(str(tmp_path / "users.db"), 3)
+        with ShardedDatabase(user_paths, route="user") as shards:
+            for name in names:
+                shards.add_counter(name, "", "daily", 31, "2024-01-01", user="alice")
+            assert shards.total_habit(user="alice") == len(names), "Alice's habits should be found"
+            assert shards.total_tracker_habit(names[0], user="bob") == 0, "Unknown users have no events"
+            with pytest.raises(ValueError):
+                shards.increment_counter(names[0], "2024-01-01", user="bob")
+            db = get_db(user_paths[shards.shard_index(names[0], "alice")], "readonly")
+            assert db.execute("SELECT COUNT(*) FROM users WHERE name = 'alice'").fetchone()[0] == 1, \
+                "Alice should live in her shard"
+            db.close()
+
+
+class TestParallel:
+
+    def test_analyze_all_streaks_parallel(self, tmp_path):
+        """
+        Tests the parallel streak analysis against the serial one.
+
+        Assertions:
+            - Habit ids are split into contiguous ranges covering all ids.
+            - The parallel result with two workers equals 'analyze_all_streaks', in habit name order.
+            - Other users' habits are not analyzed.
+        """
+        from analyse import analyze_all_streaks
+        from benchmarks.synthetic import populate
+        from cache import RESULT_CACHE
+        from db import add_user
+        from parallel import analyze_all_streaks_parallel, partition
+
+        assert partition([1, 2, 3, 5, 8], 2) == [(1, 3), (5, 8)], "Expected two contiguous ranges"
+        assert partition([4], 3) == [(4, 4)], "Expected one range for one habit"
+
+        path = str(tmp_path / "parallel.db")
+        db = get_db(path)
+        populate(db, habits=20, years=1, seed=1)
+        add_counter(db, "Other", "", "daily", 31, "2024-01-01", user_id=add_user(db, "alice"))
+        RESULT_CACHE.clear()
+        expected = analyze_all_streaks(db)
+        db.close()
+
+        result = analyze_all_streaks_parallel(path, workers=2)
+        assert result == expected, "Parallel and serial streak results should be equal"
+        assert list(result) == sorted(result), "Results should be in habit name order"
+        assert "Other" not in result, "Habits of other users should not be analyzed"
+
+
+class TestRollup:
+
+    def test_rollups(self, tmp_path):
+        """
+        Tests the maintained per-period rollup counts and the series read from them.
+
+        Assertions:
+            - Inserting and deleting events keeps the rollup counts equal to a bulk rebuild.
+            - Empty buckets are removed when their last event is deleted.
+            - The entry count of a habit is read from the rollups.
+            - Rollup-based series equal the series resampled from the daily events,
+              and ranges that cut a bucket fall back to the events.
+        """
+        from datetime import date
+
+        import numpy as np
+        from analyse import _bucket_starts, daily_count_series, total_tracker_habit
+        from db import rebuild_rollups
+
+        db = get_db(str(tmp_path / "rollup.db"))
+        add_counter(db, "Rollup", "", "daily", 31, "2023-01-01")
+        for day in ("2023-01-02", "2023-01-08", "2023-02-15", "2023-12-31", "2024-01-01", "2024-03-03"):
+            increment_counter(db, "Rollup", day)
+        db.execute("DELETE FROM tracker WHERE counterName = 'Rollup' AND date = '2024-03-03'")
+        db.commit()
+
+        query = "SELECT grain, bucket, count FROM rollup ORDER BY grain, habit_id, bucket"
+        maintained = db.execute(query).fetchall()
+        rebuild_rollups(db)
+        assert db.execute(query).fetchall() == maintained, "Triggers and rebuild should give the same counts"
+        march = date(2024, 3, 1).toordinal()
+        assert not any(bucket == march for _, bucket, _ in maintained), "Empty buckets should be removed"
+        assert total_tracker_habit(db, "Rollup") == 5, "Expected five entries"
+
+        dates, counts = daily_count_series(db, "Rollup")
+        for interval in ("weekly", "monthly", "quarterly", "yearly"):
+            starts = _bucket_starts(dates, interval)
+            expected = {}
+            for start, count in zip(starts, counts):
+                expected[start] = expected.get(start, 0) + count
+            series = daily_count_series(db, "Rollup", interval=interval)
+            assert list(zip(*series)) == [(k, v) for k, v in expected.items()], \
+                f"The {interval} series should match the daily events"
+
+        dates, counts = daily_count_series(db, "Rollup", "2023-01-04", "2023-02-28", "monthly")
+        assert list(counts) == [1, 1], "Only events inside the range should be counted"
+        dates, counts = daily_count_series(db, "Rollup", "2023-01-01", "2023-12-31", "monthly")
+        assert len(dates) == 12 and counts.sum() == 4, "Expected twelve months with four entries"
+        assert dates[0] == np.datetime64("2023-01-01"), "The series should start at the first month"
+        db.close()